@@ -0,0 +1,414 @@
+"""
+Benchmarks das etapas do pipeline da Petroleira Gamarra.
+
+Cada benchmark mede uma função de entrada do pipeline sobre dados sintéticos de
+vários tamanhos (número de campos x anos de histórico): tempo de várias
+repetições e pico de memória alocada (tracemalloc, numa execução separada para
+não distorcer o tempo). Os resultados vão para um JSON e podem ser comparados
+com uma execução anterior; a comparação termina com código 1 quando alguma
+etapa fica mais lenta (ou usa mais memória) além do limite.
+
+Uso:
+    python benchmarks/run_benchmarks.py                          # tamanhos "rapido"
+    python benchmarks/run_benchmarks.py --tamanhos completo      # 10 → 100k campos, 20 → 100 anos
+    python benchmarks/run_benchmarks.py --campos 10 1000 --anos 20 50 --apenas consolidar_agregados
+    python benchmarks/run_benchmarks.py --base benchmarks/results/base.json   # executa e compara
+    python benchmarks/run_benchmarks.py --comparar base.json novo.json --limite 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SRC = BASE_DIR / "src"
+sys.path.append(str(BASE_DIR))
+for subdir in ["data_generation", "ml", "utils"]:
+    sys.path.append(str(SRC / subdir))
+
+import compute_financials
+import generate_custos
+from generate_campos import gerar_campos
+from generate_producao_mensal import buscar_precos, construir_tabela_precos, gerar_producao_total, merge_preco_cambio
+from export_predictions_for_powerbi import export_predictions_for_powerbi
+from prepare_dataset import prepare_ml_dataset
+from train_baseline import train_baseline_models
+from train_ml_models import train_ml_models
+from train_time_series import train_time_series_models
+
+RESULTS_DIR = BASE_DIR / "benchmarks" / "results"
+INICIO = "2005-01"
+
+# Grades de tamanhos (n_campos, n_anos)
+TAMANHOS = {
+    "rapido": [(10, 20), (100, 20), (1000, 20)],
+    "padrao": [(10, 20), (1000, 20), (10000, 20), (10, 100), (1000, 100)],
+    "completo": [(10, 20), (1000, 20), (100000, 20), (10, 100), (1000, 100), (100000, 100)],
+}
+
+
+# -----------------------
+# 1. Entradas sintéticas (calculadas sob demanda por tamanho)
+# -----------------------
+def _periodo(n_anos):
+    inicio = pd.Timestamp(INICIO)
+    return inicio, inicio + pd.DateOffset(years=n_anos) - pd.offsets.MonthBegin()
+
+
+def _campos(obter, n_campos, n_anos, pasta, seed):
+    return gerar_campos(output_path=pasta / "campos.parquet", n_campos=n_campos, seed=seed)
+
+
+def _preco_df(obter, n_campos, n_anos, pasta, seed):
+    # Passeios log-normais de preço e câmbio cobrindo o período inteiro
+    rng = np.random.default_rng(seed)
+    datas = pd.date_range(*_periodo(n_anos), freq="MS")
+    n = len(datas)
+    preco = pd.DataFrame({
+        "data": datas,
+        "preco_barril_usd": np.maximum(60 * np.exp(np.cumsum(rng.normal(0, 0.03, n))), 25),
+    })
+    cambio = pd.DataFrame({
+        "data": datas,
+        "taxa_cambio": np.clip(3.5 * np.exp(np.cumsum(rng.normal(0, 0.02, n))), 1.5, 6),
+    })
+    return merge_preco_cambio(preco, cambio)
+
+
+def _producao(obter, n_campos, n_anos, pasta, seed):
+    inicio, fim = _periodo(n_anos)
+    return gerar_producao_total(obter("campos"), obter("preco_df"), start=inicio, end=fim, seed=seed)
+
+
+def _custos_gerais(obter, n_campos, n_anos, pasta, seed):
+    return generate_custos.gerar_custos_gerais(*_periodo(n_anos))
+
+
+def _producao_custos(obter, n_campos, n_anos, pasta, seed):
+    return compute_financials.calcular_custos_operacionais(obter("producao").copy())
+
+
+def _financeiro_campo(obter, n_campos, n_anos, pasta, seed):
+    return compute_financials.calcular_lucro_liquido(
+        compute_financials.aplicar_share_custos_gerais(obter("producao_custos"), obter("custos_gerais")))
+
+
+def _agregados(obter, n_campos, n_anos, pasta, seed):
+    return compute_financials.consolidar_agregados(obter("financeiro_campo"))
+
+
+def _dataset(obter, n_campos, n_anos, pasta, seed):
+    base_dir = pasta / "dataset"
+    (base_dir / "data" / "processed").mkdir(parents=True, exist_ok=True)
+    prepare_ml_dataset(base_dir, obter("agregados"))
+    return base_dir / "data" / "processed" / "ml_dataset.csv"
+
+
+PREPAROS = {
+    "campos": _campos,
+    "preco_df": _preco_df,
+    "producao": _producao,
+    "custos_gerais": _custos_gerais,
+    "producao_custos": _producao_custos,
+    "financeiro_campo": _financeiro_campo,
+    "agregados": _agregados,
+    "dataset": _dataset,
+}
+
+
+def entradas(n_campos, n_anos, pasta, seed=0):
+    """Função obter(nome) que calcula cada entrada uma única vez por tamanho."""
+    cache = {}
+
+    def obter(nome):
+        if nome not in cache:
+            cache[nome] = PREPAROS[nome](obter, n_campos, n_anos, pasta, seed)
+        return cache[nome]
+    return obter
+
+
+def _subpasta(pasta, nome):
+    return Path(tempfile.mkdtemp(prefix=f"{nome}-", dir=pasta))
+
+
+# -----------------------
+# 2. Registro de benchmarks
+# -----------------------
+# "funcao" é a etapa medida; "preparar(obter, pasta)" monta os argumentos (fora
+# da medição) antes de cada repetição. "dimensoes" diz de quais tamanhos a etapa
+# depende: as de ML trabalham sobre a série consolidada, que só cresce com os anos.
+BENCHMARKS = {
+    # Busca indexada de preços: uma consulta por campo-mês
+    "buscar_precos": {
+        "funcao": buscar_precos,
+        "preparar": lambda obter, pasta: {
+            "tabela_precos": construir_tabela_precos(obter("preco_df")), "dates": obter("producao")["data"],
+        },
+        "dimensoes": ("n_campos", "n_anos"),
+    },
+    "gerar_producao_total": {
+        "funcao": gerar_producao_total,
+        "preparar": lambda obter, pasta: {
+            "campos": obter("campos"), "preco_df": obter("preco_df"),
+            "start": obter("preco_df")["data"].min(), "end": obter("preco_df")["data"].max(),
+        },
+        "dimensoes": ("n_campos", "n_anos"),
+    },
+    "gerar_custos_gerais": {
+        "funcao": generate_custos.gerar_custos_gerais,
+        "preparar": lambda obter, pasta: {
+            "start": obter("preco_df")["data"].min(), "end": obter("preco_df")["data"].max(),
+        },
+        "dimensoes": ("n_anos",),
+    },
+    "aplicar_share_custos_gerais": {
+        "funcao": compute_financials.aplicar_share_custos_gerais,
+        "preparar": lambda obter, pasta: {
+            "df_prod": obter("producao_custos"), "df_custos_gerais": obter("custos_gerais"),
+        },
+        "dimensoes": ("n_campos", "n_anos"),
+    },
+    "consolidar_agregados": {
+        "funcao": compute_financials.consolidar_agregados,
+        "preparar": lambda obter, pasta: {"df": obter("financeiro_campo")},
+        "dimensoes": ("n_campos", "n_anos"),
+    },
+    "prepare_ml_dataset": {
+        "funcao": prepare_ml_dataset,
+        "preparar": lambda obter, pasta: {
+            "base_dir": obter("dataset").parents[2], "df_agg": obter("agregados"),
+        },
+        "dimensoes": ("n_anos",),
+    },
+    "train_baseline_models": {
+        "funcao": train_baseline_models,
+        "preparar": lambda obter, pasta: {
+            "path_dataset": obter("dataset"), "base_dir": _subpasta(pasta, "baseline"),
+        },
+        "dimensoes": ("n_anos",),
+    },
+    "train_time_series_models": {
+        "funcao": train_time_series_models,
+        "preparar": lambda obter, pasta: {
+            "df": pd.read_csv(obter("dataset")), "base_dir": _subpasta(pasta, "sarima"),
+            "n_workers": 1, "use_cache": False,
+        },
+        "dimensoes": ("n_anos",),
+    },
+    "train_ml_models": {
+        "funcao": train_ml_models,
+        "preparar": lambda obter, pasta: {
+            "dataset_path": obter("dataset"), "models_dir": _subpasta(pasta, "ml"),
+        },
+        "dimensoes": ("n_anos",),
+    },
+    # Exportação particionada completa (pasta nova a cada repetição) das
+    # previsões por campo
+    "export_predictions_for_powerbi": {
+        "funcao": export_predictions_for_powerbi,
+        "preparar": lambda obter, pasta: {
+            "pred_ml": obter("producao")[["data", "campo_id", "producao_barris"]].rename(
+                columns={"producao_barris": "real"}).assign(rf_previsto=lambda d: d["real"] * 1.01),
+            "metrics_df": pd.DataFrame({"target": ["producao"], "modelo": ["RandomForest"], "MAE": [0.0]}),
+            "output_path": _subpasta(pasta, "powerbi"),
+            "colunas_id": ("campo_id",),
+        },
+        "dimensoes": ("n_campos", "n_anos"),
+    },
+}
+
+
+# -----------------------
+# 3. Execução
+# -----------------------
+def medir(spec, obter, pasta, repeticoes=3, memoria=True):
+    """
+    Tempos de `repeticoes` execuções e, com `memoria`, o pico alocado numa
+    execução extra com tracemalloc. A saída impressa pelas etapas é descartada.
+    """
+    tempos = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeticoes):
+            kwargs = spec["preparar"](obter, pasta)
+            t0 = time.perf_counter()
+            spec["funcao"](**kwargs)
+            tempos.append(time.perf_counter() - t0)
+
+        pico = None
+        if memoria:
+            kwargs = spec["preparar"](obter, pasta)
+            tracemalloc.start()
+            try:
+                spec["funcao"](**kwargs)
+                pico = tracemalloc.get_traced_memory()[1] / 2**20
+            finally:
+                tracemalloc.stop()
+    return tempos, pico
+
+
+def _tamanhos_do_benchmark(spec, tamanhos):
+    """Tamanhos distintos para as dimensões da etapa (o menor n_campos nas que só dependem dos anos)."""
+    if "n_campos" in spec["dimensoes"]:
+        return sorted(set(tamanhos))
+    menor = min(c for c, _ in tamanhos)
+    return sorted({(menor, a) for _, a in tamanhos})
+
+
+def executar_benchmarks(tamanhos, nomes=None, repeticoes=3, memoria=True, seed=0):
+    """Executa os benchmarks pedidos em todos os tamanhos. Retorna a lista de resultados."""
+    nomes = list(BENCHMARKS) if nomes is None else nomes
+    pendentes = {}
+    for nome in nomes:
+        for tamanho in _tamanhos_do_benchmark(BENCHMARKS[nome], tamanhos):
+            pendentes.setdefault(tamanho, []).append(nome)
+
+    resultados = []
+    for (n_campos, n_anos), nomes_tamanho in sorted(pendentes.items()):
+        with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+            pasta = Path(tmp)
+            with contextlib.redirect_stdout(io.StringIO()):
+                obter = entradas(n_campos, n_anos, pasta, seed)
+                linhas = len(obter("producao"))
+            for nome in nomes_tamanho:
+                tempos, pico = medir(BENCHMARKS[nome], obter, pasta, repeticoes, memoria)
+                resultado = {
+                    "benchmark": nome,
+                    "n_campos": n_campos,
+                    "n_anos": n_anos,
+                    "linhas_producao": linhas,
+                    "tempos_s": tempos,
+                    "mediana_s": float(np.median(tempos)),
+                    "min_s": min(tempos),
+                    "pico_memoria_mb": pico,
+                }
+                resultados.append(resultado)
+                memoria_txt = "" if pico is None else f"  {pico:10.1f} MB"
+                print(f"{nome:32s} campos={n_campos:<7d} anos={n_anos:<4d} {resultado['mediana_s']:10.4f}s{memoria_txt}")
+    return resultados
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def salvar_resultados(resultados, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit_atual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "resultados": resultados,
+        }, f, indent=2)
+    print(f"📄 Resultados salvos em: {path}")
+    return path
+
+
+# -----------------------
+# 4. Comparação (gate de regressão)
+# -----------------------
+def comparar(base, novo, limite=0.2, limite_memoria=None, minimo_s=0.01):
+    """
+    Compara duas execuções (dicionários lidos dos JSONs) por benchmark e tamanho.
+    Regressão: mediana nova > base x (1 + limite) e a diferença passa de `minimo_s`
+    (ignora ruído em etapas de milissegundos); com `limite_memoria`, o mesmo
+    critério para o pico de memória. Retorna (tabela, houve_regressao).
+    """
+    chave = lambda r: (r["benchmark"], r["n_campos"], r["n_anos"])
+    anteriores = {chave(r): r for r in base["resultados"]}
+    linhas = []
+    for r in novo["resultados"]:
+        b = anteriores.get(chave(r))
+        if b is None:
+            continue
+        razao = r["mediana_s"] / b["mediana_s"] if b["mediana_s"] > 0 else float("inf")
+        regressao = razao > 1 + limite and r["mediana_s"] - b["mediana_s"] > minimo_s
+        razao_mem = None
+        if r.get("pico_memoria_mb") and b.get("pico_memoria_mb"):
+            razao_mem = r["pico_memoria_mb"] / b["pico_memoria_mb"]
+            if limite_memoria is not None and razao_mem > 1 + limite_memoria:
+                regressao = True
+        linhas.append({
+            "benchmark": r["benchmark"], "n_campos": r["n_campos"], "n_anos": r["n_anos"],
+            "base_s": b["mediana_s"], "novo_s": r["mediana_s"], "razao": razao,
+            "razao_memoria": razao_mem, "regressao": regressao,
+        })
+    tabela = pd.DataFrame(linhas, columns=["benchmark", "n_campos", "n_anos", "base_s", "novo_s",
+                                           "razao", "razao_memoria", "regressao"])
+    return tabela, bool(tabela["regressao"].any())
+
+
+def _ler(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _relatar_comparacao(tabela, houve_regressao, limite):
+    print(tabela.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    if houve_regressao:
+        print(f"\n❌ Regressão acima de {limite:.0%} em: "
+              f"{sorted(set(tabela.loc[tabela['regressao'], 'benchmark']))}")
+    else:
+        print(f"\n✅ Nenhuma regressão acima de {limite:.0%}")
+    return 1 if houve_regressao else 0
+
+
+# -----------------------
+# 5. CLI
+# -----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks das etapas do pipeline")
+    parser.add_argument("--tamanhos", choices=list(TAMANHOS), default="rapido", help="Grade de tamanhos pré-definida")
+    parser.add_argument("--campos", type=int, nargs="+", help="Números de campos (com --anos, substitui --tamanhos)")
+    parser.add_argument("--anos", type=int, nargs="+", help="Anos de histórico (com --campos, substitui --tamanhos)")
+    parser.add_argument("--apenas", nargs="+", choices=list(BENCHMARKS), help="Só estes benchmarks")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-memoria", action="store_true", help="Não mede o pico de memória")
+    parser.add_argument("--saida", type=Path, help="Arquivo JSON de resultados (padrão: benchmarks/results/<data>.json)")
+    parser.add_argument("--base", type=Path, help="Compara a execução com este JSON ao final")
+    parser.add_argument("--comparar", nargs=2, type=Path, metavar=("BASE", "NOVO"), help="Só compara dois JSONs")
+    parser.add_argument("--limite", type=float, default=0.2, help="Regressão de tempo tolerada (0.2 = 20%%)")
+    parser.add_argument("--limite-memoria", type=float, help="Regressão de memória tolerada (padrão: não verifica)")
+    parser.add_argument("--minimo", type=float, default=0.01, help="Diferença mínima em segundos para contar regressão")
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        base, novo = (_ler(p) for p in args.comparar)
+        tabela, houve = comparar(base, novo, args.limite, args.limite_memoria, args.minimo)
+        return _relatar_comparacao(tabela, houve, args.limite)
+
+    if args.campos or args.anos:
+        tamanhos = [(c, a) for c in (args.campos or [10]) for a in (args.anos or [20])]
+    else:
+        tamanhos = TAMANHOS[args.tamanhos]
+
+    resultados = executar_benchmarks(tamanhos, args.apenas, args.repeticoes, not args.sem_memoria)
+    saida = args.saida or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    salvar_resultados(resultados, saida)
+
+    if args.base:
+        tabela, houve = comparar(_ler(args.base), _ler(saida), args.limite, args.limite_memoria, args.minimo)
+        return _relatar_comparacao(tabela, houve, args.limite)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+import json
+
+from run_benchmarks import comparar, executar_benchmarks, main
+
+
+def execucao(**medianas):
+    return {"resultados": [
+        {"benchmark": nome, "n_campos": 10, "n_anos": 20, "mediana_s": s, "pico_memoria_mb": mb}
+        for nome, (s, mb) in medianas.items()
+    ]}
+
+
+def test_gate_de_regressao():
+    base = execucao(lento=(1.0, 100.0), rapido=(0.001, 1.0), memoria=(1.0, 100.0), removido=(1.0, None))
+    novo = execucao(lento=(1.3, 100.0), rapido=(0.002, 1.0), memoria=(1.0, 200.0), novo=(1.0, None))
+
+    tabela, houve = comparar(base, novo, limite=0.2)
+    assert houve
+    assert dict(zip(tabela["benchmark"], tabela["regressao"])) == {"lento": True, "rapido": False, "memoria": False}
+
+    tabela, _ = comparar(base, novo, limite=0.5, limite_memoria=0.5)
+    assert dict(zip(tabela["benchmark"], tabela["regressao"])) == {"lento": False, "rapido": False, "memoria": True}
+
+
+def test_cli_comparar_e_execucao(tmp_path):
+    caminhos = []
+    for nome, s in [("base", 1.0), ("novo", 1.1)]:
+        caminhos.append(tmp_path / f"{nome}.json")
+        caminhos[-1].write_text(json.dumps(execucao(etapa=(s, None))))
+    assert main(["--comparar", *map(str, caminhos), "--limite", "0.2"]) == 0
+    assert main(["--comparar", *map(str, caminhos), "--limite", "0.05"]) == 1
+
+    resultados = executar_benchmarks([(3, 2), (5, 2)], nomes=["buscar_precos", "gerar_custos_gerais", "consolidar_agregados"],
+                                     repeticoes=2, memoria=True)
+    # gerar_custos_gerais só depende dos anos: roda uma vez, no menor número de campos
+    assert [(r["benchmark"], r["n_campos"]) for r in resultados] == [
+        ("buscar_precos", 3), ("gerar_custos_gerais", 3), ("consolidar_agregados", 3),
+        ("buscar_precos", 5), ("consolidar_agregados", 5)]
+    assert all(len(r["tempos_s"]) == 2 and r["pico_memoria_mb"] > 0 for r in resultados)
+    assert resultados[-1]["linhas_producao"] == 5 * 24
@@ -0,0 +1,76 @@
+"""
+Configuração comum dos testes (pytest).
+
+Os testes ficam ao lado dos módulos (test_*.py em src/* e na raiz) e importam
+os módulos como main.py faz, pelos diretórios de src/ no sys.path. Os dados
+vêm dos próprios geradores do projeto, num diretório temporário e com poucos
+campos, compartilhados por toda a sessão: os testes que alteram um DataFrame
+devem trabalhar sobre uma cópia.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.append(str(BASE_DIR))
+for subdir in ["data_generation", "ml", "utils"]:
+    sys.path.append(str(BASE_DIR / "src" / subdir))
+
+N_CAMPOS = 12
+
+
+@pytest.fixture(scope="session")
+def dados_brutos(tmp_path_factory):
+    """Campos, preço e câmbio gerados em disco: {"campos", "preco", "cambio", "preco_df", "dir"}."""
+    from generate_cambio import gerar_cambio
+    from generate_campos import gerar_campos
+    from generate_preco_petroleo import gerar_preco_petroleo
+    from generate_producao_mensal import carregar_dados, merge_preco_cambio
+
+    raw = tmp_path_factory.mktemp("raw")
+    gerar_preco_petroleo(output_path=raw / "preco_petroleo.parquet", seed=42)
+    gerar_cambio(output_path=raw / "cambio.parquet", seed=7)
+    gerar_campos(output_path=raw / "campos_petroliferos.parquet", n_campos=N_CAMPOS, seed=21)
+    campos, preco, cambio = carregar_dados(
+        raw / "campos_petroliferos.parquet", raw / "preco_petroleo.parquet", raw / "cambio.parquet"
+    )
+    return {"campos": campos, "preco": preco, "cambio": cambio,
+            "preco_df": merge_preco_cambio(preco, cambio), "dir": raw}
+
+
+@pytest.fixture(scope="session")
+def producao(dados_brutos):
+    """Produção mensal por campo (2005-2025), como na etapa producao."""
+    from generate_producao_mensal import gerar_producao_total
+    return gerar_producao_total(dados_brutos["campos"], dados_brutos["preco_df"], seed=123)
+
+
+@pytest.fixture(scope="session")
+def custos_gerais():
+    from generate_custos import gerar_custos_gerais
+    return gerar_custos_gerais()
+
+
+@pytest.fixture(scope="session")
+def financeiro_campo(producao, custos_gerais):
+    """Tabela por campo com custos, rateio e lucro (producao_financeiro)."""
+    from compute_financials import calcular_financeiro_fundido
+    return calcular_financeiro_fundido(producao.copy(), custos_gerais, manter_shares=True)
+
+
+@pytest.fixture(scope="session")
+def agregados(financeiro_campo):
+    """Total da empresa por mês (financials_consolidated)."""
+    from compute_financials import consolidar_agregados
+    return consolidar_agregados(financeiro_campo)
+
+
+@pytest.fixture(scope="session")
+def dataset_ml(agregados, tmp_path_factory):
+    """Dataset de ML (features, targets e splits), como na etapa dataset."""
+    from prepare_dataset import prepare_ml_dataset
+    base_dir = tmp_path_factory.mktemp("base")
+    (base_dir / "data" / "processed").mkdir(parents=True)
+    return prepare_ml_dataset(base_dir, agregados)
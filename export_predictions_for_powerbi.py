@@ -1,112 +1,223 @@
 import os
+import sys
+import json
+import hashlib
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from pathlib import Path
 
-def export_predictions_for_powerbi(
-    pred_ml,
-    metrics_df,
-    pred_sarima=None,
-    company_name="Petroleira Gamarra",
-    output_path="../data/processed/predictions.xlsx"
-):
+sys.path.append(str(Path(__file__).resolve().parent / "src" / "utils"))
+from storage import salvar_parte
+
+MODELO_MAP = {
+    "real": "Valor Real",
+    "rf_previsto": "Random Forest",
+    "xgb_previsto": "XGBoost",
+}
+SARIMA_MAP = {"real": "Valor Real", "previsto": "SARIMA"}
+MESES_ABREV = np.array(["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])
+LIMITE_LINHAS_EXCEL = 1_048_575  # linhas por aba, sem o cabeçalho
+MANIFESTO = "_manifesto.json"
+
+
+# -----------------------
+# 1. Partições (fonte x modelo x ano)
+# -----------------------
+def _fontes(pred_ml, pred_sarima):
+    """(fonte, DataFrame largo, mapa coluna -> modelo) de cada conjunto de previsões."""
+    fontes = [("Machine Learning", pred_ml, MODELO_MAP)]
+    if pred_sarima is not None and "data" in pred_sarima:
+        fontes.append(("SARIMA", pred_sarima, SARIMA_MAP))
+    return fontes
+
+
+def _valores(serie):
+    # Colunas vazias (pd.NA) viram float NaN
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _constante(valor, n):
+    # Texto repetido como categoria: um único valor no dicionário do Parquet
+    return pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), [valor])
+
+
+def particoes(df, modelo_map, fonte, company_name, colunas_id=()):
     """
-    Gera um arquivo Excel completo com previsões e métricas dos modelos.
-    Ideal para visualização no Power BI.
+    Percorre as partições (modelo, ano) de um DataFrame largo sem copiá-lo nem
+    alterá-lo. Para cada uma gera (chave, hash, montar): o hash vem só dos arrays
+    (datas, ids e valores) e `montar()` cria o DataFrame longo da partição, então
+    partições inalteradas nunca são materializadas.
+    A memória usada é a de uma coluna ordenada, não a do formato longo inteiro.
     """
+    datas = pd.DatetimeIndex(pd.to_datetime(df["data"]))
+    ordem = np.argsort(datas.asi8, kind="stable")
+    datas = datas[ordem]
+    ids = {c: df[c].to_numpy()[ordem] for c in colunas_id}
+    anos = datas.year.to_numpy()
+    meses = datas.month.to_numpy()
+    cortes = np.flatnonzero(np.diff(anos)) + 1
+    inicios, fins = np.r_[0, cortes], np.r_[cortes, len(anos)]
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+    # Hash linha a linha das chaves extras, fatiado junto com cada partição
+    hash_ids = [pd.util.hash_array(v) for v in ids.values()]
 
-    # LIMPEZA E NORMALIZAÇÃO DAS PREVISÕES DE ML
-    
-    pred_ml["data"] = pd.to_datetime(pred_ml["data"])
-    pred_ml = pred_ml.sort_values("data")
-
-    # Reorganizar em formato longo (útil para Power BI)
-    pred_long = pred_ml.melt(
-        id_vars=["data"],
-        value_vars=["real", "rf_previsto", "xgb_previsto"],
-        var_name="modelo",
-        value_name="valor"
-    )
-
-    # Renomear para nomes mais intuitivos
-    modelo_map = {
-        "real": "Valor Real",
-        "rf_previsto": "Random Forest",
-        "xgb_previsto": "XGBoost",
-    }
-    pred_long["modelo"] = pred_long["modelo"].replace(modelo_map)
+    for col, modelo in modelo_map.items():
+        if col not in df:
+            continue
+        valores = _valores(df[col])[ordem]
+        for ini, fim in zip(inicios, fins):
+            ano = int(anos[ini])
+            h = hashlib.sha256(company_name.encode())
+            for c, hash_col in zip(ids, hash_ids):
+                h.update(c.encode())
+                h.update(hash_col[ini:fim].tobytes())
+            h.update(datas.asi8[ini:fim].tobytes())
+            h.update(valores[ini:fim].tobytes())
 
-    # Adicionar colunas de tempo
-    pred_long["ano"] = pred_long["data"].dt.year
-    pred_long["mes"] = pred_long["data"].dt.month
-    pred_long["mes_nome"] = pred_long["data"].dt.strftime("%b")
-    pred_long["empresa"] = company_name
-    pred_long["fonte"] = "Machine Learning"
+            def montar(ini=ini, fim=fim, ano=ano, modelo=modelo, valores=valores):
+                n = fim - ini
+                return pd.DataFrame({
+                    "data": datas[ini:fim],
+                    **{c: v[ini:fim] for c, v in ids.items()},
+                    "modelo": _constante(modelo, n),
+                    "valor": valores[ini:fim],
+                    "ano": np.full(n, ano),
+                    "mes": meses[ini:fim],
+                    "mes_nome": pd.Categorical.from_codes(meses[ini:fim] - 1, MESES_ABREV),
+                    "empresa": _constante(company_name, n),
+                    "fonte": _constante(fonte, n),
+                })
 
-    # ADICIONAR SARIMA (se existir)
-    if pred_sarima is not None and "data" in pred_sarima:
-        pred_sarima["data"] = pd.to_datetime(pred_sarima["data"])
-        sarima_long = pred_sarima.melt(
-            id_vars=["data"],
-            value_vars=["real", "previsto"],
-            var_name="modelo",
-            value_name="valor"
-        )
-        sarima_long["modelo"] = sarima_long["modelo"].replace(
-            {"real": "Valor Real", "previsto": "SARIMA"}
-        )
-        sarima_long["ano"] = sarima_long["data"].dt.year
-        sarima_long["mes"] = sarima_long["data"].dt.month
-        sarima_long["mes_nome"] = sarima_long["data"].dt.strftime("%b")
-        sarima_long["empresa"] = company_name
-        sarima_long["fonte"] = "SARIMA"
-        pred_long = pd.concat([pred_long, sarima_long], ignore_index=True)
-
-    
-    # RESUMO MENSAL CONSOLIDADO
-    resumo_mensal = (
-        pred_long.groupby(["ano", "mes", "modelo"], as_index=False)
-        .agg(media_valor=("valor", "mean"))
-        .sort_values(["ano", "mes"])
-    )
-
-    resumo_mensal["empresa"] = company_name
-
-    #TRATAMENTO DAS MÉTRICAS
-    if metrics_df is not None and not metrics_df.empty:
-        metrics = metrics_df.copy()
-        metrics["empresa"] = company_name
-        metrics["data_geracao"] = timestamp
-        metrics = metrics.rename(columns={
-            "target": "variavel_prevista",
-            "modelo": "modelo",
-            "MAE": "Erro Médio Absoluto (MAE)",
-            "RMSE": "Raiz do Erro Quadrático (RMSE)",
-            "MAPE": "Erro Percentual Médio (MAPE)",
-            "R2": "R²"
-        })
-    else:
-        metrics = pd.DataFrame()
-
-    # CRIAR ABA DE METADADOS
-    meta_info = pd.DataFrame({
-        "Chave": [
-            "Empresa",
-            "Data de Exportação",
-            "Total de Registros",
-            "Modelos Incluídos",
-        ],
-        "Valor": [
-            company_name,
-            timestamp,
-            len(pred_long),
-            ", ".join(pred_long["modelo"].unique())
-        ]
+            yield (fonte, modelo, ano), h.hexdigest()[:16], montar
+
+
+def resumo_da_particao(parte):
+    """Média mensal (ignorando NaN) de uma partição: ano, mes, modelo, media_valor, empresa."""
+    mes = parte["mes"].to_numpy()
+    valor = parte["valor"].to_numpy()
+    validos = ~np.isnan(valor)
+    soma = np.bincount(mes[validos] - 1, weights=valor[validos], minlength=12)
+    contagem = np.bincount(mes[validos] - 1, minlength=12)
+    presentes = np.flatnonzero(np.bincount(mes - 1, minlength=12))
+    with np.errstate(invalid="ignore"):
+        media = soma[presentes] / contagem[presentes]
+    return pd.DataFrame({
+        "ano": parte["ano"].iat[0],
+        "mes": presentes + 1,
+        "modelo": parte["modelo"].iat[0],
+        "media_valor": media,
+        "empresa": parte["empresa"].iat[0],
+        "fonte": parte["fonte"].iat[0],
     })
 
-    # SALVAR TUDO EM EXCEL MULTI-ABA
+
+# -----------------------
+# 2. Métricas e metadados
+# -----------------------
+def _metricas(metrics_df, company_name, timestamp):
+    if metrics_df is None or metrics_df.empty:
+        return pd.DataFrame()
+    return metrics_df.assign(empresa=company_name, data_geracao=timestamp).rename(columns={
+        "target": "variavel_prevista",
+        "MAE": "Erro Médio Absoluto (MAE)",
+        "RMSE": "Raiz do Erro Quadrático (RMSE)",
+        "MAPE": "Erro Percentual Médio (MAPE)",
+        "R2": "R²"
+    })
+
+
+def _metadados(company_name, timestamp, total, modelos):
+    return pd.DataFrame({
+        "Chave": ["Empresa", "Data de Exportação", "Total de Registros", "Modelos Incluídos"],
+        "Valor": [company_name, timestamp, total, ", ".join(modelos)],
+    })
+
+
+# -----------------------
+# 3. Exportação
+# -----------------------
+def _nome_particao(chave):
+    return "__".join(str(p).replace(" ", "_") for p in chave)
+
+
+def _gravar(df, pasta, nome, formato):
+    if formato == "csv":
+        pasta.mkdir(parents=True, exist_ok=True)
+        df.to_csv(pasta / f"{nome}.csv", index=False)
+    else:
+        salvar_parte(df, pasta, nome)
+
+
+def exportar_particionado(fontes, metrics_df, company_name, output_dir, formato="parquet", colunas_id=()):
+    """
+    Exportação incremental para o Power BI (conector de pasta): cada partição
+    fonte x modelo x ano vira um arquivo em previsoes/ e resumo_mensal/.
+    Um manifesto guarda o hash de cada partição; só as que mudaram desde a última
+    exportação são regravadas e as que deixaram de existir são apagadas.
+    Métricas e metadados (tabelas pequenas) são regravados sempre.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path_manifesto = output_dir / MANIFESTO
+    anterior = {}
+    if path_manifesto.exists():
+        with open(path_manifesto, encoding="utf-8") as f:
+            anterior = json.load(f)
+    if anterior.get("formato") != formato:
+        anterior = {}
+    hashes_anteriores = anterior.get("particoes", {})
+
+    atual, escritas, total, modelos = {}, [], 0, []
+    for fonte, df, modelo_map in fontes:
+        for chave, h, montar in particoes(df, modelo_map, fonte, company_name, colunas_id):
+            nome = _nome_particao(chave)
+            atual[nome] = {"hash": h, "linhas": None}
+            if chave[1] not in modelos:
+                modelos.append(chave[1])
+            if hashes_anteriores.get(nome, {}).get("hash") == h:
+                atual[nome]["linhas"] = hashes_anteriores[nome]["linhas"]
+            else:
+                parte = montar()
+                _gravar(parte, output_dir / "previsoes", nome, formato)
+                _gravar(resumo_da_particao(parte), output_dir / "resumo_mensal", nome, formato)
+                atual[nome]["linhas"] = len(parte)
+                escritas.append(nome)
+            total += atual[nome]["linhas"]
+
+    removidas = sorted(set(hashes_anteriores) - set(atual))
+    for nome in removidas:
+        for pasta in ("previsoes", "resumo_mensal"):
+            (output_dir / pasta / f"{nome}.{formato}").unlink(missing_ok=True)
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+    _gravar(_metricas(metrics_df, company_name, timestamp), output_dir, "metricas", formato)
+    # Parquet exige um tipo por coluna: valores dos metadados como texto
+    _gravar(_metadados(company_name, timestamp, total, modelos).astype(str), output_dir, "metadados", formato)
+
+    with open(path_manifesto, "w", encoding="utf-8") as f:
+        json.dump({"formato": formato, "particoes": atual}, f, indent=2)
+
+    print(f"Exportado: {len(escritas)} partição(ões) regravada(s), "
+          f"{len(atual) - len(escritas)} sem mudança, {len(removidas)} removida(s)")
+    return {"escritas": escritas, "removidas": removidas, "linhas": total}
+
+
+def exportar_excel_powerbi(fontes, metrics_df, company_name, output_path, colunas_id=()):
+    """Arquivo Excel com as quatro abas (para conjuntos pequenos)."""
+    partes = [montar() for fonte, df, modelo_map in fontes
+              for _, _, montar in particoes(df, modelo_map, fonte, company_name, colunas_id)]
+    pred_long = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    if len(pred_long) > LIMITE_LINHAS_EXCEL:
+        raise ValueError(f"{len(pred_long)} linhas não cabem numa aba do Excel; "
+                         "use um diretório como output_path (exportação particionada)")
+
+    resumo_mensal = pd.concat([resumo_da_particao(p) for p in partes], ignore_index=True)
+    resumo_mensal = resumo_mensal.sort_values(["ano", "mes", "modelo"], kind="stable").drop(columns="fonte")
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+    metrics = _metricas(metrics_df, company_name, timestamp)
+    meta_info = _metadados(company_name, timestamp, len(pred_long), pred_long["modelo"].unique())
+
     with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
         pred_long.to_excel(writer, sheet_name="Previsões", index=False)
         resumo_mensal.to_excel(writer, sheet_name="ResumoMensal", index=False)
@@ -122,3 +233,29 @@ def export_predictions_for_powerbi(
         "metricas": metrics,
         "metadados": meta_info
     }
+
+
+def export_predictions_for_powerbi(
+    pred_ml,
+    metrics_df,
+    pred_sarima=None,
+    company_name="Petroleira Gamarra",
+    output_path="../data/processed/predictions.xlsx",
+    formato="parquet",
+    colunas_id=()
+):
+    """
+    Exporta previsões e métricas dos modelos para o Power BI.
+
+    - output_path .xlsx: arquivo Excel multi-aba (Previsões, ResumoMensal,
+      MétricasModelos, Metadados), limitado ao tamanho de uma aba;
+    - output_path diretório: exportação particionada e incremental em Parquet ou
+      CSV (`formato`), que o Power BI carrega como pasta.
+    `colunas_id` mantém chaves extras (ex.: campo_id) em previsões por campo.
+    pred_ml / pred_sarima não são copiados nem alterados.
+    """
+    fontes = _fontes(pred_ml, pred_sarima)
+    if Path(output_path).suffix.lower() in (".xlsx", ".xls"):
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        return exportar_excel_powerbi(fontes, metrics_df, company_name, output_path, colunas_id)
+    return exportar_particionado(fontes, metrics_df, company_name, output_path, formato, colunas_id)
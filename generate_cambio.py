@@ -1,16 +1,23 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
+import sys
 
-def gerar_cambio(output_path=Path("data/raw/cambio.xlsx")):
-    """Gera série mensal do câmbio USD/BRL 2005-2025"""
-    np.random.seed(7)
+sys.path.append(str(Path(__file__).resolve().parent / "src" / "utils"))
+from storage import salvar_tabela
+
+def gerar_cambio(output_path=Path("data/raw/cambio.parquet"), seed=7, rng=None):
+    """
+    Gera série mensal do câmbio USD/BRL 2005-2025.
+    `rng` (numpy.random.Generator) tem prioridade sobre `seed` (int ou SeedSequence).
+    """
+    rng = np.random.default_rng(seed) if rng is None else rng
     
     dates = pd.date_range(start="2005-01", end="2025-12", freq="MS")
     
     # Tendência base + ruído
     base = 2.5 + 0.5 * np.sin(np.linspace(0, 10, len(dates)))
-    noise = np.random.normal(0, 0.1, len(dates))
+    noise = rng.normal(0, 0.1, len(dates))
     cambio = base + noise
     
     # Choques macroeconômicos
@@ -32,8 +39,7 @@ def gerar_cambio(output_path=Path("data/raw/cambio.xlsx")):
         "taxa_cambio": np.round(cambio, 2)
     })
     
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_excel(output_path, index=False)
+    salvar_tabela(df, output_path)
     print(f"Arquivo salvo em: {output_path}")
 
 # Permite rodar o script diretamente
@@ -2,35 +2,51 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from faker import Faker
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parent / "src" / "utils"))
+from storage import salvar_tabela
 
 fake = Faker("pt_BR")
 
-def gerar_campos(output_path=Path("data/raw/campos_petroliferos.xlsx"), n_campos=10):
-    """Gera lista de campos de petróleo fictícios"""
-    np.random.seed(21)
+def gerar_campos(output_path=Path("data/raw/campos_petroliferos.parquet"), n_campos=10, seed=21, rng=None):
+    """
+    Gera lista de campos de petróleo fictícios.
+    Os atributos são sorteados em bloco (vetorizado), o que permite gerar dezenas de
+    milhares de campos para testes de carga.
+    `rng` (numpy.random.Generator) tem prioridade sobre `seed` (int ou SeedSequence).
+    """
+    rng = np.random.default_rng(seed) if rng is None else rng
+    fake.seed_instance(int(rng.integers(2**32)))
     
     estados = ["RJ", "ES", "BA", "RN"]
     tipos = ["leve", "médio", "pesado"]
     
-    campos = []
-    for i in range(1, n_campos + 1):
-        nome = f"Campo {fake.word().capitalize()} {fake.color_name().split()[0]}"
-        estado = np.random.choice(estados)
-        tipo = np.random.choice(tipos, p=[0.4, 0.4, 0.2])
-        capacidade = np.random.randint(20000, 100000)  # barris/dia
-        ano_inicio = np.random.randint(2004, 2016)
-        mes_inicio = np.random.randint(1, 13)
-        data_inicio = pd.Timestamp(year=ano_inicio, month=mes_inicio, day=1)
-        
-        campos.append([i, nome, estado, tipo, capacidade, data_inicio])
+    # Nomes combinando um vocabulário limitado de palavras e cores do Faker
+    n_vocab = min(n_campos, 1000)
+    palavras = np.array([fake.word().capitalize() for _ in range(n_vocab)], dtype=object)
+    cores = np.array([fake.color_name().split()[0] for _ in range(n_vocab)], dtype=object)
+    nomes = "Campo " + palavras[rng.integers(0, n_vocab, n_campos)] + " " + cores[rng.integers(0, n_vocab, n_campos)]
+    ids = np.arange(1, n_campos + 1)
+    # Nomes sorteados repetidos recebem o id como sufixo (nomes únicos em qualquer tamanho)
+    repetidos = pd.Series(nomes).duplicated(keep=False).to_numpy()
+    nomes[repetidos] = nomes[repetidos] + " " + ids[repetidos].astype(str)
+    
+    ano_inicio = rng.integers(2004, 2016, n_campos)
+    mes_inicio = rng.integers(1, 13, n_campos)
     
-    df = pd.DataFrame(campos, columns=[
-        "id", "nome", "estado", "tipo_petroleo", "capacidade_barris_dia", "data_inicio"
-    ])
+    df = pd.DataFrame({
+        "id": ids,
+        "nome": nomes,
+        "estado": rng.choice(estados, n_campos),
+        "tipo_petroleo": rng.choice(tipos, n_campos, p=[0.4, 0.4, 0.2]),
+        "capacidade_barris_dia": rng.integers(20000, 100000, n_campos),  # barris/dia
+        "data_inicio": pd.to_datetime({"year": ano_inicio, "month": mes_inicio, "day": 1}),
+    })
     
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_excel(output_path, index=False)
+    salvar_tabela(df, output_path)
     print(f"Arquivo salvo em: {output_path}")
+    return df
 
 # Permite rodar o script diretamente
 if __name__ == "__main__":
@@ -1,17 +1,24 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
+import sys
 
-def gerar_preco_petroleo(output_path=Path("data/raw/preco_petroleo.xlsx")):
-    """Gera série mensal do preço do barril de petróleo (USD) 2005-2025"""
-    np.random.seed(42)
+sys.path.append(str(Path(__file__).resolve().parent / "src" / "utils"))
+from storage import salvar_tabela
+
+def gerar_preco_petroleo(output_path=Path("data/raw/preco_petroleo.parquet"), seed=42, rng=None):
+    """
+    Gera série mensal do preço do barril de petróleo (USD) 2005-2025.
+    `rng` (numpy.random.Generator) tem prioridade sobre `seed` (int ou SeedSequence).
+    """
+    rng = np.random.default_rng(seed) if rng is None else rng
     
     # Datas
     dates = pd.date_range(start="2005-01", end="2025-12", freq="MS")
     
     # Tendência base + ruído
     base_price = 60 + 15 * np.sin(np.linspace(0, 12, len(dates)))
-    noise = np.random.normal(0, 3, len(dates))
+    noise = rng.normal(0, 3, len(dates))
     price_usd = base_price + noise
     
     # Choques históricos
@@ -35,8 +42,7 @@ def gerar_preco_petroleo(output_path=Path("data/raw/preco_petroleo.xlsx")):
         "preco_barril_usd": np.round(price_usd, 2)
     })
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_excel(output_path, index=False)
+    salvar_tabela(df, output_path)
     print(f"Arquivo salvo em: {output_path}")
 
 # Permite rodar o script diretamente
@@ -1,60 +1,144 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from sklearn.linear_model import LinearRegression
+import sys
 
-# CONFIGURAÇÕES
-BASE_DIR = Path("..")
-DATA_PATH = Path("../data/processed/financials_consolidated.xlsx")
-MODEL_DIR = Path("../models")
-OUTPUT_FILE = Path("../data/processed/predictions.xlsx")
+sys.path.append(str(Path(__file__).resolve().parent / "src" / "utils"))
+sys.path.append(str(Path(__file__).resolve().parent / "src" / "ml"))
+from storage import ler_tabela, salvar_tabela
+
+# CONFIGURAÇÕES (relativas à raiz do projeto, não ao diretório de execução)
+BASE_DIR = Path(__file__).resolve().parent
+DATA_PATH = BASE_DIR / "data" / "processed" / "financials_consolidated"
+MODEL_DIR = BASE_DIR / "models"
+REGISTRY_DIR = MODEL_DIR / "registry"
+OUTPUT_FILE = BASE_DIR / "data" / "processed" / "predictions_forecast.parquet"
 
 TARGETS = ["target_producao_next", "target_receita_next"]
 HORIZON = 12  # meses futuros
+VALUE_COLS = ["producao_total_barris", "receita_total_brl",
+              "custo_operacional_total_brl", "custo_geral_total_brl", "lucro_total_brl"]
+MODELOS = ["linear", "quadratica", "sazonal", "media"]
+# Variável prevista por cada target dos modelos de ML (valor do mês seguinte)
+ML_TARGETS = {"producao_total_barris": "target_producao_next", "receita_total_brl": "target_receita_next"}
+
+
+def design_matrix(t, meses, modelo):
+    """
+    Matriz de desenho compartilhada por todas as séries:
+      - linear: intercepto + tendência
+      - quadratica: intercepto + tendência + tendência²
+      - sazonal: intercepto + tendência + dummies de mês
+      - media: só intercepto
+    """
+    t = np.asarray(t, dtype=float)
+    cols = [np.ones_like(t)]
+    if modelo in ("linear", "quadratica", "sazonal"):
+        cols.append(t)
+    if modelo == "quadratica":
+        cols.append(t ** 2)
+    if modelo == "sazonal":
+        meses = np.asarray(meses)
+        cols.extend((meses == m).astype(float) for m in range(2, 13))
+    if modelo not in MODELOS:
+        raise ValueError(f"Modelo desconhecido: {modelo}")
+    return np.column_stack(cols)
 
 
-def generate_predictions():
+def fit_predict(X, Y, X_futuro):
     """
-    Gera previsões simples para os próximos 12 meses com base nas médias móveis.
-    Usa regressão linear simples como baseline para projeções financeiras.
+    Ajusta todas as colunas de Y (tempo x séries) num único mínimos quadrados
+    multi-saída. Séries com NaN são agrupadas pelo padrão de valores ausentes e
+    cada grupo é resolvido com as linhas que tem.
+    Retorna (horizonte x séries).
     """
+    Y = np.asarray(Y, dtype=float)
+    previsto = np.full((len(X_futuro), Y.shape[1]), np.nan)
+    validos = ~np.isnan(Y)
+    # Padrão de ausência de cada série como bytes (bits empacotados) para agrupar
+    bits = np.packbits(validos.T, axis=1)
+    grupo, _ = pd.factorize(np.array([b.tobytes() for b in bits], dtype=object))
+    for i in range(grupo.max() + 1):
+        cols = np.flatnonzero(grupo == i)
+        linhas = validos[:, cols[0]]
+        if linhas.sum() < X.shape[1]:
+            continue  # histórico insuficiente para o modelo
+        coef, *_ = np.linalg.lstsq(X[linhas], Y[np.ix_(linhas, cols)], rcond=None)
+        previsto[:, cols] = X_futuro @ coef
+    return previsto
 
-    # Carregar dados
-    df = pd.read_excel(DATA_PATH)
+
+def forecast_batch(df, value_cols=VALUE_COLS, horizon=HORIZON, modelos=("linear",), group_col=None):
+    """
+    Previsão de `horizon` meses para todas as colunas (e todos os grupos, ex.:
+    campo_id) de uma vez. Retorna formato longo:
+    data, [group_col], variavel, modelo, previsto.
+    """
+    df = df.copy()
     df["data"] = pd.to_datetime(df["data"])
-    df = df.sort_values("data")
+    if group_col is None:
+        wide = df.groupby("data")[value_cols].sum(min_count=1).sort_index()
+    else:
+        # min_count=1: meses sem valor continuam NaN (não viram zero)
+        wide = df.groupby(["data", group_col], observed=True)[value_cols].sum(min_count=1).unstack(group_col)
+        wide = wide.sort_index()
+    wide = wide.reindex(pd.date_range(wide.index[0], wide.index[-1], freq="MS"))
 
-    #Criar variáveis de tempo
-    df["t"] = np.arange(len(df))  # contador temporal
+    t = np.arange(len(wide))
+    future_months = pd.date_range(wide.index[-1] + pd.offsets.MonthBegin(), periods=horizon, freq="MS")
+    t_futuro = np.arange(len(wide), len(wide) + horizon)
 
-    #Prever cada variável numérica com regressão linear
+    colunas = wide.columns
     results = []
-    future_months = pd.date_range(df["data"].iloc[-1] + pd.offsets.MonthBegin(),
-                                  periods=HORIZON, freq="MS")
-
-    for col in ["producao_total_barris", "receita_total_brl",
-                "custo_operacional_total_brl", "custo_geral_total_brl", "lucro_total_brl"]:
-        model = LinearRegression()
-        model.fit(df[["t"]], df[col])
-
-        future_t = pd.DataFrame(
-            {"t": np.arange(len(df), len(df) + HORIZON)}
-        )
-        preds = model.predict(future_t)
-
-        tmp = pd.DataFrame({
-            "data": future_months,
-            "variavel": col,
-            "previsto": preds
-        })
+    for modelo in modelos:
+        X = design_matrix(t, wide.index.month, modelo)
+        X_futuro = design_matrix(t_futuro, future_months.month, modelo)
+        previsto = fit_predict(X, wide.to_numpy(), X_futuro)
+
+        # Formato longo direto dos arrays (linha = mês x coluna)
+        tmp = pd.DataFrame({"data": np.repeat(future_months, len(colunas)), "previsto": previsto.ravel()})
+        if group_col is None:
+            tmp["variavel"] = np.tile(colunas, horizon)
+        else:
+            tmp["variavel"] = np.tile(colunas.get_level_values(0), horizon)
+            tmp[group_col] = np.tile(colunas.get_level_values(1), horizon)
+        tmp["modelo"] = modelo
         results.append(tmp)
 
-    #Consolidar resultados
-    forecast_df = pd.concat(results, ignore_index=True)
+    ordem = ["data"] + ([group_col] if group_col else []) + ["variavel", "modelo", "previsto"]
+    return pd.concat(results, ignore_index=True)[ordem]
 
-    #Salvar Excel
-    output_path = BASE_DIR / "data" / "processed" / "predictions.xlsx"
-    forecast_df.to_excel(output_path, index=False)
-    print(f" Previsões salvas em: {output_path}")
+
+def generate_predictions(data_path=DATA_PATH, output_file=OUTPUT_FILE, horizon=HORIZON,
+                         modelos=("linear",), value_cols=VALUE_COLS, group_col=None):
+    """
+    Gera previsões para os próximos `horizon` meses de todas as colunas de uma vez.
+    O padrão (regressão linear na tendência) é a projeção baseline das séries
+    financeiras; `group_col="campo_id"` sobre producao_financeiro prevê cada campo.
+    """
+    df = ler_tabela(data_path, colunas=["data"] + ([group_col] if group_col else []) + list(value_cols))
+    forecast_df = forecast_batch(df, value_cols=value_cols, horizon=horizon, modelos=modelos, group_col=group_col)
+
+    #Salvar previsões
+    salvar_tabela(forecast_df, output_file)
+    print(f" Previsões salvas em: {output_file}")
 
     return forecast_df
+
+
+def ml_predictions(df_agg, registry_dir=REGISTRY_DIR, models=("RandomForest", "XGBoost")):
+    """
+    Previsões dos modelos de ML do registro (sem retreino) para o mês seguinte a
+    cada mês de `df_agg` (financials_consolidated), em formato longo
+    (data, variavel, modelo, previsto), com `data` = mês previsto.
+    """
+    # Dependências de ML só quando as previsões dos modelos são pedidas
+    from features import build_features
+    from prepare_dataset import add_temporal_features
+    from registry import predict_frame
+
+    df = add_temporal_features(build_features(df_agg))
+    pred = predict_frame(df, list(ML_TARGETS.values()), models, str(registry_dir))
+    pred["data"] = pred["data"] + pd.DateOffset(months=1)
+    pred["variavel"] = pred["target"].map({t: v for v, t in ML_TARGETS.items()})
+    return pred[["data", "variavel", "modelo", "previsto"]]
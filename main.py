@@ -0,0 +1,431 @@
+"""
+Ponto de entrada do pipeline da Petroleira Gamarra.
+
+Declara as etapas como um grafo de dependências e executa apenas as que mudaram
+(código, parâmetros, seeds ou dados de entrada) desde a última execução:
+
+    preço / câmbio / campos → produção → custos → financeiro
+    preço / câmbio / campos → cenários (Monte Carlo do lucro)
+        → dataset (features) → baseline / sarima / ml / backtest → métricas → exportação
+    financeiro → hierárquico (previsão por campo) → métricas
+    financeiro → validação (sanity checks em JSON/Parquet)
+    financeiro → cubo (agregados por ano/mês/estado/tipo/campo para dashboards)
+
+Uso:
+    python main.py                       # executa o que estiver desatualizado
+    python main.py --etapas custos       # só custos (e o que ele precisar)
+    python main.py --forcar ml           # reexecuta os modelos de ML mesmo com cache válido
+    python main.py --workers 4           # etapas independentes em 4 processos
+    python main.py --tuning 20           # busca de hiperparâmetros (20 trials por modelo)
+    python main.py --campos 50000 --particionado   # teste de carga: produção em lotes (diretório Parquet)
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+SRC = BASE_DIR / "src"
+for subdir in ["data_generation", "ml", "utils"]:
+    sys.path.append(str(SRC / subdir))
+
+import compute_financials
+import rollups
+import generate_custos
+import generate_producao_mensal
+import scenarios
+from generate_cambio import gerar_cambio
+from generate_campos import gerar_campos
+from generate_preco_petroleo import gerar_preco_petroleo
+from generate_predictions_script import generate_predictions, ml_predictions, ML_TARGETS
+from export_predictions_for_powerbi import export_predictions_for_powerbi
+from prepare_dataset import prepare_ml_dataset
+from train_baseline import train_baseline_models
+from train_ml_models import train_ml_models
+from tuning import tune_models
+from multistep import multistep_forecast
+from train_time_series import train_time_series_models
+from hierarchical import train_hierarchical_models
+from backtest import run_backtest
+from organize_metrics import consolidate_metrics
+from storage import ler_tabela
+from sanity_checks import (executar_checagens, salvar_relatorio_checagens, imprimir_checagens,
+                           CONFIG_CAMPO, CONFIG_CONSOLIDADO)
+from pipeline import executar_pipeline, imprimir_resumo, CACHE_DIR_PADRAO
+
+RAW = BASE_DIR / "data" / "raw"
+PROCESSED = BASE_DIR / "data" / "processed"
+MODELS = BASE_DIR / "models"
+
+PERIODO = {"start": "2005-01", "end": "2025-12"}
+
+
+# -----------------------
+# 1. Etapas
+# -----------------------
+def etapa_preco(entradas, saidas, seed):
+    gerar_preco_petroleo(output_path=saidas["preco"], seed=seed)
+
+
+def etapa_cambio(entradas, saidas, seed):
+    gerar_cambio(output_path=saidas["cambio"], seed=seed)
+
+
+def etapa_campos(entradas, saidas, n_campos, seed):
+    gerar_campos(output_path=saidas["campos"], n_campos=n_campos, seed=seed)
+
+
+def etapa_producao(entradas, saidas, seed, start, end, tamanho_lote):
+    campos, preco, cambio = generate_producao_mensal.carregar_dados(
+        entradas["campos"], entradas["preco"], entradas["cambio"]
+    )
+    preco_df = generate_producao_mensal.merge_preco_cambio(preco, cambio)
+    if tamanho_lote:
+        # Modo de carga: um Parquet por lote de campos, sem materializar a produção inteira
+        generate_producao_mensal.gerar_producao_particionada(
+            campos, preco_df, saidas["producao"], start=start, end=end, tamanho_lote=tamanho_lote, seed=seed
+        )
+        return
+    df = generate_producao_mensal.gerar_producao_total(campos, preco_df, start=start, end=end, seed=seed)
+    generate_producao_mensal.salvar_arquivos(df, saidas["producao"])
+
+
+def etapa_custos(entradas, saidas, custo_var_brl_por_barril, custo_fixo_por_barris_dia,
+                 custo_admin_base, custo_manut_base, custo_logistica_base, start, end):
+    df_prod = compute_financials.calcular_custos_operacionais(
+        ler_tabela(entradas["producao"]), custo_var_brl_por_barril, custo_fixo_por_barris_dia
+    )
+    df_custos_gerais = generate_custos.gerar_custos_gerais(
+        start=start, end=end,
+        custo_admin_base=custo_admin_base,
+        custo_manut_base=custo_manut_base,
+        custo_logistica_base=custo_logistica_base,
+    )
+    generate_custos.salvar_arquivos(df_custos_gerais, df_prod, saidas["custos_gerais"], saidas["producao_custos"])
+
+
+def etapa_cenarios(entradas, saidas, n_cenarios, n_meses, seed, custo_var_brl_por_barril, custo_fixo_por_barris_dia):
+    scenarios.gerar_cenarios(
+        ler_tabela(entradas["campos"]), ler_tabela(entradas["preco"]), ler_tabela(entradas["cambio"]),
+        n_meses=n_meses, n_cenarios=n_cenarios, seed=seed, output_path=saidas["cenarios"],
+        custo_var_brl_por_barril=custo_var_brl_por_barril, custo_fixo_por_barris_dia=custo_fixo_por_barris_dia,
+    )
+
+
+def etapa_financeiro(entradas, saidas, motor):
+    if motor == "sql":
+        # Consolidação no DuckDB, direto dos arquivos (entradas maiores que a memória)
+        compute_financials.consolidar_financeiro_sql(entradas["producao_custos"], entradas["custos_gerais"],
+                                                     saidas["producao_financeiro"], saidas["financeiro"])
+        return
+    # Store mensal: só os meses novos ou com entrada alterada são recalculados e regravados
+    compute_financials.atualizar_financeiro_incremental(
+        ler_tabela(entradas["producao_custos"]), ler_tabela(entradas["custos_gerais"]),
+        saidas["producao_financeiro"], saidas["financeiro"], sincronizar=True,
+    )
+
+
+def etapa_cubo(entradas, saidas):
+    rollups.materializar_cubo(ler_tabela(entradas["producao_financeiro"]), saidas["cubo"])
+
+
+def etapa_validacao(entradas, saidas, n_workers, linhas_por_lote):
+    relatorio = pd.concat([
+        executar_checagens(entradas["producao_financeiro"], CONFIG_CAMPO, n_workers, linhas_por_lote),
+        executar_checagens(entradas["financeiro"], CONFIG_CONSOLIDADO, n_workers, linhas_por_lote),
+    ], ignore_index=True)
+    imprimir_checagens(relatorio)
+    salvar_relatorio_checagens(relatorio, saidas["relatorio_json"])
+    salvar_relatorio_checagens(relatorio, saidas["relatorio_parquet"])
+
+
+def etapa_dataset(entradas, saidas):
+    # Features calculadas em memória (features.build_features), sem CSV intermediário
+    prepare_ml_dataset(BASE_DIR, ler_tabela(entradas["financeiro"]))
+
+
+def etapa_baseline(entradas, saidas):
+    train_baseline_models(entradas["dataset"], base_dir=BASE_DIR)
+
+
+def etapa_sarima(entradas, saidas):
+    train_time_series_models(pd.read_csv(entradas["dataset"]), base_dir=BASE_DIR)
+
+
+def etapa_ml(entradas, saidas, n_trials):
+    # n_trials > 0: busca de hiperparâmetros (retomável) antes do treino final
+    params = tune_models(entradas["dataset"], n_trials=n_trials, models_dir=MODELS) if n_trials else None
+    train_ml_models(entradas["dataset"], models_dir=MODELS, params=params)
+
+
+def etapa_multistep(entradas, saidas, horizon):
+    multistep_forecast(ler_tabela(entradas["financeiro"]), horizon=horizon,
+                       registry_dir=MODELS / "registry", output_file=saidas["previsoes_multistep"])
+
+
+def etapa_backtest(entradas, saidas, initial, horizon, step, window):
+    run_backtest(pd.read_csv(entradas["dataset"]), initial=initial, horizon=horizon, step=step,
+                 window=window, base_dir=BASE_DIR)
+
+
+def etapa_hierarquico(entradas, saidas, targets, horizon):
+    df_prod = ler_tabela(entradas["producao_financeiro"])
+    train_hierarchical_models(df_prod, targets=targets, horizon=horizon, base_dir=BASE_DIR)
+
+
+def etapa_metricas(entradas, saidas):
+    consolidate_metrics(base_dir=MODELS, output_file=saidas["metricas"])
+
+
+def etapa_exportar(entradas, saidas, variavel, company_name, formato):
+    forecast_df = generate_predictions(data_path=entradas["financeiro"], output_file=saidas["previsoes"])
+
+    df_agg = ler_tabela(entradas["financeiro"])
+    futuro = forecast_df.loc[forecast_df["variavel"] == variavel, ["data", "previsto"]]
+    pred_ml = pd.merge(
+        df_agg[["data", variavel]].rename(columns={variavel: "real"}),
+        futuro.rename(columns={"previsto": "rf_previsto"}),
+        on="data",
+        how="outer",
+    ).sort_values("data").reset_index(drop=True)
+
+    pred_ml["xgb_previsto"] = pd.NA
+    if variavel in ML_TARGETS:
+        # Histórico: previsão um mês à frente dos modelos de ML do registro (sem
+        # retreino); meses futuros do rf_previsto seguem a projeção de tendência
+        ml = ml_predictions(df_agg, registry_dir=MODELS / "registry")
+        ml = ml[ml["variavel"] == variavel].pivot(index="data", columns="modelo", values="previsto")
+        pred_ml["rf_previsto"] = pred_ml["rf_previsto"].fillna(pred_ml["data"].map(ml["RandomForest"]))
+        pred_ml["xgb_previsto"] = pred_ml["data"].map(ml["XGBoost"])
+
+    export_predictions_for_powerbi(
+        pred_ml=pred_ml[["data", "real", "rf_previsto", "xgb_previsto"]],
+        metrics_df=pd.read_csv(entradas["metricas"]),
+        company_name=company_name,
+        output_path=saidas["powerbi"],
+        formato=formato,
+    )
+
+
+# -----------------------
+# 2. Grafo do pipeline
+# -----------------------
+DATA_GENERATION = SRC / "data_generation"
+ML = SRC / "ml"
+UTILS = SRC / "utils"
+# Etapas que leem ou gravam pelo storage também dependem do seu código (formatos e dtypes)
+STORAGE = UTILS / "storage.py"
+
+ETAPAS = {
+    "preco": {
+        "funcao": etapa_preco,
+        "params": {"seed": 42},
+        "saidas": {"preco": RAW / "preco_petroleo.parquet"},
+        "codigo": [BASE_DIR / "generate_preco_petroleo.py", STORAGE],
+    },
+    "cambio": {
+        "funcao": etapa_cambio,
+        "params": {"seed": 7},
+        "saidas": {"cambio": RAW / "cambio.parquet"},
+        "codigo": [BASE_DIR / "generate_cambio.py", STORAGE],
+    },
+    "campos": {
+        "funcao": etapa_campos,
+        "params": {"n_campos": 10, "seed": 21},
+        "saidas": {"campos": RAW / "campos_petroliferos.parquet"},
+        "codigo": [BASE_DIR / "generate_campos.py", STORAGE],
+    },
+    "producao": {
+        "depende_de": ["preco", "cambio", "campos"],
+        "funcao": etapa_producao,
+        "params": {"seed": 123, "tamanho_lote": None, **PERIODO},  # tamanho_lote: ver --particionado
+        "saidas": {"producao": RAW / "producao_mensal.parquet"},
+        "codigo": [DATA_GENERATION / "generate_producao_mensal.py", STORAGE],
+    },
+    "custos": {
+        "depende_de": ["producao"],
+        "funcao": etapa_custos,
+        "params": {
+            "custo_var_brl_por_barril": 50,
+            "custo_fixo_por_barris_dia": 5000,
+            "custo_admin_base": 50000,
+            "custo_manut_base": 40000,
+            "custo_logistica_base": 30000,
+            **PERIODO,
+        },
+        "saidas": {
+            "producao_custos": RAW / "producao_custos.parquet",
+            "custos_gerais": RAW / "custos_gerais.parquet",
+        },
+        "codigo": [DATA_GENERATION / "generate_custos.py", DATA_GENERATION / "compute_financials.py", STORAGE],
+    },
+    # Distribuição do lucro (P10/P50/P90) em cenários de preço, câmbio e produção
+    "cenarios": {
+        "depende_de": ["preco", "cambio", "campos"],
+        "funcao": etapa_cenarios,
+        "params": {
+            "n_cenarios": 10000,
+            "n_meses": 12,
+            "seed": 99,
+            "custo_var_brl_por_barril": 50,
+            "custo_fixo_por_barris_dia": 5000,
+        },
+        "saidas": {"cenarios": PROCESSED / "cenarios_lucro.parquet"},
+        "codigo": [DATA_GENERATION / "scenarios.py", DATA_GENERATION / "generate_producao_mensal.py", STORAGE],
+    },
+    "financeiro": {
+        "depende_de": ["custos"],
+        "funcao": etapa_financeiro,
+        "params": {"motor": "pandas"},  # "sql": consolidação no DuckDB
+        "saidas": {
+            # Diretórios com um Parquet por mês (mes-AAAA-MM.parquet) e _manifesto.json
+            "producao_financeiro": PROCESSED / "producao_financeiro",
+            "financeiro": PROCESSED / "financials_consolidated",
+        },
+        "codigo": [DATA_GENERATION / "compute_financials.py", UTILS / "query.py", STORAGE],
+    },
+    # Agregados materializados por ano / mês / estado / tipo de petróleo / campo
+    "cubo": {
+        "depende_de": ["financeiro"],
+        "funcao": etapa_cubo,
+        "saidas": {"cubo": PROCESSED / "cubo"},
+        "codigo": [DATA_GENERATION / "rollups.py", STORAGE],
+    },
+    # Checagens de sanidade (cobertura, ausentes, correlação, identidade do lucro)
+    "validacao": {
+        "depende_de": ["financeiro"],
+        "funcao": etapa_validacao,
+        "params": {"n_workers": 1, "linhas_por_lote": 1_000_000},
+        "saidas": {
+            "relatorio_json": BASE_DIR / "docs" / "sanity_checks.json",
+            "relatorio_parquet": BASE_DIR / "docs" / "sanity_checks.parquet",
+        },
+        "codigo": [UTILS / "sanity_checks.py", STORAGE],
+    },
+    "dataset": {
+        "depende_de": ["financeiro"],
+        "funcao": etapa_dataset,
+        "saidas": {"dataset": PROCESSED / "ml_dataset.csv"},
+        "codigo": [ML / "features.py", ML / "prepare_dataset.py", STORAGE],
+    },
+    # As três famílias de modelos só dependem do dataset e rodam em paralelo
+    "baseline": {
+        "depende_de": ["dataset"],
+        "funcao": etapa_baseline,
+        "saidas": {
+            "previsoes_baseline": PROCESSED / "predictions_baseline.csv",
+            "relatorio_baseline": BASE_DIR / "reports" / "performance_baseline.xlsx",
+        },
+        "codigo": [ML / "train_baseline.py"],
+    },
+    "sarima": {
+        "depende_de": ["dataset"],
+        "funcao": etapa_sarima,
+        "saidas": {
+            "metricas_sarima": MODELS / "time_series_metrics.csv",
+            "previsoes_sarima": PROCESSED / "predictions_time_series.csv",
+        },
+        "codigo": [ML / "train_time_series.py"],
+    },
+    "ml": {
+        "depende_de": ["dataset"],
+        "funcao": etapa_ml,
+        "params": {"n_trials": 0},
+        "saidas": {
+            "metricas_rf": MODELS / "ml__rf_metrics.csv",
+            "metricas_xgb": MODELS / "ml_xgb_metrics.csv",
+        },
+        "codigo": [ML / "train_ml_models.py", ML / "tuning.py", ML / "registry.py"],
+    },
+    # Horizonte longo com os modelos de árvore do registro (previsão recursiva)
+    "multistep": {
+        "depende_de": ["financeiro", "ml"],
+        "funcao": etapa_multistep,
+        "params": {"horizon": 36},
+        "saidas": {"previsoes_multistep": PROCESSED / "predictions_multistep.parquet"},
+        "codigo": [ML / "multistep.py", ML / "registry.py", STORAGE],
+    },
+    # Avaliação walk-forward (várias origens) sobre treino + validação
+    "backtest": {
+        "depende_de": ["dataset"],
+        "funcao": etapa_backtest,
+        "params": {"initial": 120, "horizon": 12, "step": 12, "window": "expanding"},
+        "saidas": {
+            "metricas_backtest": MODELS / "backtest_metrics.csv",
+            "folds_backtest": MODELS / "backtest_folds.csv",
+        },
+        "codigo": [ML / "backtest.py", ML / "train_baseline.py"],
+    },
+    # Previsão por campo reconciliada para estado / tipo de petróleo / total
+    "hierarquico": {
+        "depende_de": ["financeiro"],
+        "funcao": etapa_hierarquico,
+        "params": {"targets": ["producao_barris", "lucro_liquido_brl"], "horizon": 12},
+        "saidas": {
+            "metricas_hierarquico": MODELS / "hierarchical_metrics.csv",
+            "metricas_hierarquico_niveis": MODELS / "hierarchical_levels.csv",
+            "previsoes_hierarquico": PROCESSED / "predictions_hierarchical.parquet",
+        },
+        "codigo": [ML / "hierarchical.py", STORAGE],
+    },
+    "metricas": {
+        "depende_de": ["baseline", "sarima", "ml", "backtest", "hierarquico"],
+        "funcao": etapa_metricas,
+        "saidas": {"metricas": MODELS / "all_metrics.csv"},
+        "codigo": [ML / "organize_metrics.py"],
+    },
+    "exportar": {
+        "depende_de": ["financeiro", "ml", "metricas"],
+        "funcao": etapa_exportar,
+        # Pasta particionada (Parquet/CSV) com exportação incremental para o Power BI
+        "params": {"variavel": "producao_total_barris", "company_name": "Petroleira Gamarra", "formato": "parquet"},
+        "saidas": {
+            "previsoes": PROCESSED / "predictions_forecast.parquet",
+            "powerbi": PROCESSED / "powerbi",
+        },
+        "codigo": [BASE_DIR / "generate_predictions_script.py", BASE_DIR / "export_predictions_for_powerbi.py",
+                   ML / "registry.py", ML / "features.py", ML / "prepare_dataset.py", STORAGE],
+    },
+}
+
+
+# -----------------------
+# 3. CLI
+# -----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline de dados e modelos da Petroleira Gamarra")
+    parser.add_argument("--etapas", nargs="+", choices=list(ETAPAS), help="Executa só estas etapas (e suas dependências)")
+    parser.add_argument("--forcar", nargs="*", choices=list(ETAPAS),
+                        help="Ignora o cache destas etapas (sem nomes: todas)")
+    parser.add_argument("--cache-dir", type=Path, default=BASE_DIR / CACHE_DIR_PADRAO)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processos para etapas independentes (1 = sequencial)")
+    parser.add_argument("--tuning", type=int, default=0, metavar="N_TRIALS",
+                        help="Busca de hiperparâmetros com N trials por modelo antes do treino de ML")
+    parser.add_argument("--campos", type=int, metavar="N", help="Número de campos gerados (padrão: 10)")
+    parser.add_argument("--particionado", type=int, nargs="?", const=500, metavar="CAMPOS_POR_LOTE",
+                        help="Gera a produção em lotes de campos num diretório Parquet (datasets grandes)")
+    args = parser.parse_args(argv)
+    ETAPAS["ml"]["params"]["n_trials"] = args.tuning
+    if args.campos is not None:
+        ETAPAS["campos"]["params"]["n_campos"] = args.campos
+    if args.particionado:
+        ETAPAS["producao"]["params"]["tamanho_lote"] = args.particionado
+        ETAPAS["producao"]["saidas"]["producao"] = RAW / "producao_mensal"
+
+    forcar = list(ETAPAS) if args.forcar == [] else (args.forcar or [])
+    resumo = executar_pipeline(ETAPAS, cache_dir=args.cache_dir, alvos=args.etapas, forcar=forcar,
+                               n_workers=args.workers)
+
+    imprimir_resumo(resumo)
+    executadas = [r["etapa"] for r in resumo if r["status"] == "executada"]
+    em_cache = [r["etapa"] for r in resumo if r["status"] == "cache"]
+    print(f"\n✅ Pipeline concluído: {len(executadas)} etapa(s) executada(s), {len(em_cache)} em cache")
+    return resumo
+
+
+if __name__ == "__main__":
+    main()
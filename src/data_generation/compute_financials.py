@@ -1,4 +1,17 @@
+import hashlib
+import json
 import pandas as pd
+import numpy as np
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from storage import ler_tabela, salvar_parte, listar_partes
+
+try:
+    import numexpr as ne
+except ImportError:  # numexpr é opcional
+    ne = None
 
 # -----------------------
 # 1. Distribuir custos gerais para cada campo
@@ -6,21 +19,10 @@ import pandas as pd
 def aplicar_share_custos_gerais(df_prod, df_custos_gerais):
     """
     Distribui custos gerais para cada linha de produção proporcionalmente à produção do mês.
+    Retorna uma cópia de df_prod com admin/manutenção/logística, os share_* e
+    custo_geral_brl (calculados por alocar_custos_gerais, sem o lucro).
     """
-    # Merge df_prod com custos gerais por data
-    df = df_prod.merge(df_custos_gerais, on="data", how="left")
-    
-    # Total produção por mês
-    total_producao_mes = df.groupby("data")["producao_barris"].transform("sum")
-    
-    # Share proporcional para cada campo
-    df["share_admin"] = df["producao_barris"] / total_producao_mes * df["admin_brl"]
-    df["share_manut"] = df["producao_barris"] / total_producao_mes * df["manutencao_brl"]
-    df["share_logistica"] = df["producao_barris"] / total_producao_mes * df["logistica_brl"]
-    
-    # Soma dos custos gerais alocados
-    df["custo_geral_brl"] = df["share_admin"] + df["share_manut"] + df["share_logistica"]
-    return df
+    return alocar_custos_gerais(df_prod.copy(), df_custos_gerais, manter_shares=True, calcular_lucro=False)
 
 # -----------------------
 # 2. Calcular lucro líquido
@@ -49,10 +51,334 @@ def consolidar_agregados(df):
     return df_agg
 
 # -----------------------
-# 4. Salvar arquivos
+# 4. Kernel fundido de custos e lucro
+# -----------------------
+def _usar_numexpr(usar_numexpr):
+    usar_numexpr = (ne is not None) if usar_numexpr is None else usar_numexpr
+    if usar_numexpr and ne is None:
+        raise ImportError("numexpr não está instalado")
+    return usar_numexpr
+
+def calcular_custos_operacionais(df_prod, custo_var_brl_por_barril=50, custo_fixo_por_barris_dia=5000,
+                                 usar_numexpr=None):
+    """
+    Custos operacionais por linha, escritos diretamente em df_prod:
+    custo_variavel_brl (por barril), custo_fixo_brl (meses com produção),
+    custo_operacional e margem_bruta = receita - custo_operacional.
+    """
+    producao = df_prod["producao_barris"].to_numpy(dtype=float)
+    receita = df_prod["receita"].to_numpy(dtype=float)
+    cv, cf = float(custo_var_brl_por_barril), float(custo_fixo_por_barris_dia)
+    if _usar_numexpr(usar_numexpr):
+        custo_variavel = ne.evaluate("producao * cv")
+        custo_fixo = ne.evaluate("where(producao > 0, cf, 0.0)")
+        custo_operacional = ne.evaluate("custo_variavel + custo_fixo")
+        margem_bruta = ne.evaluate("receita - custo_operacional")
+    else:
+        custo_variavel = producao * cv
+        custo_fixo = np.where(producao > 0, cf, 0.0)
+        custo_operacional = custo_variavel + custo_fixo
+        margem_bruta = receita - custo_operacional
+
+    df_prod["custo_variavel_brl"] = custo_variavel
+    df_prod["custo_fixo_brl"] = custo_fixo
+    df_prod["custo_operacional"] = custo_operacional
+    df_prod["margem_bruta"] = margem_bruta
+    return df_prod
+
+def alocar_custos_gerais(df_prod, df_custos_gerais, manter_shares=False, calcular_lucro=True,
+                         usar_numexpr=None):
+    """
+    Rateia os custos gerais do mês pela fração da produção de cada linha e,
+    se df_prod já tem custo_operacional, calcula
+    lucro_liquido_brl = receita - custo_operacional - custo_geral_brl,
+    escrevendo as colunas diretamente em df_prod.
+
+    Os custos gerais do mês são buscados por índice (sem merge) e o total produzido
+    no mês vem de um bincount, sem groupby. Com manter_shares=True também grava
+    admin/manutenção/logística e os share_* intermediários; calcular_lucro=False
+    grava só o rateio.
+    """
+    # Posição de cada linha na tabela de custos gerais (um mês por linha)
+    datas = pd.DatetimeIndex(df_prod["data"])
+    custos = df_custos_gerais.set_index(pd.DatetimeIndex(df_custos_gerais["data"]))
+    codigos = custos.index.get_indexer(datas)
+    if (codigos < 0).any():
+        faltantes = datas[codigos < 0].unique()
+        raise ValueError(f"Custos gerais ausentes para: {[m.strftime('%Y-%m') for m in faltantes[:5]]}")
+
+    producao = df_prod["producao_barris"].to_numpy(dtype=float)
+    calcular_lucro = calcular_lucro and "custo_operacional" in df_prod.columns
+
+    # Fração da produção do mês de cada linha
+    total_mes = np.bincount(codigos, weights=producao, minlength=len(custos))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fracao = producao / total_mes[codigos]
+
+    admin = custos["admin_brl"].to_numpy(dtype=float)[codigos]
+    manut = custos["manutencao_brl"].to_numpy(dtype=float)[codigos]
+    logistica = custos["logistica_brl"].to_numpy(dtype=float)[codigos]
+
+    usar_numexpr = _usar_numexpr(usar_numexpr)
+    if usar_numexpr:
+        custo_geral = ne.evaluate("fracao * (admin + manut + logistica)")
+    else:
+        custo_geral = fracao * (admin + manut + logistica)
+
+    if manter_shares:
+        df_prod["admin_brl"] = admin
+        df_prod["manutencao_brl"] = manut
+        df_prod["logistica_brl"] = logistica
+        df_prod["share_admin"] = fracao * admin
+        df_prod["share_manut"] = fracao * manut
+        df_prod["share_logistica"] = fracao * logistica
+    df_prod["custo_geral_brl"] = custo_geral
+
+    if calcular_lucro:
+        receita = df_prod["receita"].to_numpy(dtype=float)
+        custo_operacional = df_prod["custo_operacional"].to_numpy(dtype=float)
+        if usar_numexpr:
+            df_prod["lucro_liquido_brl"] = ne.evaluate("receita - custo_operacional - custo_geral")
+        else:
+            df_prod["lucro_liquido_brl"] = receita - custo_operacional - custo_geral
+    return df_prod
+
+def calcular_financeiro_fundido(df_prod, df_custos_gerais, custo_var_brl_por_barril=50,
+                                custo_fixo_por_barris_dia=5000, manter_shares=False, usar_numexpr=None):
+    """
+    Custos operacionais, rateio dos custos gerais e lucro líquido de uma vez
+    (calcular_custos_operacionais + alocar_custos_gerais), escritos em df_prod.
+    usar_numexpr=None usa numexpr se estiver instalado.
+    """
+    calcular_custos_operacionais(df_prod, custo_var_brl_por_barril, custo_fixo_por_barris_dia, usar_numexpr)
+    return alocar_custos_gerais(df_prod, df_custos_gerais, manter_shares, usar_numexpr=usar_numexpr)
+
+# -----------------------
+# 5. Store mensal incremental
+# -----------------------
+# producao_financeiro e financials_consolidated são diretórios com um Parquet por
+# mês (mes-AAAA-MM.parquet) e um _manifesto.json com, para cada mês, o hash da
+# entrada que o gerou, o SHA-256 do arquivo gravado e o tamanho/mtime do arquivo.
+PREFIXO_MES = "mes-"
+MANIFESTO = "_manifesto.json"
+# Versão do cálculo: mudanças neste módulo invalidam os hashes de entrada
+VERSAO = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+
+def nome_mes(mes):
+    return f"{PREFIXO_MES}{pd.Timestamp(mes).strftime('%Y-%m')}"
+
+def meses_consolidados(agregados_dir):
+    """Meses já presentes no store incremental de agregados (um arquivo por mês)."""
+    return [
+        pd.Timestamp(p.stem[len(PREFIXO_MES):] + "-01")
+        for p in listar_partes(agregados_dir, PREFIXO_MES)
+    ]
+
+def hash_arquivo(path, bloco=1 << 20):
+    """SHA-256 do conteúdo de um arquivo."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(bloco), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def registro_arquivo(path, entrada):
+    """Registro de um mês gravado no manifesto: hash da entrada, SHA-256, tamanho e mtime."""
+    stat = Path(path).stat()
+    return {"entrada": entrada, "conteudo": hash_arquivo(path),
+            "tamanho": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def carregar_manifesto(dataset_dir):
+    """{mês: registro_arquivo(...)} de um store."""
+    path = Path(dataset_dir) / MANIFESTO
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def salvar_manifesto(dataset_dir, manifesto):
+    dataset_dir = Path(dataset_dir)
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    with open(dataset_dir / MANIFESTO, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(manifesto.items())), f, indent=2)
+
+def particoes_alteradas(dataset_dir, manifesto, verificar_conteudo=False):
+    """
+    Meses do manifesto cujo arquivo sumiu ou cujo conteúdo não tem mais o
+    SHA-256 registrado quando o mês foi gravado.
+
+    Por padrão só os arquivos com tamanho ou mtime diferentes do manifesto são
+    relidos para o SHA-256, então conferir o histórico custa um stat por mês.
+    verificar_conteudo=True recalcula o SHA-256 de todos os meses.
+    """
+    alterados = []
+    for nome, registro in manifesto.items():
+        path = Path(dataset_dir) / f"{nome}.parquet"
+        if not path.exists():
+            alterados.append(nome)
+            continue
+        stat = path.stat()
+        intacto = (stat.st_size, stat.st_mtime_ns) == (registro.get("tamanho"), registro.get("mtime_ns"))
+        if (verificar_conteudo or not intacto) and hash_arquivo(path) != registro["conteudo"]:
+            alterados.append(nome)
+    return alterados
+
+def hash_entradas_por_mes(df_prod, df_custos_gerais):
+    """
+    Hash da entrada de cada mês (linhas de produção do mês, custos gerais do mês
+    e VERSAO): {nome do mês: hash}. O rateio de um mês só depende dessas linhas.
+    """
+    datas = pd.DatetimeIndex(df_prod["data"])
+    linhas = pd.util.hash_pandas_object(df_prod, index=False).to_numpy()
+    custos = pd.util.hash_pandas_object(df_custos_gerais, index=False).to_numpy()
+    posicao_custos = pd.DatetimeIndex(df_custos_gerais["data"]).get_indexer(datas.unique().sort_values())
+
+    ordem = np.argsort(datas.asi8, kind="stable")
+    cortes = np.flatnonzero(np.diff(datas.asi8[ordem])) + 1
+    hashes = {}
+    for i, (ini, fim) in enumerate(zip(np.r_[0, cortes], np.r_[cortes, len(ordem)])):
+        h = hashlib.sha256(VERSAO.encode())
+        h.update(linhas[ordem[ini:fim]].tobytes())
+        h.update(custos[posicao_custos[i]].tobytes())
+        hashes[nome_mes(datas[ordem[ini]])] = h.hexdigest()[:16]
+    return hashes
+
+def atualizar_financeiro_incremental(df_prod, df_custos_gerais, producao_dir, agregados_dir,
+                                     cubo_dir=None, sincronizar=False, verificar_conteudo=False):
+    """
+    Consolida só os meses necessários nos stores processados (um Parquet por mês
+    em `producao_dir` e `agregados_dir`); o custo é proporcional às linhas desses
+    meses, não ao histórico. `df_prod` já tem os custos operacionais (producao_custos).
+
+    - Fechamento (padrão): `df_prod` traz só os meses novos, que são anexados.
+      Lança ValueError se algum já estiver consolidado ou for anterior ao último
+      mês do store.
+    - sincronizar=True (etapa financeiro): `df_prod` é o histórico inteiro; só os
+      meses novos ou cuja entrada mudou (hash_entradas_por_mes) são recalculados,
+      e meses que saíram da entrada são removidos.
+
+    Antes de gravar, cada mês já consolidado é conferido contra o manifesto
+    (particoes_alteradas: tamanho e mtime, e o SHA-256 só dos arquivos que
+    mudaram ou de todos com verificar_conteudo=True): no fechamento um mês
+    alterado gera RuntimeError; ao sincronizar ele é recalculado a partir da entrada.
+    Lança ValueError se faltar custo geral para algum mês recebido.
+    Com `cubo_dir`, os meses gravados também entram no cubo de agregados (rollups).
+    Retorna (df_prod, df_agg) dos meses gravados.
+    """
+    meses = pd.DatetimeIndex(df_prod["data"]).unique().sort_values()
+    sem_custo = meses.difference(pd.DatetimeIndex(pd.to_datetime(df_custos_gerais["data"])))
+    if len(sem_custo) > 0:
+        raise ValueError(f"Custos gerais ausentes para: {[m.strftime('%Y-%m') for m in sem_custo]}")
+
+    stores = [Path(producao_dir), Path(agregados_dir)]
+    manifestos = [carregar_manifesto(d) for d in stores]
+    alterados = sorted({nome for d, m in zip(stores, manifestos) for nome in particoes_alteradas(d, m, verificar_conteudo)})
+    hashes = hash_entradas_por_mes(df_prod, df_custos_gerais)
+
+    if sincronizar:
+        gravar = [nome for nome, h in hashes.items()
+                  if nome in alterados or any(m.get(nome, {}).get("entrada") != h for m in manifestos)]
+        remover = sorted(set().union(*manifestos) - set(hashes))
+        if alterados:
+            print(f"⚠️ Meses alterados desde a consolidação serão recalculados: {alterados}")
+    else:
+        if alterados:
+            raise RuntimeError(f"Meses consolidados alterados desde a gravação: {alterados}")
+        existentes = meses_consolidados(agregados_dir)
+        if existentes:
+            ultimo = max(existentes)
+            repetidos = [m for m in meses if m in set(existentes)]
+            if repetidos:
+                raise ValueError(f"Meses já consolidados: {[m.strftime('%Y-%m') for m in repetidos]}")
+            if meses.min() <= ultimo:
+                raise ValueError(
+                    f"Meses novos devem ser posteriores a {ultimo.strftime('%Y-%m')}; "
+                    f"recebido {meses.min().strftime('%Y-%m')}"
+                )
+        gravar, remover = list(hashes), []
+
+    # Rateio e agregados só sobre as linhas dos meses gravados
+    if len(gravar) < len(hashes):
+        df_prod = df_prod.loc[pd.DatetimeIndex(df_prod["data"]).strftime(f"{PREFIXO_MES}%Y-%m").isin(gravar)]
+    df = alocar_custos_gerais(df_prod, df_custos_gerais, manter_shares=True)
+    df_agg = consolidar_agregados(df)
+
+    for dataset_dir, manifesto, tabela in zip(stores, manifestos, [df, df_agg]):
+        for mes, df_mes in tabela.groupby("data", sort=True):
+            path = salvar_parte(df_mes, dataset_dir, nome_mes(mes))
+            manifesto[nome_mes(mes)] = registro_arquivo(path, hashes[nome_mes(mes)])
+        for nome in remover:
+            (dataset_dir / f"{nome}.parquet").unlink(missing_ok=True)
+            manifesto.pop(nome, None)
+        salvar_manifesto(dataset_dir, manifesto)
+
+    if cubo_dir is not None:
+        from rollups import atualizar_cubo, materializar_cubo
+        if remover:
+            materializar_cubo(ler_tabela(producao_dir), cubo_dir)
+        elif len(df):
+            atualizar_cubo(df, cubo_dir)
+
+    print(f"✅ Financeiro: {len(gravar)} mês(es) consolidado(s), {len(hashes) - len(gravar)} sem mudança, "
+          f"{len(remover)} removido(s)")
+    return df, df_agg
+
+# -----------------------
+# 6. Consolidação em SQL (DuckDB)
 # -----------------------
-def salvar_financeiro(df_prod, df_agg, producao_path, processed_path):
-    df_prod.to_excel(producao_path, index=False)
-    df_agg.to_excel(processed_path, index=False)
-    print(f"✅ Produção mensal atualizada salva em: {producao_path}")
-    print(f"✅ Agregados mensais salvos em: {processed_path}")
+def _soma_sem_nan(coluna):
+    # SUM do DuckDB propaga NaN; o pandas ignora (e a soma de nada é 0)
+    return f"COALESCE(SUM(CASE WHEN isnan({coluna}) THEN NULL ELSE {coluna} END), 0)"
+
+
+def consolidar_financeiro_sql(producao_custos_path, custos_gerais_path, producao_dir, agregados_dir, con=None):
+    """
+    Mesmo resultado de atualizar_financeiro_incremental (rateio, lucro e
+    agregados mensais), executado no DuckDB direto sobre os arquivos e gravado
+    no mesmo store mensal com COPY, sem carregar os dados no pandas (útil para
+    entradas maiores que a memória). Todos os meses são regravados; o manifesto
+    fica sem hash de entrada, então a próxima sincronização em pandas recalcula tudo.
+    """
+    # DuckDB só é necessário neste motor
+    from query import conectar, fonte_sql, exportar_consulta
+    con = conectar() if con is None else con
+    # file_row_number preserva a ordem das linhas de entrada (como o merge "left")
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE financeiro_campo AS
+        WITH shares AS (
+            SELECT p.*, c.* EXCLUDE (data),
+                   p.producao_barris / SUM(p.producao_barris) OVER (PARTITION BY p.data) AS fracao,
+                   fracao * c.admin_brl AS share_admin,
+                   fracao * c.manutencao_brl AS share_manut,
+                   fracao * c.logistica_brl AS share_logistica,
+                   share_admin + share_manut + share_logistica AS custo_geral_brl,
+                   p.receita - p.custo_operacional - custo_geral_brl AS lucro_liquido_brl
+            FROM {fonte_sql(producao_custos_path, "file_row_number = true")} p
+            LEFT JOIN {fonte_sql(custos_gerais_path)} c USING (data)
+        )
+        SELECT * EXCLUDE (fracao, file_row_number) FROM shares ORDER BY file_row_number
+    """)
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE financeiro_agregado AS
+        SELECT data,
+               {_soma_sem_nan("producao_barris")} AS producao_total_barris,
+               {_soma_sem_nan("receita")} AS receita_total_brl,
+               {_soma_sem_nan("custo_operacional")} AS custo_operacional_total_brl,
+               {_soma_sem_nan("custo_geral_brl")} AS custo_geral_total_brl,
+               {_soma_sem_nan("lucro_liquido_brl")} AS lucro_total_brl
+        FROM financeiro_campo GROUP BY data ORDER BY data
+    """)
+    meses = [pd.Timestamp(m) for (m,) in con.execute("SELECT data FROM financeiro_agregado ORDER BY data").fetchall()]
+
+    for dataset_dir, tabela in [(Path(producao_dir), "financeiro_campo"), (Path(agregados_dir), "financeiro_agregado")]:
+        manifesto = {}
+        for mes in meses:
+            path = exportar_consulta(f"SELECT * FROM {tabela} WHERE data = TIMESTAMP '{mes:%Y-%m-%d}'",
+                                     dataset_dir / f"{nome_mes(mes)}.parquet", con)
+            manifesto[nome_mes(mes)] = registro_arquivo(path, None)
+        for antigo in listar_partes(dataset_dir, PREFIXO_MES):
+            if antigo.stem not in manifesto:
+                antigo.unlink()
+        salvar_manifesto(dataset_dir, manifesto)
+    print(f"✅ Produção mensal atualizada salva em: {producao_dir}")
+    print(f"✅ Agregados mensais salvos em: {agregados_dir}")
@@ -1,5 +1,10 @@
 import pandas as pd
 import numpy as np
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from storage import salvar_tabela
 
 # -----------------------
 # 1. Custo variável por barril
@@ -19,7 +24,7 @@ def calcular_custo_fixo(df, custo_fixo_por_barris_dia=5000):
     Custo fixo mensal proporcional à capacidade
     """
     # Proporcional à capacidade média mensal (capacidade_barris_dia)
-    df["custo_fixo_brl"] = df["producao_barris"].apply(lambda x: custo_fixo_por_barris_dia if x>0 else 0)
+    df["custo_fixo_brl"] = np.where(df["producao_barris"] > 0, custo_fixo_por_barris_dia, 0)
     return df
 
 # -----------------------
@@ -31,7 +36,6 @@ def gerar_custos_gerais(start="2005-01", end="2025-12",
     Gera dataframe com custos gerais mensais, ajustados por inflação e sazonalidade
     """
     dates = pd.date_range(start=start, end=end, freq="MS")
-    np.random.seed(42)
     
     custos = []
     for i, date in enumerate(dates):
@@ -67,7 +71,7 @@ def calcular_margem_bruta(df):
 # 5. Salvar arquivos
 # -----------------------
 def salvar_arquivos(df_custos, df_prod, custos_gerais_path, producao_path):
-    df_custos.to_excel(custos_gerais_path, index=False)
-    df_prod.to_excel(producao_path, index=False)
+    salvar_tabela(df_custos, custos_gerais_path)
+    salvar_tabela(df_prod, producao_path)
     print(f"✅ Custos gerais salvos em: {custos_gerais_path}")
     print(f"✅ Produção mensal atualizada salva em: {producao_path}")
@@ -1,13 +1,18 @@
 import pandas as pd
 import numpy as np
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from storage import ler_tabela, salvar_tabela, salvar_lote, listar_partes, exportar_excel, CATEGORIAS
 
 # -----------------------
 # 1. Carregar dados
 # -----------------------
 def carregar_dados(campos_path, preco_path, cambio_path):
-    campos = pd.read_excel(campos_path)
-    preco = pd.read_excel(preco_path)
-    cambio = pd.read_excel(cambio_path)
+    campos = ler_tabela(campos_path)
+    preco = ler_tabela(preco_path)
+    cambio = ler_tabela(cambio_path)
     return campos, preco, cambio
 
 # -----------------------
@@ -19,7 +24,37 @@ def merge_preco_cambio(preco, cambio):
     return preco
 
 # -----------------------
-# 3. Curva de maturação
+# 3. Tabela de preços indexada
+# -----------------------
+def construir_tabela_precos(preco_df, coluna="preco_brl"):
+    """
+    Converte o DataFrame de merge_preco_cambio em uma Series indexada por data
+    (DatetimeIndex ordenado e único), pronta para buscas vetorizadas.
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(preco_df["data"]), name="data")
+    if index.has_duplicates:
+        duplicadas = index[index.duplicated()].unique()
+        raise ValueError(f"Tabela de preços com datas duplicadas: {[d.strftime('%Y-%m-%d') for d in duplicadas[:5]]}")
+    tabela = pd.Series(preco_df[coluna].to_numpy(dtype=float), index=index, name=coluna)
+    return tabela.sort_index()
+
+def buscar_precos(tabela_precos, dates):
+    """
+    Retorna os preços das datas pedidas como array alinhado a `dates`.
+    Lança ValueError com os meses sem preço em vez de falhar com IndexError.
+    """
+    dates = pd.DatetimeIndex(dates)
+    posicoes = tabela_precos.index.get_indexer(dates)
+    faltantes = dates[posicoes < 0]
+    if len(faltantes) > 0:
+        raise ValueError(
+            f"Preço ausente para {len(faltantes)} data(s): "
+            f"{[d.strftime('%Y-%m-%d') for d in faltantes[:5]]} ..."
+        )
+    return tabela_precos.to_numpy()[posicoes]
+
+# -----------------------
+# 4. Curva de maturação
 # -----------------------
 def calcular_fator_maturacao(meses):
     if meses < 12:
@@ -29,52 +64,156 @@ def calcular_fator_maturacao(meses):
     else:
         return max(0.5, 1.0 - 0.005 * (meses - 60))  # declínio lento
 
+def calcular_fator_maturacao_vetorizado(meses):
+    """
+    Versão vetorizada de calcular_fator_maturacao para arrays de meses desde o início.
+    """
+    meses = np.asarray(meses, dtype=float)
+    return np.where(
+        meses < 12,
+        0.1 + 0.075 * meses,  # ramp-up
+        np.where(meses < 60, 1.0, np.maximum(0.5, 1.0 - 0.005 * (meses - 60)))  # pico / declínio
+    )
+
 # -----------------------
-# 4. Produção mensal de um campo
+# 5. Streams de números aleatórios por campo
 # -----------------------
-def producao_mensal_campo(campo, dates, preco_df):
-    capacidade = campo["capacidade_barris_dia"]
-    data_inicio = campo["data_inicio"]
-    rows = []
+def rng_do_campo(seed, campo_id):
+    """
+    Generator independente para um campo, derivado de `seed` (int ou SeedSequence)
+    com o id do campo como spawn key. A sequência do campo N é a mesma se ele for
+    gerado sozinho, em paralelo, em outro lote ou em outra ordem.
+    """
+    base = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return np.random.default_rng(
+        np.random.SeedSequence(base.entropy, spawn_key=tuple(base.spawn_key) + (int(campo_id),))
+    )
+
+def gerar_ruido_campos(campo_ids, n_periodos, seed=0):
+    """Matriz de ruído multiplicativo (campos x períodos), um stream por campo."""
+    ruido = np.empty((len(campo_ids), n_periodos))
+    for i, campo_id in enumerate(campo_ids):
+        ruido[i] = rng_do_campo(seed, campo_id).normal(0, 0.03, n_periodos)
+    return 1 + ruido
+
+# -----------------------
+# 6. Motor vetorizado de produção (campos x meses)
+# -----------------------
+def calcular_producao_base(campos, dates, freq="MS"):
+    """
+    Produção esperada (sem ruído) de cada campo em cada período, em barris:
+    capacidade x maturação x sazonalidade x dias, zero antes do início do campo.
+    Retorna array (campos x períodos).
+    """
+    dates = pd.DatetimeIndex(dates)
+    capacidade = campos["capacidade_barris_dia"].to_numpy(dtype=float)
+    data_inicio = pd.DatetimeIndex(pd.to_datetime(campos["data_inicio"]))
+
+    # Matriz de meses desde o início (campos x meses)
+    ordinal_datas = dates.year.to_numpy() * 12 + dates.month.to_numpy()
+    ordinal_inicio = data_inicio.year.to_numpy() * 12 + data_inicio.month.to_numpy()
+    meses = ordinal_datas[None, :] - ordinal_inicio[:, None]
+    ativo = dates.to_numpy()[None, :] >= data_inicio.to_numpy()[:, None]
 
-    for date in dates:
-        if date < data_inicio:
-            producao_dia = 0
-        else:
-            meses = (date.year - data_inicio.year) * 12 + (date.month - data_inicio.month)
-            fator = calcular_fator_maturacao(meses)
-            sazonalidade = 1 + 0.05 * np.sin(2 * np.pi * (date.month-1)/12)
-            ruido = 1 + np.random.normal(0, 0.03)
-            producao_dia = capacidade * fator * sazonalidade * ruido
+    fator = calcular_fator_maturacao_vetorizado(meses)
+    sazonalidade = 1 + 0.05 * np.sin(2 * np.pi * (dates.month.to_numpy() - 1) / 12)
+    dias_no_mes = np.ones(len(dates)) if freq == "D" else dates.days_in_month.to_numpy()
+    return np.where(ativo, capacidade[:, None] * fator * sazonalidade[None, :], 0.0) * dias_no_mes[None, :]
 
-        dias_no_mes = pd.Period(date, freq="M").days_in_month
-        producao_barris = producao_dia * dias_no_mes
+def calcular_grade_producao(campos, dates, preco_df, seed=0, freq="MS"):
+    """
+    Calcula a produção de todos os campos em todos os meses de uma vez com NumPy.
+    `preco_df` pode ser o DataFrame de merge_preco_cambio ou uma tabela de construir_tabela_precos.
+    O ruído de cada campo vem do seu próprio stream (ver rng_do_campo).
+    Com freq="D" cada linha é um dia: a produção não é multiplicada pelos dias do mês
+    e o preço é o do mês correspondente.
+    Retorna um DataFrame no mesmo formato de gerar_producao_total.
+    """
+    dates = pd.DatetimeIndex(dates)
+    n_campos, n_meses = len(campos), len(dates)
 
-        preco_brl = preco_df.loc[preco_df["data"] == date, "preco_brl"].values[0]
-        receita = producao_barris * preco_brl
+    ruido = gerar_ruido_campos(campos["id"].to_numpy(), n_meses, seed)
+    producao_barris = calcular_producao_base(campos, dates, freq) * ruido
 
-        rows.append([
-            campo["id"], campo["nome"], campo["estado"], campo["tipo_petroleo"],
-            date, producao_barris, preco_brl, receita
-        ])
-    return rows
+    tabela_precos = preco_df if isinstance(preco_df, pd.Series) else construir_tabela_precos(preco_df)
+    datas_preco = dates.to_period("M").to_timestamp() if freq == "D" else dates
+    preco_brl = buscar_precos(tabela_precos, datas_preco)
+    receita = producao_barris * preco_brl[None, :]
+
+    # Schema compacto já na criação: dimensões categóricas e id int32
+    df = pd.DataFrame({
+        "campo_id": np.repeat(campos["id"].to_numpy(dtype=np.int32), n_meses),
+        "nome_campo": repetir_categoria(campos["nome"], n_meses),
+        "estado": repetir_categoria(campos["estado"], n_meses, CATEGORIAS["estado"]),
+        "tipo_petroleo": repetir_categoria(campos["tipo_petroleo"], n_meses, CATEGORIAS["tipo_petroleo"]),
+        "data": np.tile(dates.to_numpy(), n_campos),
+        "producao_barris": producao_barris.ravel(),
+        "preco_brl": np.tile(preco_brl, n_campos),
+        "receita": receita.ravel(),
+    })
+    return df
+
+def repetir_categoria(valores, n_repeticoes, categorias=None):
+    """
+    Repete cada valor `n_repeticoes` vezes como Categorical, sem criar uma string por linha.
+    `categorias` fixa a ordem do domínio conhecido; valores fora dele vão para o final.
+    """
+    valores = pd.Series(valores).astype(object)
+    base = list(categorias or [])
+    extras = sorted(set(valores.dropna()) - set(base))
+    cat = pd.Categorical(valores, categories=base + extras)
+    return pd.Categorical.from_codes(np.repeat(cat.codes, n_repeticoes), cat.categories)
+
+# -----------------------
+# 7. Produção mensal de um campo
+# -----------------------
+def producao_mensal_campo(campo, dates, preco_df, seed=0):
+    df = calcular_grade_producao(pd.DataFrame([campo]), dates, preco_df, seed=seed)
+    return df.values.tolist()
 
 # -----------------------
-# 5. Gerar produção para todos os campos
+# 8. Gerar produção para todos os campos
 # -----------------------
-def gerar_producao_total(campos, preco_df, start="2005-01", end="2025-12"):
+def gerar_producao_total(campos, preco_df, start="2005-01", end="2025-12", seed=0):
     dates = pd.date_range(start=start, end=end, freq="MS")
-    all_rows = []
-    for _, campo in campos.iterrows():
-        all_rows.extend(producao_mensal_campo(campo, dates, preco_df))
-    df = pd.DataFrame(all_rows, columns=[
-        "campo_id", "nome_campo", "estado", "tipo_petroleo",
-        "data", "producao_barris", "preco_brl", "receita"
-    ])
-    return df
+    return calcular_grade_producao(campos, dates, preco_df, seed=seed)
+
+# -----------------------
+# 9. Geração em lotes (streaming) para datasets grandes
+# -----------------------
+def gerar_producao_em_lotes(campos, preco_df, start="2005-01", end="2025-12", freq="MS",
+                            tamanho_lote=500, seed=0):
+    """
+    Gera a produção por lotes de campos, sem materializar o dataset inteiro.
+    Como cada campo tem seu próprio stream aleatório, o resultado é reprodutível e
+    não depende do tamanho do lote nem da ordem em que os lotes são consumidos.
+    Produz tuplas (índice do lote, DataFrame).
+    """
+    dates = pd.date_range(start=start, end=end, freq=freq)
+    tabela_precos = construir_tabela_precos(preco_df)
+    for indice, inicio in enumerate(range(0, len(campos), tamanho_lote)):
+        lote = campos.iloc[inicio:inicio + tamanho_lote]
+        yield indice, calcular_grade_producao(lote, dates, tabela_precos, seed=seed, freq=freq)
+
+def gerar_producao_particionada(campos, preco_df, output_dir, start="2005-01", end="2025-12",
+                                freq="MS", tamanho_lote=500, seed=0):
+    """
+    Escreve a produção lote a lote num dataset Parquet particionado (um arquivo por
+    lote de campos). O pico de memória depende só do tamanho do lote.
+    Lotes de uma geração anterior no mesmo diretório são apagados antes.
+    Retorna o total de linhas escritas.
+    """
+    for antigo in listar_partes(output_dir, "lote-"):
+        antigo.unlink()
+    total = 0
+    for indice, df in gerar_producao_em_lotes(campos, preco_df, start, end, freq, tamanho_lote, seed):
+        salvar_lote(df, output_dir, indice)
+        total += len(df)
+    print(f"✅ {total} linhas de produção salvas em: {output_dir}")
+    return total
 
 # -----------------------
-# 6. Adicionar custos e lucro
+# 10. Adicionar custos e lucro
 # -----------------------
 def adicionar_custos_lucro(df, custo_pct=0.4):
     df["custo_operacional"] = df["receita"] * custo_pct
@@ -82,10 +221,14 @@ def adicionar_custos_lucro(df, custo_pct=0.4):
     return df
 
 # -----------------------
-# 7. Salvar arquivos
+# 11. Salvar arquivos
 # -----------------------
-def salvar_arquivos(df, csv_path, excel_path):
-    df.to_csv(csv_path, index=False)
-    df.to_excel(excel_path, index=False)
-    print(f"✅ CSV salvo em: {csv_path}")
-    print(f"✅ Excel salvo em: {excel_path}")
+def salvar_arquivos(df, output_path, excel_path=None):
+    """
+    Salva a produção no formato do caminho (Parquet por padrão).
+    Excel só é gerado se `excel_path` for informado (exportação para Power BI).
+    """
+    salvar_tabela(df, output_path)
+    print(f"✅ Produção salva em: {output_path}")
+    if excel_path is not None:
+        exportar_excel(df, excel_path)
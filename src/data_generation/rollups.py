@@ -0,0 +1,156 @@
+"""
+Cubo de agregados materializados sobre a tabela fato por campo e mês
+(producao_financeiro).
+
+Os dashboards cortam lucro, receita e produção por ano, mês, estado, tipo de
+petróleo e campo. Em vez de reagregar a tabela fato a cada consulta, o cubo
+guarda um Parquet pequeno por conjunto de agrupamento (grouping sets):
+
+  - a tabela fato é lida uma única vez e agregada no grão mais fino
+    (ano, mes, estado, tipo_petroleo, campo_id);
+  - todos os outros conjuntos são derivados desse agregado, não da tabela fato;
+  - as medidas são somas (e a contagem de linhas), então meses novos ou
+    reenviados entram como um delta: só as linhas desses meses são agregadas e
+    somadas aos conjuntos já materializados.
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from storage import ler_tabela, salvar_tabela
+
+DIMENSOES = ["ano", "mes", "estado", "tipo_petroleo", "campo_id"]
+MEDIDAS = ["lucro_liquido_brl", "receita", "producao_barris"]
+CONTAGEM = "n_linhas"
+
+# Conjuntos de agrupamento materializados (o primeiro é o grão mais fino)
+CONJUNTOS = [
+    ("ano", "mes", "estado", "tipo_petroleo", "campo_id"),
+    ("ano", "mes", "estado", "tipo_petroleo"),
+    ("ano", "mes", "estado"),
+    ("ano", "mes", "tipo_petroleo"),
+    ("ano", "mes"),
+    ("ano", "estado", "tipo_petroleo"),
+    ("ano", "estado"),
+    ("ano", "tipo_petroleo"),
+    ("ano", "campo_id"),
+    ("ano",),
+    ("estado", "tipo_petroleo"),
+    ("estado",),
+    ("tipo_petroleo",),
+    ("campo_id",),
+    (),
+]
+
+
+def nome_conjunto(dims):
+    """Nome do arquivo de um conjunto: dimensões unidas por "__" ou "total"."""
+    return "__".join(dims) if dims else "total"
+
+
+# -----------------------
+# 1. Agregação
+# -----------------------
+def agregar_base(df_prod):
+    """
+    Agrega a tabela fato no grão mais fino do cubo (uma passada).
+    Medidas nulas (ex.: lucro de meses sem produção) somam como zero.
+    """
+    datas = pd.DatetimeIndex(df_prod["data"])
+    chaves = [datas.year.rename("ano"), datas.month.rename("mes")] + [df_prod[d] for d in DIMENSOES[2:]]
+    grupos = df_prod[MEDIDAS].groupby(chaves, observed=True)
+    base = grupos.sum()
+    base[CONTAGEM] = grupos.size()
+    return base.reset_index()
+
+
+def agregar(df, dims):
+    """Reagrega um conjunto (ex.: a base) para as dimensões `dims`."""
+    colunas = MEDIDAS + [CONTAGEM]
+    if not dims:
+        return df[colunas].sum().to_frame().T.astype({CONTAGEM: "int64"})
+    return df.groupby(list(dims), observed=True)[colunas].sum().reset_index()
+
+
+def construir_cubo(base, conjuntos=CONJUNTOS):
+    """
+    Todos os conjuntos derivados da base: {nome: DataFrame}.
+    Cada conjunto é agregado a partir do menor conjunto já calculado que o
+    contém (ex.: ano a partir de ano x mes), não da base inteira.
+    """
+    calculados = {tuple(DIMENSOES): base}
+    for dims in conjuntos:
+        pais = [df for d, df in calculados.items() if set(dims) <= set(d)]
+        calculados[tuple(dims)] = agregar(min(pais, key=len), dims)
+    return {nome_conjunto(dims): calculados[tuple(dims)] for dims in conjuntos}
+
+
+# -----------------------
+# 2. Materialização
+# -----------------------
+def materializar_cubo(df_prod, cubo_dir, conjuntos=CONJUNTOS):
+    """Reconstrói o cubo inteiro a partir da tabela fato."""
+    cubo_dir = Path(cubo_dir)
+    cubo = construir_cubo(agregar_base(df_prod), conjuntos)
+    for nome, df in cubo.items():
+        salvar_tabela(df, cubo_dir / f"{nome}.parquet")
+    print(f"✅ Cubo com {len(cubo)} conjuntos salvo em: {cubo_dir}")
+    return cubo
+
+
+def atualizar_cubo(df_novos, cubo_dir, conjuntos=CONJUNTOS):
+    """
+    Incorpora as linhas de `df_novos` (meses completos) ao cubo já materializado.
+    Meses que já estavam no cubo são substituídos: as linhas antigas desses meses
+    (lidas do conjunto mais fino) entram no delta com sinal negativo.
+    O custo é proporcional aos meses recebidos mais o tamanho dos conjuntos.
+    """
+    cubo_dir = Path(cubo_dir)
+    fino = cubo_dir / f"{nome_conjunto(conjuntos[0])}.parquet"
+    if not fino.exists():
+        return materializar_cubo(df_novos, cubo_dir, conjuntos)
+
+    novo = agregar_base(df_novos)
+    meses = novo[["ano", "mes"]].drop_duplicates()
+    antigo = ler_tabela(fino, filtros={"ano": meses["ano"].unique().tolist()})
+    antigo = antigo.merge(meses, on=["ano", "mes"])
+    antigo[MEDIDAS + [CONTAGEM]] = -antigo[MEDIDAS + [CONTAGEM]]
+    delta = pd.concat([novo, antigo], ignore_index=True)
+
+    chave_meses = meses["ano"] * 100 + meses["mes"]
+    cubo = {}
+    for dims in conjuntos:
+        nome = nome_conjunto(dims)
+        atual = ler_tabela(cubo_dir / f"{nome}.parquet")
+        if {"ano", "mes"} <= set(dims):
+            # Conjuntos mensais: troca as linhas dos meses recebidos
+            manter = ~(atual["ano"] * 100 + atual["mes"]).isin(chave_meses)
+            df = pd.concat([atual[manter], agregar(novo, dims)], ignore_index=True)
+        else:
+            df = agregar(pd.concat([atual, agregar(delta, dims)], ignore_index=True), dims)
+            # Grupos que só existiam nos meses substituídos ficam com contagem zero
+            df = df[df[CONTAGEM] > 0].reset_index(drop=True) if dims else df
+        cubo[nome] = df
+        salvar_tabela(df, cubo_dir / f"{nome}.parquet")
+    print(f"✅ Cubo atualizado com {len(meses)} mês(es) novo(s) ou reenviado(s)")
+    return cubo
+
+
+# -----------------------
+# 3. Consultas
+# -----------------------
+def consultar_cubo(cubo_dir, dims, filtros=None, conjuntos=CONJUNTOS):
+    """
+    Medidas agregadas por `dims` (com `filtros` no formato de ler_tabela) lidas do
+    menor conjunto materializado que contém essas dimensões e as dos filtros.
+    """
+    necessarias = set(dims) | set(filtros or {})
+    candidatos = [c for c in conjuntos if necessarias <= set(c)]
+    if not candidatos:
+        raise ValueError(f"Nenhum conjunto do cubo cobre as dimensões {sorted(necessarias)}")
+    conjunto = min(candidatos, key=len)
+    df = ler_tabela(Path(cubo_dir) / f"{nome_conjunto(conjunto)}.parquet", filtros=filtros)
+    return df if tuple(dims) == conjunto else agregar(df, dims)
@@ -0,0 +1,157 @@
+"""
+Motor de cenários Monte Carlo para preço do petróleo, câmbio e produção.
+
+Em vez de um único caminho determinístico, simula milhares de trajetórias
+conjuntas de preço (USD) e câmbio (USD/BRL) como passeios log-normais
+correlacionados, calibrados nas séries históricas, e o ruído de produção de cada
+campo como um array 3-D (cenários x meses x campos). As trajetórias passam pela
+mesma lógica de receita e custos do pipeline e o resultado é a distribuição do
+lucro_total_brl (P10/P50/P90 por mês e no horizonte).
+
+Os cenários são processados em lotes dimensionados por `memoria_max_mb`, então
+100 mil cenários cabem em memória: só a matriz de lucro (cenários x meses) é
+mantida inteira.
+"""
+
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent))
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from generate_producao_mensal import calcular_producao_base
+from generate_custos import gerar_custos_gerais
+from storage import salvar_tabela
+
+PRECO_MINIMO_USD = 25
+CAMBIO_LIMITES = (1.5, 6.0)
+
+# -----------------------
+# 1. Calibração
+# -----------------------
+def calibrar_parametros(preco, cambio):
+    """
+    Deriva e volatilidade mensais dos log-retornos do preço (USD) e do câmbio,
+    a correlação entre eles e os valores iniciais (último mês observado).
+    """
+    df = pd.merge(preco[["data", "preco_barril_usd"]], cambio[["data", "taxa_cambio"]], on="data").sort_values("data")
+    retornos = np.log(df[["preco_barril_usd", "taxa_cambio"]].to_numpy(dtype=float))
+    retornos = np.diff(retornos, axis=0)
+    return {
+        "deriva": retornos.mean(axis=0),
+        "volatilidade": retornos.std(axis=0, ddof=1),
+        "correlacao": float(np.corrcoef(retornos.T)[0, 1]),
+        "inicial": df[["preco_barril_usd", "taxa_cambio"]].iloc[-1].to_numpy(dtype=float),
+        "ultima_data": pd.Timestamp(df["data"].iloc[-1]),
+    }
+
+
+# -----------------------
+# 2. Simulação
+# -----------------------
+def simular_preco_cambio(params, n_cenarios, n_meses, rng):
+    """
+    Trajetórias conjuntas (cenários x meses) de preço em USD e câmbio, com choques
+    correlacionados e os mesmos limites dos geradores históricos.
+    """
+    cov = np.outer(params["volatilidade"], params["volatilidade"]) * np.array(
+        [[1.0, params["correlacao"]], [params["correlacao"], 1.0]]
+    )
+    choques = rng.multivariate_normal(params["deriva"] - np.diag(cov) / 2, cov, size=(n_cenarios, n_meses))
+    trajetorias = params["inicial"] * np.exp(np.cumsum(choques, axis=1))
+    preco_usd = np.maximum(trajetorias[..., 0], PRECO_MINIMO_USD)
+    cambio = np.clip(trajetorias[..., 1], *CAMBIO_LIMITES)
+    return preco_usd, cambio
+
+
+def tamanho_do_lote(n_meses, n_campos, memoria_max_mb=256, n_arrays=3):
+    """Cenários por lote para que os arrays 3-D (float64) caibam em `memoria_max_mb`."""
+    bytes_por_cenario = n_meses * n_campos * 8 * n_arrays
+    return max(1, int(memoria_max_mb * 2**20 // bytes_por_cenario))
+
+
+def simular_lucro(campos, preco, cambio, meses, n_cenarios=10000, seed=0,
+                  custo_var_brl_por_barril=50, custo_fixo_por_barris_dia=5000,
+                  custos_gerais=None, desvio_producao=0.03, memoria_max_mb=256):
+    """
+    Lucro total mensal (cenários x meses) da empresa em cada cenário.
+
+    Por lote de cenários: ruído de produção (cenários x meses x campos) sobre a
+    produção esperada de cada campo, receita = produção x preço BRL do cenário,
+    custo variável por barril, custo fixo por campo ativo e custos gerais do mês
+    (alocados integralmente quando há produção, como em aplicar_share_custos_gerais).
+    Cada lote usa um stream próprio derivado de `seed`.
+    """
+    meses = pd.DatetimeIndex(meses)
+    n_meses, n_campos = len(meses), len(campos)
+    params = calibrar_parametros(preco, cambio)
+
+    base = calcular_producao_base(campos, meses).T  # meses x campos
+    if custos_gerais is None:
+        custos_gerais = gerar_custos_gerais(start=meses[0], end=meses[-1])
+    custos_gerais = custos_gerais.set_index(pd.DatetimeIndex(custos_gerais["data"])).reindex(meses)
+    custo_geral_mes = custos_gerais[["admin_brl", "manutencao_brl", "logistica_brl"]].sum(axis=1).to_numpy()
+
+    lote = tamanho_do_lote(n_meses, n_campos, memoria_max_mb)
+    n_lotes = -(-n_cenarios // lote)
+    streams = np.random.SeedSequence(seed).spawn(n_lotes)
+
+    lucro = np.empty((n_cenarios, n_meses))
+    for i, ss in enumerate(streams):
+        rng = np.random.default_rng(ss)
+        ini, fim = i * lote, min((i + 1) * lote, n_cenarios)
+        n = fim - ini
+
+        preco_usd, taxa = simular_preco_cambio(params, n, n_meses, rng)
+        producao = base[None, :, :] * rng.normal(1.0, desvio_producao, size=(n, n_meses, n_campos))
+        producao_total = producao.sum(axis=2)
+        campos_ativos = (producao > 0).sum(axis=2)
+        del producao
+
+        receita = producao_total * preco_usd * taxa
+        custo_operacional = producao_total * custo_var_brl_por_barril + campos_ativos * custo_fixo_por_barris_dia
+        custo_geral = np.where(producao_total > 0, custo_geral_mes[None, :], 0.0)
+        lucro[ini:fim] = receita - custo_operacional - custo_geral
+
+    return lucro
+
+
+def resumir_distribuicao(lucro, meses, percentis=(10, 50, 90)):
+    """
+    Percentis do lucro_total_brl por mês e do lucro acumulado no horizonte
+    (linha com data NaT e horizonte="total").
+    """
+    nomes = [f"P{p}" for p in percentis]
+    por_mes = pd.DataFrame(np.percentile(lucro, percentis, axis=0).T, columns=nomes)
+    por_mes.insert(0, "data", pd.DatetimeIndex(meses))
+    por_mes["media"] = lucro.mean(axis=0)
+    por_mes["horizonte"] = "mensal"
+
+    acumulado = lucro.sum(axis=1)
+    total = pd.DataFrame([np.percentile(acumulado, percentis)], columns=nomes)
+    total.insert(0, "data", pd.NaT)
+    total["media"] = acumulado.mean()
+    total["horizonte"] = "total"
+    return pd.concat([por_mes, total], ignore_index=True)
+
+
+# -----------------------
+# 3. Execução
+# -----------------------
+def gerar_cenarios(campos, preco, cambio, n_meses=12, n_cenarios=10000, seed=0,
+                   memoria_max_mb=256, output_path=None, **custos):
+    """
+    Simula `n_cenarios` para os `n_meses` seguintes ao último mês observado e
+    retorna a distribuição do lucro_total_brl (resumir_distribuicao).
+    `custos` repassa custo_var_brl_por_barril / custo_fixo_por_barris_dia.
+    """
+    inicio = pd.Timestamp(preco["data"].max()) + pd.offsets.MonthBegin()
+    meses = pd.date_range(inicio, periods=n_meses, freq="MS")
+    lucro = simular_lucro(campos, preco, cambio, meses, n_cenarios=n_cenarios, seed=seed,
+                          memoria_max_mb=memoria_max_mb, **custos)
+    resumo = resumir_distribuicao(lucro, meses)
+    if output_path is not None:
+        salvar_tabela(resumo, output_path)
+        print(f"✅ Distribuição de lucro ({n_cenarios} cenários) salva em: {output_path}")
+    return resumo
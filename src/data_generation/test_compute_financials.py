@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import compute_financials
+import generate_custos
+
+
+def cadeia_legada(df_prod, df_custos_gerais, custo_var_brl_por_barril=50, custo_fixo_por_barris_dia=5000):
+    """
+    Cadeia original (custo variável, custo fixo, margem, merge dos custos gerais,
+    share por groupby e lucro), referência para o kernel.
+    """
+    df = df_prod.copy()
+    df["custo_variavel_brl"] = df["producao_barris"] * custo_var_brl_por_barril
+    df["custo_fixo_brl"] = np.where(df["producao_barris"] > 0, custo_fixo_por_barris_dia, 0)
+    df["custo_operacional"] = df["custo_variavel_brl"] + df["custo_fixo_brl"]
+    df["margem_bruta"] = df["receita"] - df["custo_operacional"]
+
+    df = df.merge(df_custos_gerais, on="data", how="left")
+    total_producao_mes = df.groupby("data")["producao_barris"].transform("sum")
+    df["share_admin"] = df["producao_barris"] / total_producao_mes * df["admin_brl"]
+    df["share_manut"] = df["producao_barris"] / total_producao_mes * df["manutencao_brl"]
+    df["share_logistica"] = df["producao_barris"] / total_producao_mes * df["logistica_brl"]
+    df["custo_geral_brl"] = df["share_admin"] + df["share_manut"] + df["share_logistica"]
+    df["lucro_liquido_brl"] = df["receita"] - df["custo_operacional"] - df["custo_geral_brl"]
+    return df
+
+
+MOTORES = [False, pytest.param(True, marks=pytest.mark.skipif(compute_financials.ne is None,
+                                                              reason="numexpr não instalado"))]
+
+
+@pytest.mark.parametrize("usar_numexpr", MOTORES)
+def test_kernel_igual_a_cadeia_legada(producao, custos_gerais, usar_numexpr):
+    esperado = cadeia_legada(producao, custos_gerais, 55, 4000)
+    df = producao.copy()
+    obtido = compute_financials.calcular_financeiro_fundido(
+        df, custos_gerais, custo_var_brl_por_barril=55, custo_fixo_por_barris_dia=4000,
+        manter_shares=True, usar_numexpr=usar_numexpr,
+    )
+
+    assert obtido is df  # colunas escritas no próprio DataFrame
+    pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False, rtol=1e-12)
+    pd.testing.assert_frame_equal(compute_financials.consolidar_agregados(obtido),
+                                  compute_financials.consolidar_agregados(esperado), rtol=1e-12)
+
+
+def test_aplicar_share_nao_altera_entrada(producao, custos_gerais):
+    df_custos = compute_financials.calcular_custos_operacionais(producao.copy())
+    colunas = list(df_custos.columns)
+    df = compute_financials.aplicar_share_custos_gerais(df_custos, custos_gerais)
+
+    assert list(df_custos.columns) == colunas
+    assert "lucro_liquido_brl" not in df.columns
+    esperado = cadeia_legada(producao, custos_gerais)
+    pd.testing.assert_frame_equal(compute_financials.calcular_lucro_liquido(df), esperado,
+                                  check_dtype=False, rtol=1e-12)
+
+
+def test_aplicar_share_sobre_producao_sem_custos(producao, custos_gerais):
+    df = compute_financials.aplicar_share_custos_gerais(producao, custos_gerais)
+
+    esperado = cadeia_legada(producao, custos_gerais)
+    assert list(df.columns) == list(producao.columns) + [
+        "admin_brl", "manutencao_brl", "logistica_brl",
+        "share_admin", "share_manut", "share_logistica", "custo_geral_brl",
+    ]
+    pd.testing.assert_frame_equal(df, esperado[df.columns], check_dtype=False, rtol=1e-12)
+
+
+def test_funcoes_por_coluna_iguais_ao_kernel(producao, custos_gerais):
+    df = generate_custos.calcular_custo_variavel(producao.copy(), 55)
+    df = generate_custos.calcular_custo_fixo(df, 4000)
+    df = generate_custos.calcular_margem_bruta(df)
+    df = compute_financials.calcular_lucro_liquido(compute_financials.aplicar_share_custos_gerais(df, custos_gerais))
+
+    esperado = compute_financials.calcular_financeiro_fundido(producao.copy(), custos_gerais, 55, 4000,
+                                                              manter_shares=True)
+    pd.testing.assert_frame_equal(df, esperado, check_dtype=False, rtol=1e-12)
+
+
+def test_custos_gerais_ausentes(producao, custos_gerais):
+    df = compute_financials.calcular_custos_operacionais(producao.copy())
+    with pytest.raises(ValueError, match="Custos gerais ausentes"):
+        compute_financials.alocar_custos_gerais(df, custos_gerais.iloc[:-1])
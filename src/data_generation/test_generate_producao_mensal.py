@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from storage import ler_tabela
+from generate_producao_mensal import (buscar_precos, calcular_fator_maturacao, calcular_grade_producao,
+                                      construir_tabela_precos, gerar_producao_em_lotes,
+                                      gerar_producao_particionada, gerar_producao_total, rng_do_campo)
+
+DATES = pd.date_range("2005-01", "2025-12", freq="MS")
+
+
+def producao_em_loop(campos, dates, preco_df, seed):
+    """Loop original campo a campo e mês a mês, com o mesmo stream de ruído por campo."""
+    rows = []
+    for _, campo in campos.iterrows():
+        ruido = 1 + rng_do_campo(seed, campo["id"]).normal(0, 0.03, len(dates))
+        for date, r in zip(dates, ruido):
+            if date < campo["data_inicio"]:
+                producao_dia = 0
+            else:
+                meses = (date.year - campo["data_inicio"].year) * 12 + (date.month - campo["data_inicio"].month)
+                sazonalidade = 1 + 0.05 * np.sin(2 * np.pi * (date.month - 1) / 12)
+                producao_dia = campo["capacidade_barris_dia"] * calcular_fator_maturacao(meses) * sazonalidade * r
+            producao_barris = producao_dia * pd.Period(date, freq="M").days_in_month
+            preco_brl = preco_df.loc[preco_df["data"] == date, "preco_brl"].values[0]
+            rows.append([campo["id"], campo["nome"], campo["estado"], campo["tipo_petroleo"],
+                         date, producao_barris, preco_brl, producao_barris * preco_brl])
+    return pd.DataFrame(rows, columns=["campo_id", "nome_campo", "estado", "tipo_petroleo",
+                                       "data", "producao_barris", "preco_brl", "receita"])
+
+
+def test_grade_igual_ao_loop(dados_brutos):
+    campos, preco_df = dados_brutos["campos"], dados_brutos["preco_df"]
+    esperado = producao_em_loop(campos, DATES, preco_df, seed=123)
+    obtido = calcular_grade_producao(campos, DATES, preco_df, seed=123)
+
+    pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False, check_categorical=False,
+                                  check_exact=False, rtol=1e-12)
+    pd.testing.assert_frame_equal(gerar_producao_total(campos, preco_df, seed=123), obtido)
+
+
+def test_tabela_de_precos(dados_brutos):
+    preco_df = dados_brutos["preco_df"]
+    embaralhado = preco_df.sample(frac=1, random_state=0)
+    tabela = construir_tabela_precos(embaralhado)
+    assert tabela.index.is_monotonic_increasing
+
+    datas = pd.DatetimeIndex(["2020-03-01", "2005-01-01", "2020-03-01"])
+    esperado = [preco_df.loc[preco_df["data"] == d, "preco_brl"].iloc[0] for d in datas]
+    np.testing.assert_array_equal(buscar_precos(tabela, datas), esperado)
+
+    with pytest.raises(ValueError, match="Preço ausente para 1 data"):
+        buscar_precos(tabela, ["2020-03-01", "1990-01-01"])
+    with pytest.raises(ValueError, match="datas duplicadas"):
+        construir_tabela_precos(pd.concat([preco_df, preco_df.head(1)]))
+
+
+def test_particionado_igual_ao_total(tmp_path, dados_brutos, producao):
+    campos, preco_df = dados_brutos["campos"], dados_brutos["preco_df"]
+    lotes = [df for _, df in gerar_producao_em_lotes(campos, preco_df, tamanho_lote=5, seed=123)]
+    assert [len(df) for df in lotes] == [5 * len(DATES), 5 * len(DATES), 2 * len(DATES)]
+    pd.testing.assert_frame_equal(pd.concat(lotes, ignore_index=True), producao, check_dtype=False,
+                                  check_categorical=False)
+
+    # Um lote antigo com mais partes é substituído por inteiro
+    gerar_producao_particionada(campos, preco_df, tmp_path, tamanho_lote=2, seed=123)
+    assert gerar_producao_particionada(campos, preco_df, tmp_path, tamanho_lote=5, seed=123) == len(producao)
+    lido = ler_tabela(tmp_path).sort_values(["campo_id", "data"], ignore_index=True)
+    pd.testing.assert_frame_equal(lido.drop(columns="preco_brl"), producao.drop(columns="preco_brl"),
+                                  check_dtype=False, check_categorical=False)
+
+
+def test_stream_do_campo_independe_do_lote(dados_brutos, producao):
+    campos, preco_df = dados_brutos["campos"], dados_brutos["preco_df"]
+    sozinho = calcular_grade_producao(campos.iloc[[7]], DATES, preco_df, seed=123)
+    esperado = producao[producao["campo_id"] == campos["id"].iloc[7]].reset_index(drop=True)
+    np.testing.assert_array_equal(sozinho["producao_barris"], esperado["producao_barris"])
+
+    outra_seed = calcular_grade_producao(campos.iloc[[7]], DATES, preco_df, seed=124)
+    assert not np.array_equal(outra_seed["producao_barris"], sozinho["producao_barris"])
@@ -0,0 +1,128 @@
+import os
+
+import pandas as pd
+import pytest
+
+import compute_financials
+from compute_financials import atualizar_financeiro_incremental, listar_partes, PREFIXO_MES
+from storage import salvar_tabela
+
+
+@pytest.fixture
+def producao_custos(producao):
+    return compute_financials.calcular_custos_operacionais(producao.copy())
+
+
+def ler_store(dataset_dir):
+    return pd.read_parquet(dataset_dir)
+
+
+def por_campo(df):
+    # O store é mês a mês; a geração é campo a campo
+    return df.sort_values(["campo_id", "data"], kind="stable").reset_index(drop=True)
+
+
+def comparar(obtido, esperado):
+    # preco_brl é gravado em float32 (DTYPES_ESCRITA); o resto vai em float64
+    if "preco_brl" in esperado:
+        pd.testing.assert_series_equal(obtido["preco_brl"], esperado["preco_brl"], check_dtype=False, rtol=1e-6)
+        obtido, esperado = obtido.drop(columns="preco_brl"), esperado.drop(columns="preco_brl")
+    pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False, check_categorical=False, rtol=1e-12)
+
+
+def estado_arquivos(dataset_dir):
+    return {p.name: (p.stat().st_mtime_ns, p.read_bytes()) for p in listar_partes(dataset_dir, PREFIXO_MES)}
+
+
+def test_fechamento_em_duas_partes_igual_ao_completo(tmp_path, producao_custos, custos_gerais,
+                                                     financeiro_campo, agregados):
+    corte = pd.Timestamp("2015-01-01")
+    datas = pd.DatetimeIndex(producao_custos["data"])
+    for parte in [producao_custos[datas < corte], producao_custos[datas >= corte]]:
+        atualizar_financeiro_incremental(parte.copy(), custos_gerais, tmp_path / "campo", tmp_path / "agg")
+
+    comparar(por_campo(ler_store(tmp_path / "campo")), financeiro_campo)
+    comparar(ler_store(tmp_path / "agg"), agregados)
+
+    with pytest.raises(ValueError, match="Meses já consolidados"):
+        atualizar_financeiro_incremental(producao_custos[datas >= corte].copy(), custos_gerais,
+                                         tmp_path / "campo", tmp_path / "agg")
+
+
+def test_sincronizar_regrava_so_meses_alterados(tmp_path, producao_custos, custos_gerais):
+    dirs = (tmp_path / "campo", tmp_path / "agg")
+    atualizar_financeiro_incremental(producao_custos.copy(), custos_gerais, *dirs, sincronizar=True)
+    antes = estado_arquivos(dirs[0])
+
+    # Sem mudança na entrada: nada é regravado
+    df, _ = atualizar_financeiro_incremental(producao_custos.copy(), custos_gerais, *dirs, sincronizar=True)
+    assert df.empty
+    assert estado_arquivos(dirs[0]) == antes
+
+    # Um mês alterado: só ele é regravado
+    alterado = producao_custos.copy()
+    mes = alterado["data"] == pd.Timestamp("2010-06-01")
+    alterado.loc[mes, "receita"] *= 1.1
+    df, df_agg = atualizar_financeiro_incremental(alterado, custos_gerais, *dirs, sincronizar=True)
+    assert set(df["data"]) == {pd.Timestamp("2010-06-01")}
+    depois = estado_arquivos(dirs[0])
+    assert [n for n in antes if depois[n] != antes[n]] == ["mes-2010-06.parquet"]
+
+    esperado = compute_financials.calcular_lucro_liquido(
+        compute_financials.aplicar_share_custos_gerais(alterado, custos_gerais))
+    comparar(por_campo(ler_store(dirs[0])), esperado)
+
+    # Meses que saíram da entrada são removidos do store
+    atualizar_financeiro_incremental(alterado[alterado["data"] < pd.Timestamp("2025-01-01")].copy(),
+                                     custos_gerais, *dirs, sincronizar=True)
+    assert ler_store(dirs[1])["data"].max() == pd.Timestamp("2024-12-01")
+
+
+def test_mes_adulterado_detectado_pelo_hash(tmp_path, monkeypatch, producao_custos, custos_gerais):
+    dirs = (tmp_path / "campo", tmp_path / "agg")
+    datas = pd.DatetimeIndex(producao_custos["data"])
+    historico = producao_custos[datas < pd.Timestamp("2020-01-01")].copy()
+    atualizar_financeiro_incremental(historico, custos_gerais, *dirs)
+
+    # Arquivo regravado: só ele tem tamanho/mtime diferentes e é relido para o SHA-256
+    path = dirs[1] / "mes-2012-03.parquet"
+    stat = path.stat()
+    df = pd.read_parquet(path)
+    df["lucro_total_brl"] += 1.0
+    df.to_parquet(path, index=False)
+    relidos = []
+    hash_arquivo = compute_financials.hash_arquivo
+    monkeypatch.setattr(compute_financials, "hash_arquivo", lambda p: relidos.append(p.name) or hash_arquivo(p))
+    manifesto = compute_financials.carregar_manifesto(dirs[1])
+    assert compute_financials.particoes_alteradas(dirs[1], manifesto) == ["mes-2012-03"]
+    assert relidos == ["mes-2012-03.parquet"]
+    monkeypatch.undo()
+
+    # Com mesmo tamanho e mtime, verificar_conteudo=True confere o SHA-256 de todos os meses
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    with pytest.raises(RuntimeError, match="mes-2012-03"):
+        atualizar_financeiro_incremental(producao_custos[datas >= pd.Timestamp("2020-01-01")].copy(),
+                                         custos_gerais, *dirs, verificar_conteudo=True)
+
+    # Ao sincronizar, o mês adulterado é recalculado a partir da entrada
+    atualizar_financeiro_incremental(historico, custos_gerais, *dirs, sincronizar=True, verificar_conteudo=True)
+    esperado = compute_financials.consolidar_agregados(
+        compute_financials.calcular_lucro_liquido(
+            compute_financials.aplicar_share_custos_gerais(historico, custos_gerais)))
+    comparar(ler_store(dirs[1]), esperado)
+
+
+def test_motor_sql_igual_ao_pandas(tmp_path, producao_custos, custos_gerais, financeiro_campo, agregados):
+    salvar_tabela(producao_custos, tmp_path / "producao_custos.parquet")
+    salvar_tabela(custos_gerais, tmp_path / "custos_gerais.parquet")
+    compute_financials.consolidar_financeiro_sql(tmp_path / "producao_custos.parquet",
+                                                 tmp_path / "custos_gerais.parquet",
+                                                 tmp_path / "campo", tmp_path / "agg")
+
+    comparar(por_campo(ler_store(tmp_path / "campo")), financeiro_campo)
+    comparar(ler_store(tmp_path / "agg"), agregados)
+
+    # A sincronização seguinte recalcula tudo (manifesto do SQL não tem hash de entrada)
+    df, _ = atualizar_financeiro_incremental(producao_custos.copy(), custos_gerais,
+                                             tmp_path / "campo", tmp_path / "agg", sincronizar=True)
+    assert len(df) == len(producao_custos)
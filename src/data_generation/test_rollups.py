@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from rollups import CONJUNTOS, atualizar_cubo, consultar_cubo, materializar_cubo, nome_conjunto
+from storage import ler_tabela
+
+
+def ordenado(df, dims):
+    df = df.astype({d: str for d in dims if d in ("estado", "tipo_petroleo")})
+    return df.sort_values(list(dims)).reset_index(drop=True) if dims else df.reset_index(drop=True)
+
+
+def ler_cubo(cubo_dir):
+    return {nome_conjunto(d): ordenado(ler_tabela(cubo_dir / f"{nome_conjunto(d)}.parquet"), d) for d in CONJUNTOS}
+
+
+def test_cubo_igual_ao_groupby_da_tabela_fato(tmp_path, financeiro_campo):
+    materializar_cubo(financeiro_campo, tmp_path)
+    df = financeiro_campo.assign(ano=financeiro_campo["data"].dt.year)
+
+    obtido = consultar_cubo(tmp_path, ["ano", "estado"], filtros={"ano": (2010, 2012)})
+    esperado = (df[df["ano"].between(2010, 2012)].groupby(["ano", "estado"], observed=True)
+                [["lucro_liquido_brl", "receita", "producao_barris"]].sum().reset_index())
+    pd.testing.assert_frame_equal(ordenado(obtido, ["ano", "estado"]).drop(columns="n_linhas"),
+                                  ordenado(esperado, ["ano", "estado"]), check_dtype=False, rtol=1e-9)
+
+    with pytest.raises(ValueError, match="Nenhum conjunto"):
+        consultar_cubo(tmp_path, ["nome_campo"])
+
+
+def test_atualizacao_incremental_igual_a_reconstrucao(tmp_path, financeiro_campo):
+    corte = pd.Timestamp("2015-01-01")
+    reenviado = financeiro_campo.copy()
+    mes = reenviado["data"] == pd.Timestamp("2012-07-01")
+    reenviado.loc[mes, ["receita", "lucro_liquido_brl"]] *= 1.5
+    # Um campo some do mês reenviado: o grupo precisa sair dos conjuntos sem mês
+    reenviado = reenviado[~(mes & (reenviado["campo_id"] == 2))]
+
+    materializar_cubo(financeiro_campo[financeiro_campo["data"] < corte], tmp_path / "incremental")
+    atualizar_cubo(financeiro_campo[financeiro_campo["data"] >= corte], tmp_path / "incremental")
+    atualizar_cubo(reenviado[reenviado["data"] == pd.Timestamp("2012-07-01")], tmp_path / "incremental")
+    materializar_cubo(reenviado, tmp_path / "completo")
+
+    incremental, completo = ler_cubo(tmp_path / "incremental"), ler_cubo(tmp_path / "completo")
+    for nome in completo:
+        pd.testing.assert_frame_equal(incremental[nome], completo[nome], check_dtype=False,
+                                      check_categorical=False, rtol=1e-9, obj=nome)
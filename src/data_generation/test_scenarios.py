@@ -0,0 +1,38 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from scenarios import gerar_cenarios, simular_lucro
+
+MESES = pd.date_range("2026-01-01", periods=6, freq="MS")
+
+
+def test_importa_fora_do_diretorio(tmp_path):
+    # Os módulos irmãos vêm do próprio sys.path de scenarios.py, não do conftest
+    caminho = Path(__file__).resolve().parent / "scenarios.py"
+    codigo = ("import importlib.util as u; "
+              f"s = u.spec_from_file_location('scenarios', r'{caminho}'); "
+              "s.loader.exec_module(u.module_from_spec(s))")
+    subprocess.run([sys.executable, "-c", codigo], cwd=tmp_path, check=True)
+
+
+def test_lotes_nao_mudam_a_forma_e_seed_reproduz(dados_brutos, custos_gerais):
+    args = (dados_brutos["campos"], dados_brutos["preco"], dados_brutos["cambio"], MESES)
+    kwargs = dict(n_cenarios=500, seed=3, custos_gerais=custos_gerais)
+
+    lucro = simular_lucro(*args, memoria_max_mb=0.01, **kwargs)
+    assert lucro.shape == (500, len(MESES))
+    assert np.isfinite(lucro).all()
+    np.testing.assert_array_equal(lucro, simular_lucro(*args, memoria_max_mb=0.01, **kwargs))
+    assert not np.array_equal(lucro, simular_lucro(*args, memoria_max_mb=0.01, **{**kwargs, "seed": 4}))
+
+
+def test_percentis_ordenados(dados_brutos):
+    resumo = gerar_cenarios(dados_brutos["campos"], dados_brutos["preco"], dados_brutos["cambio"],
+                            n_meses=6, n_cenarios=500)
+
+    assert list(resumo["horizonte"]) == ["mensal"] * 6 + ["total"]
+    assert (resumo["P10"] <= resumo["P50"]).all() and (resumo["P50"] <= resumo["P90"]).all()
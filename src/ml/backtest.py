@@ -0,0 +1,196 @@
+"""
+Backtesting walk-forward (rolling origin) dos modelos de ML, SARIMA e baselines.
+
+As features já vêm prontas do dataset de ML: são convertidas uma única vez em
+arrays e cada fold apenas fatia (views) essas matrizes. Os baselines são
+calculados uma vez sobre a série inteira e também só fatiados. O SARIMA é
+reajustado a cada `sarima_refit_every` folds; nos demais os parâmetros ajustados
+são reaplicados à nova janela (`results.apply`), sem nova otimização.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, mean_absolute_percentage_error
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+from xgboost import XGBRegressor
+
+from train_baseline import baseline_forecasts
+from train_ml_models import FEATURE_COLS
+from train_time_series import SARIMA_ORDER, SARIMA_SEASONAL_ORDER
+
+TARGETS = ["target_producao_next", "target_receita_next"]
+ML_MODELS = ["RandomForest", "XGBoost"]
+
+
+# -----------------------
+# 1. Folds
+# -----------------------
+def make_folds(n_obs, initial=120, horizon=12, step=12, window="expanding"):
+    """
+    Origens do backtest como tuplas (fold, inicio_treino, fim_treino, fim_teste)
+    em posições inteiras. `window="expanding"` mantém o início do treino fixo;
+    `"sliding"` desloca a janela mantendo `initial` observações.
+    """
+    if window not in ("expanding", "sliding"):
+        raise ValueError(f"Janela desconhecida: {window}")
+    folds = []
+    for fold, train_end in enumerate(range(initial, n_obs - horizon + 1, step)):
+        train_start = 0 if window == "expanding" else train_end - initial
+        folds.append((fold, train_start, train_end, train_end + horizon))
+    return folds
+
+
+def baseline_predictions(y):
+    """
+    Previsões dos baselines para todas as posições de uma vez (NaN onde não há
+    histórico suficiente). Como o target é o valor do mês seguinte, a previsão de
+    uma posição usa apenas targets de posições anteriores.
+    """
+    return {k: v[:, 0] for k, v in baseline_forecasts(y).items()}
+
+
+def _metrics(real, pred):
+    # Só posições com target e previsão (targets do fim da série podem ser NaN)
+    mask = ~np.isnan(pred) & ~np.isnan(real)
+    real, pred = real[mask], pred[mask]
+    if len(real) == 0:
+        return {"MAE": np.nan, "RMSE": np.nan, "MAPE": np.nan}
+    return {
+        "MAE": mean_absolute_error(real, pred),
+        "RMSE": np.sqrt(mean_squared_error(real, pred)),
+        "MAPE": mean_absolute_percentage_error(real, pred),
+    }
+
+
+# -----------------------
+# 2. Avaliação por fold
+# -----------------------
+def _make_model(name):
+    # n_jobs=1: o paralelismo fica entre folds
+    if name == "RandomForest":
+        return RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=1)
+    if name == "XGBoost":
+        return XGBRegressor(n_estimators=300, learning_rate=0.05, max_depth=5, n_jobs=1)
+    raise ValueError(f"Modelo desconhecido: {name}")
+
+
+def evaluate_fold(fold, X, Y, baselines, targets, models):
+    """
+    Avalia os modelos de ML e os baselines de um fold. `X` e `Y` já chegam
+    fatiados até o fim do teste; `baselines` é {target: {modelo: array}} idem.
+    Linhas de treino sem target ficam fora do ajuste e as de teste, fora das métricas.
+    """
+    fold_id, train_start, train_end, test_end = fold
+    rows = []
+    for j, target_col in enumerate(targets):
+        y_train, y_test = Y[train_start:train_end, j], Y[train_end:test_end, j]
+        has_target = ~np.isnan(y_train)
+        for name in models:
+            model = _make_model(name)
+            model.fit(X[train_start:train_end][has_target], y_train[has_target])
+            rows.append({"target": target_col, "modelo": name, "fold": fold_id,
+                         **_metrics(y_test, model.predict(X[train_end:test_end]))})
+        for name, pred in baselines[target_col].items():
+            rows.append({"target": target_col, "modelo": name, "fold": fold_id,
+                         **_metrics(y_test, pred[train_end:test_end])})
+    return rows
+
+
+def backtest_sarima(y, dates, target_col, folds, refit_every=4):
+    """
+    Backtest do SARIMA sobre os folds, em sequência: ajusta nos folds múltiplos de
+    `refit_every` e reaplica os últimos parâmetros nos demais.
+    """
+    series = pd.Series(y, index=pd.DatetimeIndex(dates, freq="MS"))
+    rows, results = [], None
+    for fold_id, train_start, train_end, test_end in folds:
+        train = series.iloc[train_start:train_end]
+        try:
+            if results is None or fold_id % refit_every == 0:
+                model = SARIMAX(train, order=SARIMA_ORDER, seasonal_order=SARIMA_SEASONAL_ORDER,
+                                enforce_stationarity=False)
+                results = model.fit(disp=False, start_params=None if results is None else results.params)
+                fold_results = results
+            else:
+                fold_results = results.apply(train, refit=False)
+            pred = np.asarray(fold_results.forecast(steps=test_end - train_end))
+        except Exception:
+            pred = np.full(test_end - train_end, np.nan)
+        rows.append({"target": target_col, "modelo": "SARIMA", "fold": fold_id,
+                     **_metrics(y[train_end:test_end], pred)})
+    return rows
+
+
+# -----------------------
+# 3. Pipeline principal
+# -----------------------
+def run_backtest(df, targets=TARGETS, models=ML_MODELS, initial=120, horizon=12, step=12,
+                 window="expanding", include_sarima=True, sarima_refit_every=4,
+                 exclude_test=True, n_workers=None, base_dir=".."):
+    """
+    Executa o backtest walk-forward e salva:
+      - models/backtest_folds.csv: métricas por target, modelo e fold;
+      - models/backtest_metrics.csv: as mesmas linhas, lidas por consolidate_metrics
+        (que faz a média dos folds).
+    Com `exclude_test`, as linhas do split "test" ficam fora do backtest (holdout final).
+    """
+    df = df.copy()
+    df["data"] = pd.to_datetime(df["data"])
+    df = df.sort_values("data").reset_index(drop=True)
+    if exclude_test and "split" in df.columns:
+        df = df[df["split"] != "test"].reset_index(drop=True)
+    targets = [t for t in targets if t in df.columns]
+
+    # Features, targets e baselines calculados uma única vez (targets ausentes
+    # continuam NaN: são mascarados no treino e nas métricas de cada fold)
+    X = df[FEATURE_COLS].fillna(0).to_numpy()
+    Y = df[targets].to_numpy(dtype=float)
+    baselines = {t: baseline_predictions(Y[:, j]) for j, t in enumerate(targets)}
+
+    folds = make_folds(len(df), initial=initial, horizon=horizon, step=step, window=window)
+    if not folds:
+        raise ValueError(f"Série curta demais para o backtest: {len(df)} observações, initial={initial}, horizon={horizon}")
+
+    def fold_args(fold):
+        # Cada fold recebe só o prefixo dos dados que usa (views, sem recálculo)
+        end = fold[3]
+        return (fold, X[:end], Y[:end],
+                {t: {k: v[:end] for k, v in b.items()} for t, b in baselines.items()}, targets, models)
+
+    n_workers = n_workers or min(len(folds), os.cpu_count() or 1)
+    rows = []
+    if n_workers <= 1:
+        for fold in folds:
+            rows += evaluate_fold(*fold_args(fold))
+        if include_sarima:
+            for j, t in enumerate(targets):
+                rows += backtest_sarima(Y[:, j], df["data"], t, folds, sarima_refit_every)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            jobs = []
+            if include_sarima:
+                # O SARIMA de cada target é uma cadeia sequencial (warm start entre folds)
+                jobs += [pool.submit(backtest_sarima, Y[:, j], df["data"], t, folds, sarima_refit_every)
+                         for j, t in enumerate(targets)]
+            jobs += [pool.submit(evaluate_fold, *fold_args(fold)) for fold in folds]
+            for job in jobs:
+                rows += job.result()
+
+    fold_info = pd.DataFrame(
+        [(f, df["data"].iloc[s], df["data"].iloc[e - 1], df["data"].iloc[e], df["data"].iloc[t - 1])
+         for f, s, e, t in folds],
+        columns=["fold", "train_start", "train_end", "test_start", "test_end"],
+    )
+    folds_df = pd.DataFrame(rows).merge(fold_info, on="fold").sort_values(["target", "modelo", "fold"])
+
+    os.makedirs(os.path.join(base_dir, "models"), exist_ok=True)
+    folds_df.to_csv(os.path.join(base_dir, "models", "backtest_folds.csv"), index=False, mode='w')
+    metrics_df = folds_df[["target", "modelo", "fold", "MAE", "RMSE", "MAPE"]].assign(
+        modelo=lambda d: "Backtest_" + d["modelo"]
+    )
+    metrics_df.to_csv(os.path.join(base_dir, "models", "backtest_metrics.csv"), index=False, mode='w')
+
+    return folds_df
@@ -0,0 +1,128 @@
+"""
+Engenharia de features declarativa para os modelos de ML.
+
+As features são declaradas uma vez (FEATURE_SPECS) e calculadas de forma
+vetorizada numa única passada sobre o DataFrame ordenado por grupo e data:
+lags e médias móveis usam deslocamentos e somas acumuladas do array inteiro,
+mascarando as posições em que a janela atravessaria a fronteira de um grupo
+(`grupo`, ex.: "campo_id", para séries empilhadas).
+
+`update_features` atualiza um dataset de features já calculado com meses novos,
+recalculando apenas a janela final necessária (o maior lag/janela).
+"""
+
+import numpy as np
+import pandas as pd
+
+# Especificação das features do dataset agregado (usada também no EDA, notebook 06)
+FEATURE_SPECS = [
+    {"tipo": "razao", "nome": "preco_medio_brl", "numerador": "receita_total_brl", "denominador": "producao_total_barris"},
+    {"tipo": "lag", "colunas": {"preco_lag": "preco_medio_brl", "producao_lag": "producao_total_barris"}, "janelas": [1, 3, 6]},
+    {"tipo": "media_movel", "colunas": {"producao_roll": "producao_total_barris"}, "janelas": [3, 12]},
+    {"tipo": "choque", "nome": "shock", "anos": [2008, 2014, 2020, 2022]},
+]
+
+# Mesma especificação sobre as colunas por campo (producao_financeiro)
+FEATURE_SPECS_CAMPO = [
+    {"tipo": "razao", "nome": "preco_medio_brl", "numerador": "receita", "denominador": "producao_barris"},
+    {"tipo": "lag", "colunas": {"preco_lag": "preco_medio_brl", "producao_lag": "producao_barris"}, "janelas": [1, 3, 6]},
+    {"tipo": "media_movel", "colunas": {"producao_roll": "producao_barris"}, "janelas": [3, 12]},
+    {"tipo": "choque", "nome": "shock", "anos": [2008, 2014, 2020, 2022]},
+]
+
+
+def lookback(specs=FEATURE_SPECS):
+    """Quantos meses anteriores as features precisam (maior lag ou janela)."""
+    janelas = [j for spec in specs for j in spec.get("janelas", [])]
+    return max(janelas, default=0)
+
+
+def _posicao_no_grupo(codigos):
+    """Posição de cada linha dentro do seu grupo (dados já ordenados por grupo)."""
+    n = len(codigos)
+    inicio = np.r_[True, codigos[1:] != codigos[:-1]] if n else np.zeros(0, dtype=bool)
+    idx_inicio = np.maximum.accumulate(np.where(inicio, np.arange(n), 0))
+    return np.arange(n) - idx_inicio
+
+
+def _lag(valores, pos, k):
+    out = np.full(len(valores), np.nan)
+    out[k:] = valores[:len(valores) - k]
+    out[pos < k] = np.nan
+    return out
+
+
+def _media_movel(valores, pos, k):
+    """Média das últimas k linhas do grupo; NaN se faltar histórico ou houver NaN na janela."""
+    validos = ~np.isnan(valores)
+    soma = np.r_[0.0, np.cumsum(np.where(validos, valores, 0.0))]
+    cont = np.r_[0, np.cumsum(validos)]
+    out = np.full(len(valores), np.nan)
+    if len(valores) >= k:
+        s = soma[k:] - soma[:-k]
+        c = cont[k:] - cont[:-k]
+        out[k - 1:] = np.where(c == k, s / k, np.nan)
+    out[pos < k - 1] = np.nan
+    return out
+
+
+def build_features(df, specs=FEATURE_SPECS, grupo=None):
+    """
+    Calcula as features declaradas em `specs` numa única passada vetorizada.
+    `grupo` (ex.: "campo_id") calcula lags e médias dentro de cada série.
+    Retorna um novo DataFrame ordenado por grupo e data.
+    """
+    chaves = [grupo, "data"] if grupo else ["data"]
+    out = df.sort_values(chaves).reset_index(drop=True)
+    codigos = out[grupo].to_numpy() if grupo else np.zeros(len(out), dtype=np.int8)
+    pos = _posicao_no_grupo(codigos)
+    anos = pd.DatetimeIndex(out["data"]).year
+
+    novas = {}
+
+    def coluna(nome):
+        return novas[nome] if nome in novas else out[nome].to_numpy(dtype=float)
+
+    for spec in specs:
+        tipo = spec["tipo"]
+        if tipo == "razao":
+            num, den = coluna(spec["numerador"]), coluna(spec["denominador"])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                novas[spec["nome"]] = np.where(den != 0, num / den, np.nan)
+        elif tipo in ("lag", "media_movel"):
+            funcao = _lag if tipo == "lag" else _media_movel
+            valores = {prefixo: coluna(c) for prefixo, c in spec["colunas"].items()}
+            for k in spec["janelas"]:
+                for prefixo, v in valores.items():
+                    novas[f"{prefixo}_{k}"] = funcao(v, pos, k)
+        elif tipo == "choque":
+            for ano in spec["anos"]:
+                novas[f"{spec['nome']}_{ano}"] = (anos == ano).astype(int)
+        else:
+            raise ValueError(f"Tipo de feature desconhecido: {tipo}")
+
+    return out.drop(columns=[c for c in novas if c in out.columns]).assign(**novas)
+
+
+
+def update_features(df_features, df_novos, specs=FEATURE_SPECS, grupo=None):
+    """
+    Modo incremental: acrescenta os meses de `df_novos` (colunas brutas) a um
+    dataset de features já calculado, recalculando apenas a janela final de cada
+    grupo (últimos `lookback(specs)` meses) em vez do histórico inteiro.
+    Meses de `df_novos` que já existem em `df_features` são substituídos.
+    """
+    chaves = [grupo, "data"] if grupo else ["data"]
+    colunas_brutas = list(df_novos.columns)
+    novas_chaves = df_novos[chaves].drop_duplicates()
+
+    antigos = df_features.merge(novas_chaves, on=chaves, how="left", indicator=True)
+    antigos = antigos[antigos["_merge"] == "left_only"].drop(columns="_merge")
+    antigos = antigos.sort_values(chaves)
+
+    janela = lookback(specs)
+    cauda = antigos.groupby(grupo, observed=True).tail(janela) if grupo else antigos.tail(janela)
+    recalculo = build_features(pd.concat([cauda[colunas_brutas], df_novos], ignore_index=True), specs, grupo)
+    recalculo = recalculo.merge(novas_chaves, on=chaves)
+
+    return pd.concat([antigos, recalculo], ignore_index=True).sort_values(chaves).reset_index(drop=True)
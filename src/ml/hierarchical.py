@@ -0,0 +1,228 @@
+"""
+Previsão hierárquica por campo (campo_id → estado / tipo_petroleo → empresa).
+
+Em vez de um modelo por série, as séries de todos os campos são tratadas como uma
+matriz (meses x campos): os baselines são vetorizados sobre a matriz inteira e o
+modelo de árvore é global (um único XGBoost/RandomForest treinado sobre as séries
+empilhadas e normalizadas). As previsões por campo são reconciliadas bottom-up,
+então os níveis estado, tipo_petroleo e total são exatamente a soma dos campos.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from sklearn.ensemble import RandomForestRegressor
+from xgboost import XGBRegressor
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from storage import salvar_tabela
+
+LEVELS = ["estado", "tipo_petroleo"]
+BASELINES = ["persistencia", "sazonal_ingenuo", "media12"]
+GLOBAL_MODELS = ["xgb_global", "rf_global"]
+LAGS = [0, 1, 2, 11]  # y_t, y_{t-1}, y_{t-2}, y_{t-11} (mesmo mês do ano anterior ao alvo)
+
+
+def build_panel(df_prod, value_col, id_col="campo_id"):
+    """Matriz meses x campos com a série `value_col` de cada campo."""
+    panel = df_prod.pivot_table(index="data", columns=id_col, values=value_col, aggfunc="sum", observed=True)
+    panel = panel.sort_index().asfreq("MS").fillna(0.0)
+    return panel
+
+
+def field_hierarchy(df_prod, id_col="campo_id"):
+    """Mapeamento campo_id → estado / tipo_petroleo."""
+    return (
+        df_prod[[id_col] + LEVELS]
+        .drop_duplicates(id_col)
+        .set_index(id_col)
+        .astype(str)
+    )
+
+
+# -----------------------
+# 1. Baselines vetorizados (todas as séries de uma vez)
+# -----------------------
+def baseline_forecast(Y, horizon, method):
+    """
+    Previsão de `horizon` meses para todas as colunas de Y (meses x séries).
+    Retorna array (horizon x séries).
+    """
+    Y = np.asarray(Y, dtype=float)
+    steps = np.arange(horizon)
+    if method == "persistencia":
+        return np.repeat(Y[-1:], horizon, axis=0)
+    if method == "sazonal_ingenuo":
+        return Y[len(Y) - 12 + steps % 12]
+    if method == "media12":
+        return np.repeat(Y[-12:].mean(axis=0, keepdims=True), horizon, axis=0)
+    raise ValueError(f"Baseline desconhecido: {method}")
+
+
+# -----------------------
+# 2. Modelo global sobre séries empilhadas
+# -----------------------
+def _series_scale(Y):
+    """Escala por série (média absoluta dos meses ativos) para normalizar o modelo global."""
+    Y = np.abs(np.asarray(Y, dtype=float))
+    active = Y > 0
+    counts = active.sum(axis=0)
+    scale = Y.sum(axis=0) / np.maximum(counts, 1)
+    return np.where(scale > 0, scale, 1.0)
+
+
+def _features(Z, ts, months_next):
+    """
+    Features das posições `ts` de Z (meses x séries), para prever o mês seguinte.
+    Retorna array (len(ts) * séries, n_features), com as séries variando mais rápido.
+    """
+    C = np.vstack([np.zeros((1, Z.shape[1])), np.cumsum(Z, axis=0)])
+    cols = [Z[ts - lag] for lag in LAGS]
+    cols.append((C[ts + 1] - C[ts - 2]) / 3)    # média móvel 3
+    cols.append((C[ts + 1] - C[ts - 11]) / 12)  # média móvel 12
+    mes = np.broadcast_to(np.asarray(months_next)[:, None], cols[0].shape)
+    cols.append(np.sin(2 * np.pi * mes / 12))
+    cols.append(np.cos(2 * np.pi * mes / 12))
+    return np.stack([c.reshape(-1) for c in cols], axis=1)
+
+
+def fit_global_model(Y, months, model="xgb_global"):
+    """
+    Treina um único modelo sobre todas as séries empilhadas (alvo = mês seguinte,
+    normalizado pela escala de cada série).
+    `months` é o mês do ano (1-12) de cada linha de Y.
+    """
+    Y = np.asarray(Y, dtype=float)
+    scale = _series_scale(Y)
+    Z = Y / scale
+    months = np.asarray(months)
+
+    ts = np.arange(11, len(Z) - 1)
+    X = _features(Z, ts, months[ts + 1])
+    y = Z[ts + 1].reshape(-1)
+
+    if model == "xgb_global":
+        reg = XGBRegressor(n_estimators=300, learning_rate=0.05, max_depth=5, tree_method="hist")
+    elif model == "rf_global":
+        reg = RandomForestRegressor(n_estimators=200, min_samples_leaf=5, n_jobs=-1, random_state=42)
+    else:
+        raise ValueError(f"Modelo global desconhecido: {model}")
+    reg.fit(X, y)
+    return reg, scale
+
+
+def global_forecast(reg, scale, Y, last_month, horizon):
+    """
+    Previsão recursiva de `horizon` meses para todas as séries em lote: a cada passo
+    um único predict para todos os campos, sobre uma janela dos últimos 12 meses.
+    Séries sem valores negativos no histórico (ex.: produção) não recebem previsão negativa.
+    """
+    Y = np.asarray(Y, dtype=float)
+    floor = np.where((Y >= 0).all(axis=0), 0.0, -np.inf)
+    window = Y[-12:] / scale
+    forecast = np.empty((horizon, window.shape[1]))
+    for h in range(horizon):
+        month_next = (last_month + h) % 12 + 1
+        X = _features(window, np.array([11]), [month_next])
+        pred = np.maximum(reg.predict(X), floor)
+        forecast[h] = pred
+        window = np.vstack([window[1:], pred])
+    return forecast * scale
+
+
+# -----------------------
+# 3. Reconciliação bottom-up
+# -----------------------
+def reconcile_bottom_up(forecast, field_ids, hierarchy, dates):
+    """
+    Agrega a previsão por campo (horizonte x campos) para estado, tipo_petroleo e
+    total. Retorna formato longo: data, nivel, chave, previsto.
+    """
+    base = pd.DataFrame(forecast, index=pd.DatetimeIndex(dates, name="data"), columns=field_ids)
+    frames = [base.assign(nivel="campo")]
+    for level in LEVELS:
+        grouped = base.T.groupby(hierarchy.loc[field_ids, level].to_numpy()).sum().T
+        frames.append(grouped.assign(nivel=level))
+    frames.append(base.sum(axis=1).to_frame("total").assign(nivel="total"))
+
+    long = [
+        f.melt(id_vars="nivel", var_name="chave", value_name="previsto", ignore_index=False).reset_index()
+        for f in frames
+    ]
+    out = pd.concat(long, ignore_index=True)
+    out["chave"] = out["chave"].astype(str)
+    return out[["data", "nivel", "chave", "previsto"]]
+
+
+def _metrics(real, pred):
+    real = np.asarray(real, dtype=float)
+    pred = np.asarray(pred, dtype=float)
+    nonzero = real != 0
+    return {
+        "MAE": np.mean(np.abs(real - pred)),
+        "RMSE": np.sqrt(np.mean((real - pred) ** 2)),
+        "MAPE": np.mean(np.abs((real[nonzero] - pred[nonzero]) / real[nonzero])) if nonzero.any() else np.nan,
+    }
+
+
+# -----------------------
+# 4. Pipeline principal
+# -----------------------
+def forecast_fields(Y, dates, horizon, model):
+    """Previsão (horizonte x campos) com um baseline ou um modelo global."""
+    if model in BASELINES:
+        return baseline_forecast(Y, horizon, model)
+    reg, scale = fit_global_model(Y, pd.DatetimeIndex(dates).month, model)
+    return global_forecast(reg, scale, Y, pd.DatetimeIndex(dates)[-1].month, horizon)
+
+
+def train_hierarchical_models(df_prod, targets=("producao_barris",), horizon=12,
+                              models=BASELINES + GLOBAL_MODELS, base_dir=".."):
+    """
+    Avalia (últimos `horizon` meses como teste) e gera previsões futuras por campo,
+    reconciliadas para estado, tipo_petroleo e total.
+    Salva métricas do total em models/hierarchical_metrics.csv (lidas por
+    consolidate_metrics), métricas por nível em models/hierarchical_levels.csv e as
+    previsões em data/processed/predictions_hierarchical.parquet.
+    """
+    hierarchy = field_hierarchy(df_prod)
+    metrics, forecasts = [], []
+
+    for target_col in targets:
+        panel = build_panel(df_prod, target_col)
+        Y, dates, field_ids = panel.to_numpy(), panel.index, panel.columns.to_numpy()
+
+        test_dates = dates[-horizon:]
+        real = reconcile_bottom_up(Y[-horizon:], field_ids, hierarchy, test_dates)
+        future_dates = pd.date_range(dates[-1] + pd.offsets.MonthBegin(), periods=horizon, freq="MS")
+
+        for model in models:
+            # Avaliação: ajusta sem os últimos meses e compara em todos os níveis
+            pred_test = forecast_fields(Y[:-horizon], dates[:-horizon], horizon, model)
+            pred = reconcile_bottom_up(pred_test, field_ids, hierarchy, test_dates)
+            merged = real.merge(pred, on=["data", "nivel", "chave"], suffixes=("_real", "_prev"))
+            for nivel, grupo in merged.groupby("nivel"):
+                metrics.append({
+                    "target": target_col,
+                    "modelo": f"Hierarquico_{model}",
+                    "nivel": nivel,
+                    **_metrics(grupo["previsto_real"], grupo["previsto_prev"]),
+                })
+
+            # Previsão futura com o histórico completo
+            future = reconcile_bottom_up(forecast_fields(Y, dates, horizon, model), field_ids, hierarchy, future_dates)
+            forecasts.append(future.assign(modelo=model, target=target_col))
+
+    metrics_df = pd.DataFrame(metrics)
+    forecasts_df = pd.concat(forecasts, ignore_index=True)
+
+    os.makedirs(os.path.join(base_dir, "models"), exist_ok=True)
+    metrics_df[metrics_df["nivel"] == "total"].drop(columns="nivel").to_csv(
+        os.path.join(base_dir, "models", "hierarchical_metrics.csv"), index=False, mode='w'
+    )
+    metrics_df.to_csv(os.path.join(base_dir, "models", "hierarchical_levels.csv"), index=False, mode='w')
+    salvar_tabela(forecasts_df, Path(base_dir) / "data" / "processed" / "predictions_hierarchical.parquet")
+
+    return metrics_df, forecasts_df
@@ -0,0 +1,144 @@
+"""
+Previsão multi-step recursiva com os modelos de árvore (RandomForest / XGBoost).
+
+Os modelos preveem o mês seguinte (target_producao_next e target_receita_next) a
+partir das features de FEATURE_COLS. Para horizontes de 12-36 meses as duas
+previsões são realimentadas: a cada passo a produção e a receita previstas viram
+o mês corrente, o preço médio é recalculado e os lags/médias móveis avançam.
+
+O histórico de cada série fica num ring buffer pré-alocado (séries x 12 meses)
+com somas móveis mantidas incrementalmente, então cada passo custa O(séries) e o
+horizonte inteiro custa O(horizonte x séries). Todas as séries (campos, cenários
+ou origens) são previstas juntas: um predict por modelo e por passo.
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from registry import load_model
+from train_ml_models import FEATURE_COLS
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from storage import salvar_tabela
+
+WINDOW = 12  # maior janela usada pelas features (producao_roll_12)
+SHOCK_YEARS = [2008, 2014, 2020, 2022]
+TARGETS = {"producao": "target_producao_next", "receita": "target_receita_next"}
+
+
+# -----------------------
+# 1. Estado (ring buffers)
+# -----------------------
+def _preco_medio(receita, producao):
+    # Mesma convenção do treino: preço indefinido (produção zero) vira 0 no fillna
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(producao != 0, receita / producao, 0.0)
+
+
+def init_state(producao, receita):
+    """
+    Estado inicial a partir dos últimos WINDOW meses de cada série.
+    `producao` e `receita` são arrays (séries x meses), meses em ordem cronológica.
+    """
+    producao = np.atleast_2d(np.asarray(producao, dtype=float))[:, -WINDOW:]
+    receita = np.atleast_2d(np.asarray(receita, dtype=float))[:, -WINDOW:]
+    if producao.shape[1] < WINDOW:
+        raise ValueError(f"São necessários pelo menos {WINDOW} meses de histórico por série")
+    return {
+        "producao": producao.copy(),
+        "preco": _preco_medio(receita, producao),
+        "pos": WINDOW - 1,  # posição do mês corrente
+        "soma3": producao[:, -3:].sum(axis=1),
+        "soma12": producao.sum(axis=1),
+    }
+
+
+def _lag(buf, pos, k):
+    return buf[:, (pos - k) % WINDOW]
+
+
+def state_features(state, data):
+    """Matriz de features (séries x FEATURE_COLS) do mês corrente `data`."""
+    pos, prod, preco = state["pos"], state["producao"], state["preco"]
+    n = prod.shape[0]
+    data = pd.Timestamp(data)
+    cols = {
+        "preco_medio_brl": _lag(preco, pos, 0),
+        "producao_roll_3": state["soma3"] / 3,
+        "producao_roll_12": state["soma12"] / 12,
+        "mes_sin": np.full(n, np.sin(2 * np.pi * data.month / 12)),
+        "mes_cos": np.full(n, np.cos(2 * np.pi * data.month / 12)),
+    }
+    for k in (1, 3, 6):
+        cols[f"preco_lag_{k}"] = _lag(preco, pos, k)
+        cols[f"producao_lag_{k}"] = _lag(prod, pos, k)
+    for ano in SHOCK_YEARS:
+        cols[f"shock_{ano}"] = np.full(n, int(data.year == ano))
+    return pd.DataFrame(cols)[FEATURE_COLS]
+
+
+def push(state, producao, receita):
+    """Avança um mês: grava os novos valores e atualiza as somas móveis em O(séries)."""
+    pos = (state["pos"] + 1) % WINDOW
+    prod = state["producao"]
+    state["soma3"] += producao - prod[:, (pos - 3) % WINDOW]
+    state["soma12"] += producao - prod[:, pos]  # valor mais antigo, sobrescrito agora
+    prod[:, pos] = producao
+    state["preco"][:, pos] = _preco_medio(receita, producao)
+    state["pos"] = pos
+
+
+# -----------------------
+# 2. Rollout recursivo
+# -----------------------
+def recursive_forecast(producao, receita, last_date, horizon, model_producao, model_receita):
+    """
+    Previsão recursiva de `horizon` meses para todas as séries em lote.
+    Retorna dois arrays (séries x horizonte): produção e receita previstas.
+    """
+    state = init_state(producao, receita)
+    n = state["producao"].shape[0]
+    out_prod = np.empty((n, horizon))
+    out_rec = np.empty((n, horizon))
+    data = pd.Timestamp(last_date)
+    for h in range(horizon):
+        X = state_features(state, data)
+        prod_next = np.asarray(model_producao.predict(X), dtype=float)
+        rec_next = np.asarray(model_receita.predict(X), dtype=float)
+        out_prod[:, h], out_rec[:, h] = prod_next, rec_next
+        push(state, prod_next, rec_next)
+        data += pd.offsets.MonthBegin()
+    return out_prod, out_rec
+
+
+def multistep_forecast(df_agg, horizon=36, models=("RandomForest", "XGBoost"),
+                       registry_dir="../models/registry", output_file=None):
+    """
+    Previsão de `horizon` meses da produção e da receita totais com cada modelo
+    do registro. Retorna formato longo: data, variavel, modelo, previsto.
+    """
+    df_agg = df_agg.sort_values("data")
+    producao = df_agg["producao_total_barris"].to_numpy()[None, :]
+    receita = df_agg["receita_total_brl"].to_numpy()[None, :]
+    last_date = pd.Timestamp(df_agg["data"].iloc[-1])
+    future_months = pd.date_range(last_date + pd.offsets.MonthBegin(), periods=horizon, freq="MS")
+
+    frames = []
+    for model_name in models:
+        model_prod, _ = load_model(TARGETS["producao"], model_name, registry_dir)
+        model_rec, _ = load_model(TARGETS["receita"], model_name, registry_dir)
+        prev_prod, prev_rec = recursive_forecast(producao, receita, last_date, horizon, model_prod, model_rec)
+        for variavel, prev in [("producao_total_barris", prev_prod), ("receita_total_brl", prev_rec)]:
+            frames.append(pd.DataFrame({
+                "data": future_months,
+                "variavel": variavel,
+                "modelo": model_name,
+                "previsto": prev[0],
+            }))
+
+    forecast_df = pd.concat(frames, ignore_index=True)
+    if output_file is not None:
+        salvar_tabela(forecast_df, output_file)
+    return forecast_df
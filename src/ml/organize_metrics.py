@@ -3,7 +3,7 @@ from pathlib import Path
 
 def consolidate_metrics(base_dir="../models", output_file="../models/all_metrics.csv"):
     BASE_DIR = Path(base_dir)
-    metric_files = list(BASE_DIR.glob("*_metrics.csv"))
+    metric_files = [f for f in BASE_DIR.glob("*_metrics.csv") if f.resolve() != Path(output_file).resolve()]
 
     def normalize_columns(df):
         df = df.copy()
@@ -17,6 +17,9 @@ def consolidate_metrics(base_dir="../models", output_file="../models/all_metrics
         for col in keep_cols:
             if col not in df.columns:
                 df[col] = pd.NA
+        # Backtests trazem uma linha por fold: resume pela média dos folds
+        if 'fold' in df.columns:
+            df = df.groupby(['target', 'modelo'], as_index=False, sort=False)[['MAE', 'RMSE', 'MAPE', 'R2']].mean()
         return df[keep_cols]
 
     dfs = [normalize_columns(pd.read_csv(f)) for f in metric_files]
@@ -5,13 +5,7 @@ Gera o dataset final para modelagem (ML) com targets e splits temporais.
 import pandas as pd
 import numpy as np
 from pathlib import Path
-
-def load_features(base_dir: Path):
-    """Carrega o dataset de features gerado no EDA."""
-    features_path = base_dir / "data" / "processed" / "ml_dataset_features.csv"
-    df = pd.read_csv(features_path, parse_dates=["data"])
-    df = df.sort_values("data").reset_index(drop=True)
-    return df
+from features import build_features
 
 def create_targets(df: pd.DataFrame):
     """Cria as colunas de target (valores do próximo mês)."""
@@ -41,9 +35,13 @@ def save_final_dataset(df: pd.DataFrame, base_dir: Path):
     print(f"✅ Dataset final salvo em: {output_path}")
     return output_path
 
-def prepare_ml_dataset(base_dir: Path):
-    """Pipeline principal."""
-    df = load_features(base_dir)
+def prepare_ml_dataset(base_dir: Path, df_agg: pd.DataFrame):
+    """
+    Pipeline principal.
+    Recebe os agregados mensais (financials_consolidated) e calcula as features
+    com features.build_features.
+    """
+    df = build_features(df_agg)
     df = create_targets(df)
     df = add_temporal_features(df)
     df = temporal_split(df)
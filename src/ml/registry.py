@@ -0,0 +1,150 @@
+"""
+Registro de modelos treinados para inferência sem retreino.
+
+Cada artefato fica em models/registry/{target}/{modelo}/{versao}/, onde a versão
+identifica os dados de treino e os hiperparâmetros (model_version):
+  - XGBoost no formato nativo binário (model.ubj), sem pickle;
+  - RandomForest com joblib (model.joblib), comprimido por padrão ou sem
+    compressão para ser carregado com memory-map (mmap_mode="r");
+  - meta.json com features, métricas e formato.
+latest.json em {target}/{modelo}/ aponta para a versão mais recente.
+
+Os modelos são carregados só no primeiro uso e ficam em cache no processo.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from functools import lru_cache
+
+import joblib
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+REGISTRY_DIR = "../models/registry"
+
+
+def data_hash(X, *arrays):
+    """
+    Hash do conteúdo dos dados de treino: features `X` e, em ordem, os demais
+    arrays (target, e na busca de hiperparâmetros também features/target de validação).
+    """
+    h = hashlib.sha256(pd.util.hash_pandas_object(pd.DataFrame(X), index=False).values.tobytes())
+    for a in arrays:
+        a = np.asarray(a)
+        obj = pd.DataFrame(a) if a.ndim == 2 else pd.Series(a)
+        h.update(pd.util.hash_pandas_object(obj, index=False).values.tobytes())
+    return h.hexdigest()[:16]
+
+
+def model_version(X, y, params):
+    """
+    Versão de um modelo: hash dos dados de treino e dos hiperparâmetros. Mudar
+    qualquer um dos dois gera outro diretório (e outra entrada no cache do processo).
+    """
+    h = hashlib.sha256(data_hash(X, y).encode())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:16]
+
+
+def _model_dir(registry_dir, target_col, model_name, version=None):
+    base = os.path.join(registry_dir, target_col, model_name)
+    return base if version is None else os.path.join(base, version)
+
+
+def save_model(model, target_col, model_name, version, features, registry_dir=REGISTRY_DIR,
+               metrics=None, compress=3):
+    """
+    Salva o modelo no registro e marca a versão como a mais recente.
+    `compress=0` grava o RandomForest sem compressão, o que permite carregá-lo com mmap.
+    """
+    path = _model_dir(registry_dir, target_col, model_name, version)
+    os.makedirs(path, exist_ok=True)
+
+    if isinstance(model, XGBRegressor):
+        fmt, artifact = "xgboost-ubj", "model.ubj"
+        model.save_model(os.path.join(path, artifact))
+    else:
+        fmt, artifact = "joblib", "model.joblib"
+        joblib.dump(model, os.path.join(path, artifact), compress=compress)
+
+    meta = {
+        "target": target_col,
+        "modelo": model_name,
+        "versao": version,
+        "formato": fmt,
+        "arquivo": artifact,
+        "mmap": fmt == "joblib" and not compress,
+        "features": list(features),
+        "metricas": metrics or {},
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, default=float)
+    with open(os.path.join(_model_dir(registry_dir, target_col, model_name), "latest.json"), "w", encoding="utf-8") as f:
+        json.dump({"versao": version}, f)
+    return path
+
+
+def resolve_version(target_col, model_name, registry_dir=REGISTRY_DIR, version=None):
+    """Versão pedida ou a mais recente registrada."""
+    if version is not None:
+        return version
+    latest = os.path.join(_model_dir(registry_dir, target_col, model_name), "latest.json")
+    if not os.path.exists(latest):
+        raise FileNotFoundError(f"Nenhum modelo registrado para {model_name}/{target_col} em {registry_dir}")
+    with open(latest, encoding="utf-8") as f:
+        return json.load(f)["versao"]
+
+
+@lru_cache(maxsize=None)
+def _load_artifact(path):
+    """Carrega (uma única vez por processo) o modelo e os metadados de uma versão."""
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    artifact = os.path.join(path, meta["arquivo"])
+    if meta["formato"] == "xgboost-ubj":
+        model = XGBRegressor()
+        model.load_model(artifact)
+    else:
+        model = joblib.load(artifact, mmap_mode="r" if meta["mmap"] else None)
+    return model, meta
+
+
+def load_model(target_col, model_name, registry_dir=REGISTRY_DIR, version=None):
+    """Retorna (modelo, meta), do cache do processo se já foi carregado."""
+    version = resolve_version(target_col, model_name, registry_dir, version)
+    return _load_artifact(os.path.abspath(_model_dir(registry_dir, target_col, model_name, version)))
+
+
+def clear_cache():
+    _load_artifact.cache_clear()
+
+
+def predict(df, target_col, model_name, registry_dir=REGISTRY_DIR, version=None):
+    """
+    Previsões de um modelo registrado para as linhas de `df` (ex.: meses novos),
+    sem retreino. As features usadas são as gravadas nos metadados.
+    """
+    model, meta = load_model(target_col, model_name, registry_dir, version)
+    X = df[meta["features"]].fillna(0)
+    return model.predict(X)
+
+
+def predict_frame(df, targets, models, registry_dir=REGISTRY_DIR):
+    """
+    Previsões de vários targets e modelos em formato longo
+    (data, target, modelo, previsto).
+    """
+    frames = []
+    for target_col in targets:
+        for model_name in models:
+            frames.append(pd.DataFrame({
+                "data": df["data"].to_numpy(),
+                "target": target_col,
+                "modelo": model_name,
+                "previsto": predict(df, target_col, model_name, registry_dir),
+            }))
+    return pd.concat(frames, ignore_index=True)
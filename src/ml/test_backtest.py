@@ -0,0 +1,44 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from backtest import _metrics, evaluate_fold, run_backtest, baseline_predictions
+from train_ml_models import FEATURE_COLS
+
+TARGET = "target_producao_next"
+
+
+def test_targets_ausentes_fora_do_treino_e_das_metricas(dataset_ml):
+    df = dataset_ml.reset_index(drop=True)
+    X = df[FEATURE_COLS].fillna(0).to_numpy()
+    y = df[TARGET].to_numpy(dtype=float, copy=True)
+    y[[30, 31]] = np.nan     # buracos no treino
+    y[-3:] = np.nan          # fim da série sem target
+    fold = (0, 0, len(df) - 12, len(df))
+
+    rows = evaluate_fold(fold, X, y[:, None], {TARGET: baseline_predictions(y)}, [TARGET], ["RandomForest"])
+    rf = next(r for r in rows if r["modelo"] == "RandomForest")
+
+    treino = ~np.isnan(y[:fold[2]])
+    esperado = RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=1)
+    esperado.fit(X[:fold[2]][treino], y[:fold[2]][treino])
+    pred = esperado.predict(X[fold[2]:])
+    assert rf["MAE"] == _metrics(y[fold[2]:-3], pred[:-3])["MAE"]
+    assert all(np.isfinite(r["MAE"]) for r in rows)
+
+
+def test_backtest_sem_holdout_ignora_targets_finais(dataset_ml, tmp_path):
+    df = dataset_ml.copy()
+    df.loc[df.index[-2:], TARGET] = np.nan
+    # O último fold testa os 12 meses finais, incluindo os sem target
+    folds = run_backtest(df, targets=[TARGET], models=["RandomForest"], initial=len(df) - 24, horizon=12,
+                         step=12, include_sarima=False, exclude_test=False, n_workers=1, base_dir=tmp_path)
+
+    assert folds["MAE"].notna().all()
+    # Persistência no último fold: erro só nas posições com target
+    y = df[TARGET].to_numpy(dtype=float)
+    fim_treino = len(df) - 12
+    pred = baseline_predictions(y)["persistencia"][fim_treino:fim_treino + 12]
+    real = y[fim_treino:fim_treino + 12]
+    ultimo = folds[(folds["modelo"] == "persistencia") & (folds["fold"] == folds["fold"].max())]
+    assert ultimo["MAE"].iloc[0] == np.abs(real - pred)[~np.isnan(real)].mean()
+    assert (tmp_path / "models" / "backtest_metrics.csv").exists()
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import FEATURE_SPECS_CAMPO, build_features, update_features
+
+
+def features_pandas(df_agg):
+    """Features como eram calculadas no EDA (notebook 06), com shift/rolling do pandas."""
+    df = df_agg.sort_values("data").set_index("data")
+    df["preco_medio_brl"] = (df["receita_total_brl"] / df["producao_total_barris"]).replace([np.inf, -np.inf], np.nan)
+    for lag in [1, 3, 6]:
+        df[f"preco_lag_{lag}"] = df["preco_medio_brl"].shift(lag)
+        df[f"producao_lag_{lag}"] = df["producao_total_barris"].shift(lag)
+    df["producao_roll_3"] = df["producao_total_barris"].rolling(3).mean()
+    df["producao_roll_12"] = df["producao_total_barris"].rolling(12).mean()
+    for ano in [2008, 2014, 2020, 2022]:
+        df[f"shock_{ano}"] = (df.index.year == ano).astype(int)
+    return df.reset_index()
+
+
+def test_build_features_igual_ao_eda(agregados):
+    obtido = build_features(agregados.sample(frac=1, random_state=0))
+    esperado = features_pandas(agregados)
+    pd.testing.assert_frame_equal(obtido[esperado.columns], esperado, rtol=1e-12)
+
+
+def test_build_features_por_grupo(financeiro_campo):
+    colunas = {"receita_total_brl": "receita", "producao_total_barris": "producao_barris"}
+    df = financeiro_campo[["campo_id", "data", *colunas.values()]].rename(columns={v: k for k, v in colunas.items()})
+    obtido = build_features(df, grupo="campo_id")
+
+    for campo_id in [1, 7]:
+        serie = df[df["campo_id"] == campo_id]
+        esperado = features_pandas(serie)
+        pd.testing.assert_frame_equal(
+            obtido[obtido["campo_id"] == campo_id].reset_index(drop=True)[esperado.columns], esperado, rtol=1e-12,
+        )
+
+
+def test_tipo_desconhecido(agregados):
+    with pytest.raises(ValueError, match="Tipo de feature desconhecido"):
+        build_features(agregados, specs=[{"tipo": "diferenca"}])
+
+
+def test_update_features_igual_ao_recalculo(agregados, financeiro_campo):
+    corte = pd.Timestamp("2023-07-01")
+    completo = build_features(agregados)
+    historico = build_features(agregados[agregados["data"] < corte])
+    novos = agregados[agregados["data"] >= corte]
+    pd.testing.assert_frame_equal(update_features(historico, novos)[completo.columns], completo)
+
+    df = financeiro_campo[["campo_id", "data", "receita", "producao_barris"]]
+    completo = build_features(df, FEATURE_SPECS_CAMPO, grupo="campo_id")
+    historico = build_features(df[df["data"] < corte], FEATURE_SPECS_CAMPO, grupo="campo_id")
+    # Reenvio de um mês já calculado junto com os meses novos
+    novos = df[df["data"] >= corte - pd.DateOffset(months=1)]
+    obtido = update_features(historico, novos, FEATURE_SPECS_CAMPO, grupo="campo_id")
+    pd.testing.assert_frame_equal(obtido[completo.columns], completo)
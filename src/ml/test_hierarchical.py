@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from hierarchical import LAGS, _features, baseline_forecast, build_panel, train_hierarchical_models
+
+
+def test_features_empilhadas_iguais_ao_loop(producao):
+    Y = build_panel(producao, "producao_barris").to_numpy()
+    ts = np.array([11, 40, len(Y) - 2])
+    X = _features(Y, ts, [1, 6, 12])
+
+    # Linha (t, série j) = posição t * séries + j
+    for i, t in enumerate(ts):
+        for j in [0, 5, Y.shape[1] - 1]:
+            esperado = [Y[t - lag, j] for lag in LAGS] + [Y[t - 2:t + 1, j].mean(), Y[t - 11:t + 1, j].mean()]
+            np.testing.assert_allclose(X[i * Y.shape[1] + j, :len(esperado)], esperado, rtol=1e-12)
+
+
+def test_baselines_vetorizados():
+    Y = np.arange(30.0).reshape(15, 2)
+    np.testing.assert_array_equal(baseline_forecast(Y, 3, "persistencia"), [Y[-1]] * 3)
+    np.testing.assert_array_equal(baseline_forecast(Y, 14, "sazonal_ingenuo"), np.vstack([Y[-12:], Y[-12:-10]]))
+    np.testing.assert_array_equal(baseline_forecast(Y, 2, "media12"), [Y[-12:].mean(axis=0)] * 2)
+
+
+def test_reconciliacao_bottom_up(tmp_path, producao):
+    metrics, forecasts = train_hierarchical_models(producao, models=["sazonal_ingenuo", "xgb_global"],
+                                                   base_dir=tmp_path)
+
+    assert set(metrics["nivel"]) == {"campo", "estado", "tipo_petroleo", "total"}
+    assert (tmp_path / "models" / "hierarchical_metrics.csv").exists()
+    for _, grupo in forecasts.groupby(["modelo", "data"]):
+        total = grupo.loc[grupo["nivel"] == "total", "previsto"].item()
+        for nivel in ["campo", "estado", "tipo_petroleo"]:
+            np.testing.assert_allclose(grupo.loc[grupo["nivel"] == nivel, "previsto"].sum(), total, rtol=1e-9)
+    assert (forecasts["previsto"] >= 0).all()
+    assert forecasts["data"].min() == producao["data"].max() + pd.offsets.MonthBegin()
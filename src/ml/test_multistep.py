@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from features import build_features
+from multistep import WINDOW, init_state, push, recursive_forecast, state_features
+from prepare_dataset import add_temporal_features
+from train_ml_models import FEATURE_COLS
+
+
+def features_do_historico(df_agg):
+    """Features da última linha recalculadas do zero sobre o histórico inteiro."""
+    return add_temporal_features(build_features(df_agg))[FEATURE_COLS].fillna(0).iloc[[-1]]
+
+
+def test_ring_buffer_igual_a_build_features(agregados):
+    df = agregados.sort_values("data").reset_index(drop=True)
+    esperado = add_temporal_features(build_features(df))[FEATURE_COLS].fillna(0)
+    producao, receita = df["producao_total_barris"].to_numpy(), df["receita_total_brl"].to_numpy()
+
+    state = init_state(producao[:WINDOW], receita[:WINDOW])
+    for t in range(WINDOW - 1, len(df)):
+        if t >= WINDOW:
+            push(state, producao[t:t + 1], receita[t:t + 1])
+        obtido = state_features(state, df["data"].iloc[t])
+        np.testing.assert_allclose(obtido.to_numpy()[0], esperado.iloc[t].to_numpy(), rtol=1e-9,
+                                   err_msg=str(df["data"].iloc[t]))
+
+
+def test_rollout_igual_a_recalcular_features(dataset_ml, agregados):
+    treino = dataset_ml.dropna(subset=["target_producao_next", "target_receita_next"])
+    X = treino[FEATURE_COLS].fillna(0)
+    modelo_prod = LinearRegression().fit(X, treino["target_producao_next"])
+    modelo_rec = LinearRegression().fit(X, treino["target_receita_next"])
+
+    historico = agregados.sort_values("data")[["data", "producao_total_barris", "receita_total_brl"]]
+    prev_prod, prev_rec = recursive_forecast(historico["producao_total_barris"].to_numpy()[None, :],
+                                             historico["receita_total_brl"].to_numpy()[None, :],
+                                             historico["data"].iloc[-1], 6, modelo_prod, modelo_rec)
+
+    # Referência: a cada passo anexa a previsão e recalcula as features do histórico inteiro
+    for h in range(6):
+        x = features_do_historico(historico)
+        prod, rec = modelo_prod.predict(x)[0], modelo_rec.predict(x)[0]
+        np.testing.assert_allclose([prev_prod[0, h], prev_rec[0, h]], [prod, rec], rtol=1e-9)
+        historico = pd.concat([historico, pd.DataFrame({
+            "data": [historico["data"].iloc[-1] + pd.offsets.MonthBegin()],
+            "producao_total_barris": [prod], "receita_total_brl": [rec],
+        })], ignore_index=True)
@@ -0,0 +1,16 @@
+from prepare_dataset import prepare_ml_dataset
+from features import build_features
+
+
+def test_dataset_a_partir_dos_agregados(tmp_path, agregados):
+    (tmp_path / "data" / "processed").mkdir(parents=True)
+    df = prepare_ml_dataset(tmp_path, agregados)
+
+    assert (tmp_path / "data" / "processed" / "ml_dataset.csv").exists()
+    assert not (tmp_path / "data" / "processed" / "ml_dataset_features.csv").exists()
+    assert len(df) == len(agregados) - 1  # último mês não tem target
+    assert (df["target_producao_next"].to_numpy() == agregados["producao_total_barris"].to_numpy()[1:]).all()
+    assert set(build_features(agregados).columns) <= set(df.columns)
+    assert df.groupby("split")["ano"].agg(["min", "max"]).to_dict("index") == {
+        "train": {"min": 2005, "max": 2020}, "val": {"min": 2021, "max": 2023}, "test": {"min": 2024, "max": 2025},
+    }
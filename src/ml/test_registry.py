@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from xgboost import XGBRegressor
+
+from registry import load_model, model_version, predict_frame, save_model
+from train_ml_models import FEATURE_COLS
+
+TARGET = "target_producao_next"
+
+
+def treinar(dataset_ml, registry_dir, model_name, params):
+    X, y = dataset_ml[FEATURE_COLS].fillna(0), dataset_ml[TARGET]
+    model = (RandomForestRegressor(random_state=42, **params) if model_name == "RandomForest"
+             else XGBRegressor(**params)).fit(X, y)
+    version = model_version(X, y, params)
+    save_model(model, TARGET, model_name, version, FEATURE_COLS, str(registry_dir))
+    return model, version
+
+
+def test_versao_inclui_hiperparametros(tmp_path, dataset_ml):
+    X, y = dataset_ml[FEATURE_COLS].fillna(0), dataset_ml[TARGET]
+    assert model_version(X, y, {"n_estimators": 10}) == model_version(X.copy(), y.copy(), {"n_estimators": 10})
+    assert model_version(X, y, {"n_estimators": 10}) != model_version(X, y, {"n_estimators": 20})
+
+    # Retreino com outros hiperparâmetros: nova versão, sem reaproveitar o modelo em cache
+    _, v1 = treinar(dataset_ml, tmp_path, "RandomForest", {"n_estimators": 5})
+    load_model(TARGET, "RandomForest", str(tmp_path))
+    modelo, v2 = treinar(dataset_ml, tmp_path, "RandomForest", {"n_estimators": 10, "max_depth": 3})
+    carregado, meta = load_model(TARGET, "RandomForest", str(tmp_path))
+    assert v1 != v2 and meta["versao"] == v2
+    X = dataset_ml[FEATURE_COLS].fillna(0)
+    np.testing.assert_array_equal(carregado.predict(X), modelo.predict(X))
+
+
+def test_predict_frame(tmp_path, dataset_ml):
+    rf, _ = treinar(dataset_ml, tmp_path, "RandomForest", {"n_estimators": 5})
+    xgb, _ = treinar(dataset_ml, tmp_path, "XGBoost", {"n_estimators": 20})
+    pred = predict_frame(dataset_ml, [TARGET], ["RandomForest", "XGBoost"], str(tmp_path))
+
+    assert list(pred.columns) == ["data", "target", "modelo", "previsto"]
+    X = dataset_ml[FEATURE_COLS].fillna(0)
+    np.testing.assert_allclose(pred.loc[pred["modelo"] == "RandomForest", "previsto"], rf.predict(X))
+    np.testing.assert_allclose(pred.loc[pred["modelo"] == "XGBoost", "previsto"], xgb.predict(X), rtol=1e-6)
+
+
+def test_ml_predictions_do_mes_seguinte(tmp_path, dataset_ml, agregados):
+    from generate_predictions_script import ml_predictions
+    for target in ["target_producao_next", "target_receita_next"]:
+        for model_name in ["RandomForest", "XGBoost"]:
+            X, y = dataset_ml[FEATURE_COLS].fillna(0), dataset_ml[target]
+            model = (RandomForestRegressor(n_estimators=5, random_state=42) if model_name == "RandomForest"
+                     else XGBRegressor(n_estimators=20)).fit(X, y)
+            save_model(model, target, model_name, model_version(X, y, {}), FEATURE_COLS, str(tmp_path))
+
+    pred = ml_predictions(agregados, registry_dir=tmp_path)
+    assert len(pred) == 4 * len(agregados)
+    assert pred["data"].min() == agregados["data"].min() + pd.DateOffset(months=1)
+    assert pred["data"].max() == agregados["data"].max() + pd.DateOffset(months=1)
+    assert set(pred["variavel"]) == {"producao_total_barris", "receita_total_brl"}
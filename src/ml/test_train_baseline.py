@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_absolute_percentage_error
+
+from train_baseline import baseline_forecasts, baseline_metrics
+
+
+def baselines_pandas(serie, alpha):
+    """Baselines de uma série, como no laço original por coluna (shift/rolling/ewm)."""
+    return {
+        "persistencia": serie.shift(1),
+        "sazonal_ingenuo": serie.shift(12),
+        "media6m": serie.rolling(6).mean().shift(1),
+        f"ses_{alpha:g}": serie.ewm(alpha=alpha, adjust=False, ignore_na=True).mean().shift(1),
+    }
+
+
+def test_baselines_iguais_ao_pandas(dataset_ml):
+    Y = dataset_ml[["target_producao_next", "target_receita_next"]].to_numpy(dtype=float, copy=True)
+    Y[[30, 31, 100], 0] = np.nan  # buracos no meio da série, além do NaN final
+    preds = baseline_forecasts(Y)
+
+    for j in range(Y.shape[1]):
+        for nome, esperado in baselines_pandas(pd.Series(Y[:, j]), 0.5).items():
+            np.testing.assert_allclose(preds[nome][:, j], esperado.to_numpy(), rtol=1e-10, equal_nan=True)
+
+
+def test_metricas_por_serie_com_mascara_propria(dataset_ml):
+    Y = dataset_ml[["target_producao_next", "target_receita_next"]].to_numpy(dtype=float)
+    preds = baseline_forecasts(Y)
+    metricas = baseline_metrics(Y, preds, names=["producao", "receita"]).set_index(["modelo", "target"])
+
+    for j, nome in enumerate(["producao", "receita"]):
+        real, pred = Y[:, j], preds["media12m"][:, j]
+        mask = ~np.isnan(real) & ~np.isnan(pred)
+        linha = metricas.loc[("media12m", nome)]
+        np.testing.assert_allclose(linha["MAE"], mean_absolute_error(real[mask], pred[mask]), rtol=1e-12)
+        np.testing.assert_allclose(linha["MAPE"], mean_absolute_percentage_error(real[mask], pred[mask]), rtol=1e-12)
@@ -0,0 +1,28 @@
+import multiprocessing as mp
+import time
+
+import pandas as pd
+
+from train_time_series import fit_sarima_parallel, train_sarima
+
+TARGETS = ["producao_total_barris", "receita_total_brl", "lucro_total_brl"]
+
+
+def test_paralelo_igual_ao_sequencial(agregados):
+    paralelo = fit_sarima_parallel(agregados, TARGETS, n_workers=2, timeout=120)
+
+    assert list(paralelo) == TARGETS
+    for target in TARGETS:
+        metricas, previsao = train_sarima(agregados, target)
+        assert paralelo[target][0] == metricas
+        pd.testing.assert_series_equal(paralelo[target][1], previsao)
+
+
+def test_timeout_por_ajuste(agregados):
+    inicio = time.monotonic()
+    resultados = fit_sarima_parallel(agregados, TARGETS, n_workers=2, timeout=0.05)
+
+    # Cada ajuste estoura o próprio prazo; o da fila não espera os anteriores terminarem
+    assert resultados == {t: (None, "timeout após 0.05s") for t in TARGETS}
+    assert time.monotonic() - inicio < 10
+    assert not mp.active_children()
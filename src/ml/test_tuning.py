@@ -0,0 +1,43 @@
+import json
+
+import pandas as pd
+
+from registry import model_version
+from train_ml_models import FEATURE_COLS, train_ml_models
+from tuning import tune_model
+
+TARGET = "target_producao_next"
+
+
+def historicos(tuning_dir):
+    return sorted(p.name for p in tuning_dir.glob("trials_*.jsonl"))
+
+
+def test_historico_por_dados(tmp_path, dataset_ml):
+    tuning_dir = tmp_path / "tuning"
+    melhor = tune_model(dataset_ml, "RandomForest", TARGET, n_trials=2, n_cores=1, tuning_dir=tuning_dir)
+    assert len(historicos(tuning_dir)) == 1
+
+    # Mesmos dados: retoma o histórico sem novos trials
+    assert tune_model(dataset_ml, "RandomForest", TARGET, n_trials=2, n_cores=1, tuning_dir=tuning_dir) == melhor
+    linhas = (tuning_dir / historicos(tuning_dir)[0]).read_text(encoding="utf-8").splitlines()
+    assert len(linhas) == 2
+
+    # Dados novos: histórico novo, sem reaproveitar o MAE dos dados antigos
+    alterado = dataset_ml.copy()
+    alterado[TARGET] *= 2
+    novo = tune_model(alterado, "RandomForest", TARGET, n_trials=2, n_cores=1, tuning_dir=tuning_dir)
+    assert len(historicos(tuning_dir)) == 2
+    assert novo["val_MAE"] != melhor["val_MAE"]
+
+
+def test_treino_final_usa_split_temporal(tmp_path, dataset_ml):
+    dataset_path = tmp_path / "ml_dataset.csv"
+    dataset_ml.to_csv(dataset_path, index=False)
+    train_ml_models(dataset_path, models_dir=tmp_path / "models")
+
+    df = pd.read_csv(dataset_path)
+    treino = df[df["split"].isin(["train", "val"])]
+    versao = model_version(treino[FEATURE_COLS].fillna(0), treino[TARGET].fillna(0), {"n_estimators": 200})
+    latest = tmp_path / "models" / "registry" / TARGET / "RandomForest" / "latest.json"
+    assert json.loads(latest.read_text(encoding="utf-8"))["versao"] == versao
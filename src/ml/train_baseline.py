@@ -1,49 +1,118 @@
 import pandas as pd
 import numpy as np
 import os
-from sklearn.metrics import mean_absolute_error, mean_squared_error, mean_absolute_percentage_error
 
-def train_baseline_models(path_dataset):
+MA_WINDOWS = (3, 6, 12)
+ES_ALPHAS = (0.2, 0.5, 0.8)
+SEASON = 12
+
+
+def baseline_forecasts(Y, ma_windows=MA_WINDOWS, alphas=ES_ALPHAS, season=SEASON):
     """
-    Cria modelos baseline de persistência e média móvel
-    para produção e receita.
-    Salva previsões e métricas.
+    Previsões de todos os baselines para todas as séries de uma vez.
+    Y é um array (tempo x séries), com NaN onde a série não tem valor; a previsão
+    da posição t usa apenas valores anteriores a t.
+    Retorna {modelo: array (tempo x séries)}:
+      - persistencia: y[t-1]
+      - sazonal_ingenuo: y[t-season]
+      - media{k}m: média de y[t-k:t] para cada janela da grade (soma acumulada,
+        NaN se a janela tiver algum valor ausente)
+      - ses_{alpha}: suavização exponencial simples, todas as alphas num único laço
     """
-    df = pd.read_csv(path_dataset)
-    metrics = []
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    T, n = Y.shape
+
+    def shift(a, k):
+        out = np.full_like(a, np.nan)
+        out[k:] = a[:T - k]
+        return out
+
+    preds = {
+        "persistencia": shift(Y, 1),
+        "sazonal_ingenuo": shift(Y, season),
+    }
+
+    valid = ~np.isnan(Y)
+    csum = np.vstack([np.zeros((1, n)), np.cumsum(np.where(valid, Y, 0.0), axis=0)])
+    ccount = np.vstack([np.zeros((1, n)), np.cumsum(valid, axis=0)])
+    for k in ma_windows:
+        pred = np.full((T, n), np.nan)
+        soma = csum[k:T] - csum[:T - k]
+        cont = ccount[k:T] - ccount[:T - k]
+        pred[k:] = np.where(cont == k, soma / k, np.nan)
+        preds[f"media{k}m"] = pred
+
+    # Suavização exponencial: estado (alphas x séries), NaN mantém o nível anterior
+    alphas_arr = np.asarray(alphas, dtype=float)[:, None]
+    level = np.full((len(alphas), n), np.nan)
+    ses = np.full((T, len(alphas), n), np.nan)
+    for t in range(T):
+        ses[t] = level
+        y = Y[t]
+        atualiza = ~np.isnan(y)
+        novo = np.where(np.isnan(level), y, alphas_arr * y + (1 - alphas_arr) * level)
+        level = np.where(atualiza, novo, level)
+    for i, alpha in enumerate(alphas):
+        preds[f"ses_{alpha:g}"] = ses[:, i]
 
-    for target_col in ["target_producao_next", "target_receita_next"]:
-        if target_col not in df.columns:
-            continue
+    return preds
 
-        # Baselines simples
-        df[f"{target_col}_persistencia"] = df[target_col].shift(1)
-        df[f"{target_col}_media3m"] = df[target_col].rolling(3).mean().shift(1)
 
-        # Remover NaNs
-        df.dropna(subset=[target_col, f"{target_col}_persistencia", f"{target_col}_media3m"], inplace=True)
+def baseline_metrics(Y, preds, names=None):
+    """
+    MAE, RMSE e MAPE de cada baseline e série, cada série alinhada na sua própria
+    máscara (posições com valor real e previsão disponíveis).
+    """
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    names = names if names is not None else list(range(Y.shape[1]))
+    eps = np.finfo(np.float64).eps
+    frames = []
+    for modelo, pred in preds.items():
+        mask = ~np.isnan(Y) & ~np.isnan(pred)
+        n = mask.sum(axis=0)
+        erro = np.where(mask, Y - pred, 0.0)
+        ape = np.where(mask, np.abs(erro) / np.maximum(np.abs(np.where(mask, Y, 1.0)), eps), 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frames.append(pd.DataFrame({
+                "target": names,
+                "modelo": modelo,
+                "MAE": np.abs(erro).sum(axis=0) / n,
+                "RMSE": np.sqrt((erro ** 2).sum(axis=0) / n),
+                "MAPE": ape.sum(axis=0) / n,
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def train_baseline_models(path_dataset, base_dir="..", ma_windows=MA_WINDOWS, alphas=ES_ALPHAS):
+    """
+    Avalia os baselines (persistência, sazonal ingênuo, médias móveis e suavização
+    exponencial) para produção e receita.
+    Salva previsões e métricas.
+    """
+    df = pd.read_csv(path_dataset)
+    targets = [c for c in ["target_producao_next", "target_receita_next"] if c in df.columns]
 
-        # Avaliar cada baseline
-        for pred_col in [f"{target_col}_persistencia", f"{target_col}_media3m"]:
-            mae = mean_absolute_error(df[target_col], df[pred_col])
-            rmse = np.sqrt(mean_squared_error(df[target_col], df[pred_col]))
-            mape = mean_absolute_percentage_error(df[target_col], df[pred_col])
+    Y = df[targets].to_numpy(dtype=float)
+    preds = baseline_forecasts(Y, ma_windows=ma_windows, alphas=alphas)
+    metrics = baseline_metrics(Y, preds, names=targets)
 
-            metrics.append({
-                "target": target_col,
-                "modelo": pred_col.replace(target_col + "_", ""),
-                "MAE": mae,
-                "RMSE": rmse,
-                "MAPE": mape
-            })
+    previsoes = pd.DataFrame(
+        {f"{target_col}_{modelo}": pred[:, j] for modelo, pred in preds.items() for j, target_col in enumerate(targets)},
+        index=df.index,
+    )
+    df = pd.concat([df, previsoes], axis=1)
 
     # Garantir diretórios
-    os.makedirs("../data/processed", exist_ok=True)
-    os.makedirs("../reports", exist_ok=True)
-    os.makedirs("../models", exist_ok=True)
+    os.makedirs(os.path.join(base_dir, "data", "processed"), exist_ok=True)
+    os.makedirs(os.path.join(base_dir, "reports"), exist_ok=True)
+    os.makedirs(os.path.join(base_dir, "models"), exist_ok=True)
 
     # Salvar previsões e métricas
-    df.to_csv("../data/processed/predictions_baseline.csv", index=False, mode='w')
-    pd.DataFrame(metrics).to_excel("../reports/performance_baseline.xlsx", index=False)
+    df.to_csv(os.path.join(base_dir, "data", "processed", "predictions_baseline.csv"), index=False, mode='w')
+    metrics.to_excel(os.path.join(base_dir, "reports", "performance_baseline.xlsx"), index=False)
 
-    return pd.DataFrame(metrics)
+    return metrics
@@ -1,23 +1,34 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from xgboost import XGBRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, mean_absolute_percentage_error
-import joblib
 import os
+from registry import save_model, model_version
 
-def train_ml_models(dataset_path):
+FEATURE_COLS = [
+    'preco_medio_brl', 'preco_lag_1', 'producao_lag_1',
+    'preco_lag_3', 'producao_lag_3', 'preco_lag_6', 'producao_lag_6',
+    'producao_roll_3', 'producao_roll_12',
+    'shock_2008', 'shock_2014', 'shock_2020', 'shock_2022',
+    'mes_sin', 'mes_cos'
+]
+
+def train_ml_models(dataset_path, models_dir="../models", params=None):
+    """
+    Treina RandomForest e XGBoost para cada target.
+    `params` ({target: {modelo: hiperparâmetros}}, ex.: saída de tuning.tune_models)
+    substitui as configurações fixas.
+    Usa o split temporal do dataset (temporal_split), o mesmo da busca de
+    hiperparâmetros: treino em "train" + "val" e avaliação no holdout "test".
+    Os modelos vão para o registro (models/registry), versionados pelo hash dos
+    dados de treino e dos hiperparâmetros.
+    """
+    os.makedirs(models_dir, exist_ok=True)
     df = pd.read_csv(dataset_path)
     df["data"] = pd.to_datetime(df["data"])
-
-    feature_cols = [
-        'preco_medio_brl', 'preco_lag_1', 'producao_lag_1',
-        'preco_lag_3', 'producao_lag_3', 'preco_lag_6', 'producao_lag_6',
-        'producao_roll_3', 'producao_roll_12',
-        'shock_2008', 'shock_2014', 'shock_2020', 'shock_2022',
-        'mes_sin', 'mes_cos'
-    ]
+    params = params or {}
+    feature_cols = FEATURE_COLS
 
     rf_results = []
     xgb_results = []
@@ -26,13 +37,14 @@ def train_ml_models(dataset_path):
         if target_col not in df.columns:
             continue
 
-        X = df[feature_cols].fillna(0)
-        y = df[target_col].fillna(0)
-
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+        train, test = df[df["split"] != "test"], df[df["split"] == "test"]
+        X_train, y_train = train[feature_cols].fillna(0), train[target_col].fillna(0)
+        X_test, y_test = test[feature_cols].fillna(0), test[target_col].fillna(0)
+        registry_dir = os.path.join(models_dir, "registry")
 
         # Random Forest
-        rf = RandomForestRegressor(n_estimators=200, random_state=42)
+        rf_params = params.get(target_col, {}).get("RandomForest", {"n_estimators": 200})
+        rf = RandomForestRegressor(random_state=42, **rf_params)
         rf.fit(X_train, y_train)
         rf_preds = rf.predict(X_test)
         rf_mae = mean_absolute_error(y_test, rf_preds)
@@ -45,10 +57,12 @@ def train_ml_models(dataset_path):
             "RMSE": rf_rmse,
             "MAPE": rf_mape
         })
-        joblib.dump(rf, f"../models/RandomForest_{target_col}.pkl")
+        save_model(rf, target_col, "RandomForest", model_version(X_train, y_train, rf_params), feature_cols,
+                   registry_dir, metrics=rf_results[-1])
 
         # XGBoost
-        xgb = XGBRegressor(n_estimators=300, learning_rate=0.05, max_depth=5)
+        xgb_params = params.get(target_col, {}).get("XGBoost", {"n_estimators": 300, "learning_rate": 0.05, "max_depth": 5})
+        xgb = XGBRegressor(**xgb_params)
         xgb.fit(X_train, y_train)
         xgb_preds = xgb.predict(X_test)
         xgb_mae = mean_absolute_error(y_test, xgb_preds)
@@ -61,13 +75,14 @@ def train_ml_models(dataset_path):
             "RMSE": xgb_rmse,
             "MAPE": xgb_mape
         })
-        joblib.dump(xgb, f"../models/XGBoost_{target_col}.pkl")
+        save_model(xgb, target_col, "XGBoost", model_version(X_train, y_train, xgb_params), feature_cols,
+                   registry_dir, metrics=xgb_results[-1])
 
     # Salvar separadamente
     rf_df = pd.DataFrame(rf_results)
     xgb_df = pd.DataFrame(xgb_results)
 
-    rf_df.to_csv("../models/ml__rf_metrics.csv", index=False, mode='w')
-    xgb_df.to_csv("../models/ml_xgb_metrics.csv", index=False, mode='w')
+    rf_df.to_csv(os.path.join(models_dir, "ml__rf_metrics.csv"), index=False, mode='w')
+    xgb_df.to_csv(os.path.join(models_dir, "ml_xgb_metrics.csv"), index=False, mode='w')
 
     return rf_df, xgb_df
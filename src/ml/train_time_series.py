@@ -1,14 +1,53 @@
 import pandas as pd
 import numpy as np
 import os
+import json
+import hashlib
+import joblib
+import time
+import multiprocessing as mp
+from multiprocessing.connection import wait
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.model_selection import train_test_split
 
 
-def train_sarima(df, target_col):
-    """Treina um modelo SARIMA simples para a coluna especificada"""
+SARIMA_ORDER = (1, 1, 1)
+SARIMA_SEASONAL_ORDER = (1, 1, 1, 12)
+
+
+def series_hash(series):
+    """Hash do conteúdo (datas e valores) de uma série e da especificação do modelo, usado como chave de cache."""
+    h = hashlib.sha256(pd.util.hash_pandas_object(series, index=True).values.tobytes())
+    h.update(repr((SARIMA_ORDER, SARIMA_SEASONAL_ORDER)).encode())
+    return h.hexdigest()[:16]
+
+
+def load_warm_start(cache_dir, target_col, n_obs, max_new_months=6):
+    """
+    Parâmetros do último ajuste do target, se a série só cresceu alguns meses
+    desde então (caso típico de uma atualização mensal).
+    """
+    if cache_dir is None:
+        return None
+    path = os.path.join(cache_dir, f"sarima_{target_col}_params.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    if 0 <= n_obs - saved["n_obs"] <= max_new_months:
+        return np.array(saved["params"])
+    return None
+
+
+def train_sarima(df, target_col, start_params=None, cache_dir=None):
+    """
+    Treina um modelo SARIMA simples para a coluna especificada.
+    Com `cache_dir`, o resultado fica em disco indexado pelo hash dos dados (um rerun
+    com os mesmos dados não reajusta) e os parâmetros ajustados servem de ponto de
+    partida (warm start) para o próximo ajuste.
+    """
     df_local = df[['data', target_col]].dropna().copy()
     df_local['data'] = pd.to_datetime(df_local['data'])
     df_local = df_local.set_index('data').asfreq('MS')
@@ -16,16 +55,30 @@ def train_sarima(df, target_col):
     train_size = int(len(df_local) * 0.8)
     train, test = df_local.iloc[:train_size], df_local.iloc[train_size:]
 
+    cache_path = None
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path = os.path.join(cache_dir, f"sarima_{target_col}_{series_hash(df_local[target_col])}.pkl")
+        if os.path.exists(cache_path):
+            return joblib.load(cache_path)
+        if start_params is None:
+            start_params = load_warm_start(cache_dir, target_col, len(train))
+
     try:
-        model = SARIMAX(train[target_col], order=(1,1,1), seasonal_order=(1,1,1,12), enforce_stationarity=False)
-        results = model.fit(disp=False)
+        model = SARIMAX(train[target_col], order=SARIMA_ORDER, seasonal_order=SARIMA_SEASONAL_ORDER, enforce_stationarity=False)
+        try:
+            results = model.fit(disp=False, start_params=start_params)
+        except Exception:
+            if start_params is None:
+                raise
+            results = model.fit(disp=False)  # warm start inválido: ajusta do zero
         forecast = results.forecast(steps=len(test))
 
         mae = mean_absolute_error(test[target_col], forecast)
         rmse = np.sqrt(mean_squared_error(test[target_col], forecast))
         r2 = r2_score(test[target_col], forecast)
 
-        return {
+        output = {
             'target': target_col,
             'model': 'SARIMA',
             'mae': mae,
@@ -35,6 +88,70 @@ def train_sarima(df, target_col):
     except Exception as e:
         return None, str(e)
 
+    if cache_path is not None:
+        joblib.dump(output, cache_path)
+        with open(os.path.join(cache_dir, f"sarima_{target_col}_params.json"), "w", encoding="utf-8") as f:
+            json.dump({"n_obs": len(train), "params": np.asarray(results.params).tolist()}, f)
+    return output
+
+
+def _sarima_worker(conn, df, target_col, cache_dir):
+    """Processo de um ajuste: envia o resultado de train_sarima pelo pipe."""
+    conn.send(train_sarima(df, target_col, cache_dir=cache_dir))
+    conn.close()
+
+
+def fit_sarima_parallel(df, target_cols, n_workers=None, timeout=300, cache_dir=None):
+    """
+    Ajusta um SARIMA por target em paralelo, cada ajuste no seu próprio processo
+    (no máximo `n_workers` ao mesmo tempo). O `timeout` vale por ajuste, contado a
+    partir do início dele: o processo que passa do prazo é encerrado sem afetar os
+    outros, e o próximo target da fila ocupa a vaga.
+    Retorna {target: (metricas ou None, previsão ou mensagem de erro)}.
+    """
+    n_workers = n_workers or min(len(target_cols), os.cpu_count() or 1)
+    if n_workers <= 1 or len(target_cols) <= 1:
+        return {t: train_sarima(df, t, cache_dir=cache_dir) for t in target_cols}
+
+    ctx = mp.get_context()
+    pending = list(target_cols)
+    running = {}  # target -> (processo, pipe, prazo)
+    results = {}
+    try:
+        while pending or running:
+            while pending and len(running) < n_workers:
+                target_col = pending.pop(0)
+                recv_conn, send_conn = ctx.Pipe(duplex=False)
+                proc = ctx.Process(target=_sarima_worker, args=(send_conn, df, target_col, cache_dir), daemon=True)
+                proc.start()
+                send_conn.close()
+                running[target_col] = (proc, recv_conn, time.monotonic() + timeout)
+
+            next_deadline = min(deadline for _, _, deadline in running.values())
+            ready = wait([conn for _, conn, _ in running.values()], timeout=max(0, next_deadline - time.monotonic()))
+            now = time.monotonic()
+            for target_col, (proc, conn, deadline) in list(running.items()):
+                if conn in ready:
+                    try:
+                        results[target_col] = conn.recv()
+                    except EOFError:  # processo morreu sem enviar resultado
+                        proc.join()
+                        results[target_col] = (None, f"processo encerrado com código {proc.exitcode}")
+                elif now >= deadline:
+                    proc.terminate()
+                    results[target_col] = (None, f"timeout após {timeout}s")
+                else:
+                    continue
+                proc.join()
+                conn.close()
+                del running[target_col]
+    finally:
+        for proc, conn, _ in running.values():
+            proc.terminate()
+            proc.join()
+            conn.close()
+    return {t: results[t] for t in target_cols}
+
 
 def train_rf_fallback(df, target_col):
     """Fallback com RandomForest se SARIMA falhar"""
@@ -65,9 +182,11 @@ def train_rf_fallback(df, target_col):
     }, pd.Series(preds, index=X_test.index)
 
 
-def train_time_series_models(df):
+def train_time_series_models(df, base_dir="..", n_workers=None, timeout=300, use_cache=True):
     """
     Treina modelos SARIMA para cada coluna target_* do dataset.
+    Os targets são ajustados em paralelo (`n_workers`, com `timeout` por ajuste) e,
+    com `use_cache`, os ajustes ficam em models/sarima_cache.
     Retorna DataFrame com métricas e previsões futuras.
     """
     df = df.copy()
@@ -78,8 +197,11 @@ def train_time_series_models(df):
     metrics = []
     forecasts = pd.DataFrame()
 
+    cache_dir = os.path.join(base_dir, "models", "sarima_cache") if use_cache else None
+    sarima_results = fit_sarima_parallel(df, targets, n_workers=n_workers, timeout=timeout, cache_dir=cache_dir)
+
     for target_col in targets:
-        res, forecast = train_sarima(df, target_col)
+        res, forecast = sarima_results[target_col]
         if res is None:
             res, forecast = train_rf_fallback(df, target_col)
         metrics.append(res)
@@ -93,11 +215,11 @@ def train_time_series_models(df):
             })
             forecasts = pd.concat([forecasts, forecast_df], ignore_index=True)
 
-    os.makedirs("../models", exist_ok=True)
-    os.makedirs("../data/processed", exist_ok=True)
+    os.makedirs(os.path.join(base_dir, "models"), exist_ok=True)
+    os.makedirs(os.path.join(base_dir, "data", "processed"), exist_ok=True)
 
     metrics_df = pd.DataFrame(metrics)
-    metrics_df.to_csv("../models/time_series_metrics.csv", index=False, mode='w')
-    forecasts.to_csv("../data/processed/predictions_time_series.csv", index=False, mode='w')
+    metrics_df.to_csv(os.path.join(base_dir, "models", "time_series_metrics.csv"), index=False, mode='w')
+    forecasts.to_csv(os.path.join(base_dir, "data", "processed", "predictions_time_series.csv"), index=False, mode='w')
 
     return metrics_df, forecasts
@@ -0,0 +1,178 @@
+"""
+Busca de hiperparâmetros para RandomForest e XGBoost.
+
+Cada trial treina no split "train" e é avaliado no split "val" (temporal_split);
+o XGBoost usa early stopping no próprio "val", então n_estimators é apenas um
+teto. Os trials rodam em paralelo num pool de processos dimensionado para que
+trials simultâneos x n_jobs de cada modelo não passem do número de núcleos.
+
+O histórico fica em models/tuning/trials_{modelo}_{target}_{data_hash}.jsonl (uma
+linha por trial, gravada assim que o trial termina), onde data_hash identifica
+os dados de treino e validação: rodar de novo com os mesmos dados retoma a busca
+e pula os trials que já estão no histórico; dados novos começam um histórico novo.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from xgboost import XGBRegressor
+
+from registry import data_hash
+from train_ml_models import FEATURE_COLS
+
+SEARCH_SPACE = {
+    "RandomForest": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [None, 6, 10, 16],
+        "min_samples_leaf": [1, 2, 5],
+        "max_features": [1.0, 0.5, "sqrt"],
+    },
+    "XGBoost": {
+        "n_estimators": [1000],  # teto; o early stopping define o número efetivo
+        "learning_rate": [0.02, 0.05, 0.1],
+        "max_depth": [3, 4, 5, 6],
+        "subsample": [0.7, 0.85, 1.0],
+        "colsample_bytree": [0.6, 0.8, 1.0],
+        "min_child_weight": [1, 3, 5],
+    },
+}
+EARLY_STOPPING_ROUNDS = 50
+
+
+def plan_parallelism(n_trials, n_cores=None):
+    """
+    Divide os núcleos entre trials simultâneos e threads por modelo, de forma que
+    workers x n_jobs <= núcleos. Retorna (workers, n_jobs).
+    """
+    n_cores = n_cores or os.cpu_count() or 1
+    workers = max(1, min(n_trials, n_cores))
+    return workers, max(1, n_cores // workers)
+
+
+def sample_params(model_name, n_trials, seed=42):
+    """Sorteia `n_trials` combinações distintas do espaço de busca (determinístico pela seed)."""
+    space = SEARCH_SPACE[model_name]
+    rng = np.random.default_rng(seed)
+    total = int(np.prod([len(v) for v in space.values()]))
+    trials, seen = [], set()
+    while len(trials) < min(n_trials, total):
+        params = {k: v[rng.integers(len(v))] for k, v in space.items()}
+        key = params_key(params)
+        if key not in seen:
+            seen.add(key)
+            trials.append(params)
+    return trials
+
+
+def params_key(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _make_model(model_name, params, n_jobs):
+    if model_name == "RandomForest":
+        return RandomForestRegressor(random_state=42, n_jobs=n_jobs, **params)
+    if model_name == "XGBoost":
+        return XGBRegressor(early_stopping_rounds=EARLY_STOPPING_ROUNDS, n_jobs=n_jobs, **params)
+    raise ValueError(f"Modelo desconhecido: {model_name}")
+
+
+def run_trial(model_name, params, X_train, y_train, X_val, y_val, n_jobs=1):
+    """Treina um trial e retorna o registro do histórico (MAE de validação)."""
+    model = _make_model(model_name, params, n_jobs)
+    if model_name == "XGBoost":
+        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+        best_iteration = int(model.best_iteration) + 1
+    else:
+        model.fit(X_train, y_train)
+        best_iteration = None
+    return {
+        "key": params_key(params),
+        "params": params,
+        "val_MAE": float(mean_absolute_error(y_val, model.predict(X_val))),
+        "best_iteration": best_iteration,
+    }
+
+
+def load_history(path):
+    """Trials já executados, indexados pela chave dos parâmetros."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return {r["key"]: r for r in records}
+
+
+def tune_model(df, model_name, target_col, n_trials=20, n_cores=None, tuning_dir="../models/tuning", seed=42):
+    """
+    Busca de hiperparâmetros de um modelo para um target, retomando o histórico
+    dos mesmos dados de treino e validação.
+    Retorna o melhor registro (params, val_MAE, best_iteration).
+    """
+    train, val = df[df["split"] == "train"], df[df["split"] == "val"]
+    X_train, y_train = train[FEATURE_COLS].fillna(0).to_numpy(), train[target_col].fillna(0).to_numpy()
+    X_val, y_val = val[FEATURE_COLS].fillna(0).to_numpy(), val[target_col].fillna(0).to_numpy()
+
+    os.makedirs(tuning_dir, exist_ok=True)
+    data_key = data_hash(X_train, y_train, X_val, y_val)
+    history_path = os.path.join(tuning_dir, f"trials_{model_name}_{target_col}_{data_key}.jsonl")
+    history = load_history(history_path)
+    pending = [p for p in sample_params(model_name, n_trials, seed) if params_key(p) not in history]
+
+    if pending:
+        workers, n_jobs = plan_parallelism(len(pending), n_cores)
+        print(f"🔎 {model_name}/{target_col}: {len(pending)} trial(s) novos "
+              f"({len(history)} no histórico), {workers} worker(s) x {n_jobs} thread(s)")
+        with open(history_path, "a", encoding="utf-8") as f:
+            if workers == 1:
+                results = (run_trial(model_name, p, X_train, y_train, X_val, y_val, n_jobs) for p in pending)
+                for record in results:
+                    f.write(json.dumps(record) + "\n")
+                    f.flush()
+                    history[record["key"]] = record
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    jobs = [pool.submit(run_trial, model_name, p, X_train, y_train, X_val, y_val, n_jobs)
+                            for p in pending]
+                    for job in as_completed(jobs):
+                        record = job.result()
+                        f.write(json.dumps(record) + "\n")
+                        f.flush()
+                        history[record["key"]] = record
+
+    return min(history.values(), key=lambda r: r["val_MAE"])
+
+
+def best_params(record, model_name):
+    """Parâmetros finais do melhor trial (no XGBoost, n_estimators = melhor iteração)."""
+    params = dict(record["params"])
+    if model_name == "XGBoost" and record.get("best_iteration"):
+        params["n_estimators"] = record["best_iteration"]
+    return params
+
+
+def tune_models(dataset_path, models=("RandomForest", "XGBoost"),
+                targets=("target_producao_next", "target_receita_next"),
+                n_trials=20, n_cores=None, models_dir="../models"):
+    """
+    Roda a busca para cada modelo e target e salva o resumo em
+    models/tuning/best_params.json. Retorna {target: {modelo: params}}.
+    """
+    df = pd.read_csv(dataset_path)
+    tuning_dir = os.path.join(models_dir, "tuning")
+    best = {}
+    for target_col in targets:
+        if target_col not in df.columns:
+            continue
+        for model_name in models:
+            record = tune_model(df, model_name, target_col, n_trials=n_trials, n_cores=n_cores, tuning_dir=tuning_dir)
+            best.setdefault(target_col, {})[model_name] = best_params(record, model_name)
+            print(f"✅ {model_name}/{target_col}: melhor MAE de validação {record['val_MAE']:.2f}")
+
+    with open(os.path.join(tuning_dir, "best_params.json"), "w", encoding="utf-8") as f:
+        json.dump(best, f, indent=2, default=str)
+    return best
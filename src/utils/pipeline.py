@@ -0,0 +1,235 @@
+"""
+Executor de pipeline declarativo (DAG) com cache por hash de conteúdo.
+
+Cada etapa é declarada como um dicionário:
+
+    {
+        "depende_de": ["producao"],            # etapas anteriores
+        "funcao": etapa_custos,                # funcao(entradas, saidas, **params)
+        "params": {"custo_var_brl_por_barril": 50},
+        "saidas": {"producao": Path(...), ...},
+        "codigo": [Path("src/.../generate_custos.py")],
+    }
+
+A impressão digital (fingerprint) de uma etapa combina o código da função e dos
+módulos listados, os parâmetros (incluindo seeds) e o conteúdo dos arquivos
+produzidos pelas etapas das quais ela depende. Se a impressão digital não mudou e
+as saídas existem, a etapa é pulada.
+"""
+
+import hashlib
+import inspect
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+CACHE_DIR_PADRAO = Path(".cache/pipeline")
+
+
+# ------------------------------------
+# 1. Grafo de dependências
+# ------------------------------------
+def ordenar_etapas(etapas):
+    """
+    Ordena as etapas topologicamente (dependências antes das dependentes).
+    Lança ValueError para dependências desconhecidas ou ciclos.
+    """
+    ordem, visitando, visitadas = [], set(), set()
+
+    def visitar(nome):
+        if nome in visitadas:
+            return
+        if nome in visitando:
+            raise ValueError(f"Ciclo detectado no pipeline envolvendo a etapa '{nome}'")
+        if nome not in etapas:
+            raise ValueError(f"Etapa desconhecida: '{nome}'")
+        visitando.add(nome)
+        for dep in etapas[nome].get("depende_de", []):
+            visitar(dep)
+        visitando.discard(nome)
+        visitadas.add(nome)
+        ordem.append(nome)
+
+    for nome in etapas:
+        visitar(nome)
+    return ordem
+
+
+def selecionar_etapas(etapas, alvos=None):
+    """Retorna os alvos pedidos e todas as etapas das quais eles dependem."""
+    if not alvos:
+        return list(etapas)
+    selecionadas = set()
+    pilha = list(alvos)
+    while pilha:
+        nome = pilha.pop()
+        if nome not in etapas:
+            raise ValueError(f"Etapa desconhecida: '{nome}'")
+        if nome not in selecionadas:
+            selecionadas.add(nome)
+            pilha.extend(etapas[nome].get("depende_de", []))
+    return [n for n in etapas if n in selecionadas]
+
+
+def entradas_da_etapa(nome, etapas):
+    """Junta as saídas das etapas das quais `nome` depende."""
+    entradas = {}
+    for dep in etapas[nome].get("depende_de", []):
+        entradas.update(etapas[dep].get("saidas", {}))
+    return entradas
+
+
+# ------------------------------------
+# 2. Hashes de conteúdo
+# ------------------------------------
+def hash_caminho(path, bloco=1 << 20):
+    """
+    Hash SHA-256 do conteúdo de um arquivo ou de todos os arquivos de um diretório
+    (datasets particionados). Caminhos inexistentes geram um hash fixo.
+    """
+    path = Path(path)
+    h = hashlib.sha256()
+    if not path.exists():
+        h.update(b"<ausente>")
+        return h.hexdigest()
+
+    arquivos = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    for arquivo in arquivos:
+        h.update(str(arquivo.relative_to(path) if path.is_dir() else arquivo.name).encode())
+        with open(arquivo, "rb") as f:
+            for chunk in iter(lambda: f.read(bloco), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint_etapa(nome, etapas):
+    """Impressão digital da etapa: código, parâmetros e conteúdo das entradas."""
+    etapa = etapas[nome]
+    h = hashlib.sha256()
+    h.update(nome.encode())
+    h.update(inspect.getsource(etapa["funcao"]).encode())
+    for arquivo in etapa.get("codigo", []):
+        h.update(hash_caminho(arquivo).encode())
+    h.update(json.dumps(etapa.get("params", {}), sort_keys=True, default=str).encode())
+    for chave, path in sorted(entradas_da_etapa(nome, etapas).items()):
+        h.update(chave.encode())
+        h.update(hash_caminho(path).encode())
+    return h.hexdigest()
+
+
+# ------------------------------------
+# 3. Manifesto do cache
+# ------------------------------------
+def carregar_manifesto(cache_dir):
+    path = Path(cache_dir) / "manifest.json"
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salvar_manifesto(manifesto, cache_dir):
+    path = Path(cache_dir) / "manifest.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False)
+
+
+def cache_valido(nome, fingerprint, etapas, manifesto):
+    """A etapa pode ser pulada se o fingerprint bate e todas as saídas existem."""
+    if manifesto.get(nome) != fingerprint:
+        return False
+    return all(Path(p).exists() for p in etapas[nome].get("saidas", {}).values())
+
+
+# ------------------------------------
+# 4. Execução
+# ------------------------------------
+def _executar_etapa(funcao, entradas, saidas, params):
+    """Executa uma etapa (no processo atual ou num worker) e mede o tempo de parede."""
+    for path in saidas.values():
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    inicio = time.perf_counter()
+    funcao(entradas, saidas, **params)
+    return time.perf_counter() - inicio
+
+
+def executar_pipeline(etapas, cache_dir=CACHE_DIR_PADRAO, alvos=None, forcar=(), n_workers=1):
+    """
+    Executa as etapas respeitando as dependências e pulando as que têm cache válido.
+    Com `n_workers` > 1, etapas independentes (ex.: preço, câmbio e campos) rodam em
+    paralelo num pool de processos; a latência total cai para o caminho crítico.
+    `forcar` lista etapas a reexecutar mesmo com cache válido.
+    Retorna uma lista com status e tempo de cada etapa.
+    """
+    ordem = ordenar_etapas(etapas)
+    selecionadas = set(selecionar_etapas(etapas, alvos))
+    pendentes = [n for n in ordem if n in selecionadas]
+    concluidas = set()
+    manifesto = carregar_manifesto(cache_dir)
+    resumo = []
+    em_execucao = {}
+
+    def prontas():
+        return [
+            n for n in pendentes
+            if all(d in concluidas or d not in selecionadas for d in etapas[n].get("depende_de", []))
+        ]
+
+    def concluir(nome, fingerprint, segundos):
+        manifesto[nome] = fingerprint
+        salvar_manifesto(manifesto, cache_dir)
+        concluidas.add(nome)
+        resumo.append({"etapa": nome, "status": "executada", "segundos": segundos})
+        print(f"✅ {nome}: concluída em {segundos:.2f}s")
+
+    pool = ProcessPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+    inicio_total = time.perf_counter()
+    try:
+        while pendentes or em_execucao:
+            lote = prontas()
+            if not lote and not em_execucao:
+                raise RuntimeError(f"Etapas sem dependências satisfeitas: {pendentes}")
+            for nome in lote:
+                pendentes.remove(nome)
+                etapa = etapas[nome]
+                fingerprint = fingerprint_etapa(nome, etapas)
+
+                if nome not in forcar and cache_valido(nome, fingerprint, etapas, manifesto):
+                    print(f"⏭️  {nome}: cache válido, etapa pulada")
+                    concluidas.add(nome)
+                    resumo.append({"etapa": nome, "status": "cache", "segundos": 0.0})
+                    continue
+
+                print(f"▶️  {nome}: executando")
+                args = (etapa["funcao"], entradas_da_etapa(nome, etapas), etapa.get("saidas", {}), etapa.get("params", {}))
+                if pool is None:
+                    concluir(nome, fingerprint, _executar_etapa(*args))
+                else:
+                    em_execucao[pool.submit(_executar_etapa, *args)] = (nome, fingerprint)
+
+            if not em_execucao:
+                continue
+
+            finalizados, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for future in finalizados:
+                nome, fingerprint = em_execucao.pop(future)
+                try:
+                    segundos = future.result()
+                except Exception as e:
+                    raise RuntimeError(f"Falha na etapa '{nome}': {e}") from e
+                concluir(nome, fingerprint, segundos)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    resumo.append({"etapa": "TOTAL", "status": "-", "segundos": time.perf_counter() - inicio_total})
+    return resumo
+
+
+def imprimir_resumo(resumo):
+    """Imprime a tabela de status e tempo de parede por etapa."""
+    print(f"\n{'etapa':<14}{'status':<12}{'tempo (s)':>10}")
+    for r in resumo:
+        print(f"{r['etapa']:<14}{r['status']:<12}{r['segundos']:>10.2f}")
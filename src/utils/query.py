@@ -0,0 +1,178 @@
+"""
+Camada de consulta SQL (DuckDB) sobre os datasets gerados.
+
+Registra os arquivos de data/raw e data/processed (Parquet, diretórios de partes
+e CSV) como views num banco DuckDB local, sem carregá-los no pandas: as
+consultas leem só as colunas e row groups necessários e o DuckDB pode usar disco
+temporário (`temp_dir`) quando o resultado intermediário não cabe em memória.
+
+Uso em Python:
+    con = conectar()
+    consultar("SELECT estado, SUM(lucro_liquido_brl) FROM producao_financeiro GROUP BY 1", con)
+    for lote in consultar_em_lotes("SELECT * FROM producao_financeiro", con):
+        ...
+
+Uso na linha de comando:
+    python src/utils/query.py --views
+    python src/utils/query.py "SELECT * FROM financeiro LIMIT 5"
+    python src/utils/query.py "SELECT * FROM producao_financeiro" --saida lucro.parquet
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+try:
+    import duckdb
+except ImportError:  # duckdb é opcional
+    duckdb = None
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+# Nome da view -> caminho relativo à raiz do projeto
+DATASETS = {
+    "campos": "data/raw/campos_petroliferos.parquet",
+    "preco": "data/raw/preco_petroleo.parquet",
+    "cambio": "data/raw/cambio.parquet",
+    "producao": "data/raw/producao_mensal.parquet",
+    "producao_custos": "data/raw/producao_custos.parquet",
+    "custos_gerais": "data/raw/custos_gerais.parquet",
+    "producao_financeiro": "data/processed/producao_financeiro",
+    "financeiro": "data/processed/financials_consolidated",
+    "ml_dataset": "data/processed/ml_dataset.csv",
+    "previsoes_forecast": "data/processed/predictions_forecast.parquet",
+    "previsoes_baseline": "data/processed/predictions_baseline.csv",
+    "previsoes_sarima": "data/processed/predictions_time_series.csv",
+    "previsoes_hierarquico": "data/processed/predictions_hierarchical.parquet",
+    "previsoes_multistep": "data/processed/predictions_multistep.parquet",
+    "cenarios_lucro": "data/processed/cenarios_lucro.parquet",
+    "powerbi_previsoes": "data/processed/powerbi/previsoes",
+}
+CUBO_DIR = "data/processed/cubo"  # cada conjunto vira a view cubo_<conjunto>
+
+
+# ------------------------------------
+# 1. Conexão e views
+# ------------------------------------
+def _literal(path):
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+def fonte_sql(path, opcoes=""):
+    """
+    Expressão FROM do DuckDB para um arquivo Parquet/CSV ou diretório de partes
+    Parquet. `opcoes` é repassado à função de leitura (ex.: "file_row_number = true").
+    """
+    path = Path(path)
+    opcoes = f", {opcoes}" if opcoes else ""
+    if path.is_dir():
+        return f"read_parquet({_literal(path / '*.parquet')}{opcoes})"
+    if path.suffix.lower() == ".csv":
+        return f"read_csv_auto({_literal(path)}{opcoes})"
+    return f"read_parquet({_literal(path)}{opcoes})"
+
+
+def registrar_views(con, datasets, base_dir=BASE_DIR):
+    """Cria (ou substitui) uma view por dataset existente. Retorna os nomes registrados."""
+    registradas = []
+    for nome, relativo in datasets.items():
+        path = Path(base_dir) / relativo
+        if not path.exists() or (path.is_dir() and not any(path.glob("*.parquet"))):
+            continue
+        con.execute(f'CREATE OR REPLACE VIEW "{nome}" AS SELECT * FROM {fonte_sql(path)}')
+        registradas.append(nome)
+    return registradas
+
+
+def conectar(base_dir=BASE_DIR, database=":memory:", memoria_max=None, threads=None, temp_dir=None):
+    """
+    Conexão DuckDB com as views dos datasets do projeto (e dos conjuntos do cubo).
+    memoria_max (ex.: "4GB") e temp_dir limitam a memória e definem onde o DuckDB
+    despeja dados intermediários para consultas maiores que a RAM.
+    """
+    if duckdb is None:
+        raise ImportError("duckdb não está instalado (pip install duckdb)")
+    con = duckdb.connect(database)
+    if memoria_max is not None:
+        con.execute(f"SET memory_limit = {_literal(memoria_max)}")
+    if threads is not None:
+        con.execute(f"SET threads = {int(threads)}")
+    if temp_dir is not None:
+        con.execute(f"SET temp_directory = {_literal(temp_dir)}")
+
+    registrar_views(con, DATASETS, base_dir)
+    cubo_dir = Path(base_dir) / CUBO_DIR
+    if cubo_dir.is_dir():
+        registrar_views(con, {f"cubo_{p.stem}": p for p in sorted(cubo_dir.glob("*.parquet"))}, base_dir)
+    return con
+
+
+def listar_views(con):
+    return [linha[0] for linha in con.execute(
+        "SELECT view_name FROM duckdb_views() WHERE NOT internal ORDER BY view_name"
+    ).fetchall()]
+
+
+# ------------------------------------
+# 2. Consultas
+# ------------------------------------
+def consultar(sql, con=None, params=None):
+    """Executa a consulta e retorna o resultado inteiro como DataFrame."""
+    con = conectar() if con is None else con
+    return con.execute(sql, params).df()
+
+
+def consultar_em_lotes(sql, con=None, params=None, linhas_por_lote=100_000):
+    """
+    Executa a consulta e entrega o resultado em DataFrames de até
+    `linhas_por_lote` linhas, sem materializar o resultado inteiro.
+    """
+    con = conectar() if con is None else con
+    resultado = con.execute(sql, params)
+    # to_arrow_reader nas versões novas do DuckDB, fetch_record_batch nas antigas
+    ler = getattr(resultado, "to_arrow_reader", None) or resultado.fetch_record_batch
+    for lote in ler(linhas_por_lote):
+        yield lote.to_pandas()
+
+
+def exportar_consulta(sql, path, con=None, params=None):
+    """Grava o resultado direto em Parquet ou CSV (pela extensão) com COPY, sem passar pelo pandas."""
+    con = conectar() if con is None else con
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    formato = "CSV, HEADER" if path.suffix.lower() == ".csv" else "PARQUET"
+    con.execute(f"COPY ({sql}) TO {_literal(path)} (FORMAT {formato})", params)
+    return path
+
+
+# ------------------------------------
+# 3. CLI
+# ------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consultas SQL (DuckDB) sobre os datasets da Petroleira Gamarra")
+    parser.add_argument("sql", nargs="?", help="Consulta SQL (as views têm o nome dos datasets)")
+    parser.add_argument("--views", action="store_true", help="Lista as views disponíveis")
+    parser.add_argument("--saida", type=Path, help="Grava o resultado em .parquet ou .csv em vez de imprimir")
+    parser.add_argument("--lote", type=int, default=100_000, help="Linhas por lote impresso")
+    parser.add_argument("--memoria", help="Limite de memória do DuckDB (ex.: 4GB)")
+    parser.add_argument("--temp-dir", type=Path, help="Diretório para dados que não cabem em memória")
+    parser.add_argument("--base-dir", type=Path, default=BASE_DIR)
+    args = parser.parse_args(argv)
+
+    con = conectar(args.base_dir, memoria_max=args.memoria, temp_dir=args.temp_dir)
+    if args.views or not args.sql:
+        print("\n".join(listar_views(con)))
+        return
+
+    if args.saida is not None:
+        exportar_consulta(args.sql, args.saida, con)
+        print(f"✅ Resultado salvo em: {args.saida}")
+        return
+
+    # Resultado em CSV no stdout, lote a lote
+    for i, lote in enumerate(consultar_em_lotes(args.sql, con, linhas_por_lote=args.lote)):
+        lote.to_csv(sys.stdout, index=False, header=(i == 0))
+
+
+if __name__ == "__main__":
+    main()
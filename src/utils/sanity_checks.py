@@ -1,6 +1,25 @@
+"""
+Checagens de sanidade dos datasets gerados.
+
+As funções da seção 1 são as checagens interativas (imprimem o resultado). A
+partir da seção 3 há um motor de validação para datasets grandes: um registro de
+checagens vetorizadas, cada uma escrita como parcial (por lote) + combinar +
+resultado, para que possa percorrer arquivos Parquet em lotes (sem carregar o
+dataset inteiro) e dividir os arquivos / row groups entre processos. O resultado
+é um relatório estruturado (JSON ou Parquet) com o tempo de cada checagem.
+"""
+
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from pathlib import Path
 
+from storage import listar_partes, salvar_tabela
+
 # ------------------------------------
 # 1. Checagens básicas de integridade
 # ------------------------------------
@@ -9,10 +28,9 @@ def check_date_coverage(df, col_data="data", start="2005-01-01", end="2025-12-01
     Verifica se há cobertura completa entre as datas esperadas.
     """
     datas_esperadas = pd.date_range(start=start, end=end, freq="MS")
-    datas_presentes = pd.to_datetime(df[col_data].unique())
-    faltantes = set(datas_esperadas) - set(datas_presentes)
-    if faltantes:
-        print(f"⚠️ Datas faltantes ({len(faltantes)}): {sorted(list(faltantes))[:5]} ...")
+    faltantes = datas_esperadas[~datas_esperadas.isin(df[col_data].unique())]
+    if len(faltantes):
+        print(f"⚠️ Datas faltantes ({len(faltantes)}): {list(faltantes[:5])} ...")
     else:
         print("✅ Cobertura de datas completa.")
     return len(faltantes) == 0
@@ -64,3 +82,368 @@ def gerar_relatorio(df_prod, df_agg, path_out):
         f.write(str(resumo))
 
     print(f"📄 Relatório salvo em: {path_out}")
+
+
+# ------------------------------------
+# 3. Checagens vetorizadas (parcial por lote + combinar + resultado)
+# ------------------------------------
+def _indice_mes(datas, start):
+    """Posição de cada data no calendário mensal a partir de `start` (NaT fica negativo)."""
+    meses = np.asarray(datas, dtype="datetime64[M]").astype(np.int64)
+    return meses - np.datetime64(pd.Timestamp(start), "M").astype(np.int64)
+
+
+def _n_meses(start, end):
+    return int(_indice_mes([pd.Timestamp(end)], start)[0]) + 1
+
+
+def cobertura_parcial(df, col_data="data", col_grupo=None, start="2005-01-01", end="2025-12-01", **_):
+    """
+    Pares (grupo, mês) presentes no lote, codificados como grupo * n_meses + mês
+    (pd.unique por hash, sem ordenar).
+    """
+    n_meses = _n_meses(start, end)
+    idx = _indice_mes(df[col_data].to_numpy(), start)
+    dentro = (idx >= 0) & (idx < n_meses)
+    grupo = np.zeros(len(df), dtype=np.int64) if col_grupo is None else df[col_grupo].to_numpy(dtype=np.int64)
+    return {
+        "codigos": pd.unique(grupo[dentro] * n_meses + idx[dentro]),
+        "fora_do_periodo": int((~dentro).sum()),
+    }
+
+
+def cobertura_combinar(a, b):
+    return {
+        "codigos": pd.unique(np.concatenate([a["codigos"], b["codigos"]])),
+        "fora_do_periodo": a["fora_do_periodo"] + b["fora_do_periodo"],
+    }
+
+
+def cobertura_resultado(acc, col_grupo=None, start="2005-01-01", end="2025-12-01", **_):
+    """Meses faltantes por grupo (ex.: por campo) no período esperado."""
+    n_meses = _n_meses(start, end)
+    grupos, contagem = np.unique(acc["codigos"] // n_meses, return_counts=True)
+    faltantes = n_meses - contagem
+    incompletos = {str(g): int(f) for g, f in zip(grupos, faltantes) if f > 0}
+    ok = len(grupos) > 0 and not incompletos and acc["fora_do_periodo"] == 0
+    return ok, {
+        "meses_esperados": n_meses,
+        "grupos": int(len(grupos)),
+        "meses_faltantes_por_grupo": incompletos,
+        "linhas_fora_do_periodo": acc["fora_do_periodo"],
+    }
+
+
+def ausentes_parcial(df, cols_chave=(), **_):
+    return {"ausentes": df[list(cols_chave)].isna().sum().to_numpy()}
+
+
+def ausentes_combinar(a, b):
+    return {"ausentes": a["ausentes"] + b["ausentes"]}
+
+
+def ausentes_resultado(acc, cols_chave=(), **_):
+    ausentes = {c: int(n) for c, n in zip(cols_chave, acc["ausentes"]) if n > 0}
+    return not ausentes, {"ausentes_por_coluna": ausentes}
+
+
+def correlacao_parcial(df, col_x, col_y, **_):
+    """Estatísticas suficientes (n, médias, somas de quadrados centradas) do lote."""
+    x = df[col_x].to_numpy(dtype=float)
+    y = df[col_y].to_numpy(dtype=float)
+    validos = np.isfinite(x) & np.isfinite(y)
+    x, y = x[validos], y[validos]
+    if len(x) == 0:
+        return {"n": 0, "mx": 0.0, "my": 0.0, "sxx": 0.0, "syy": 0.0, "sxy": 0.0}
+    dx, dy = x - x.mean(), y - y.mean()
+    return {"n": len(x), "mx": x.mean(), "my": y.mean(),
+            "sxx": dx @ dx, "syy": dy @ dy, "sxy": dx @ dy}
+
+
+def correlacao_combinar(a, b):
+    """Combina as estatísticas de dois lotes (fórmula de Chan para variância/covariância)."""
+    n = a["n"] + b["n"]
+    if a["n"] == 0 or b["n"] == 0:
+        return a if b["n"] == 0 else b
+    dx, dy = b["mx"] - a["mx"], b["my"] - a["my"]
+    peso = a["n"] * b["n"] / n
+    return {
+        "n": n,
+        "mx": a["mx"] + dx * b["n"] / n,
+        "my": a["my"] + dy * b["n"] / n,
+        "sxx": a["sxx"] + b["sxx"] + dx * dx * peso,
+        "syy": a["syy"] + b["syy"] + dy * dy * peso,
+        "sxy": a["sxy"] + b["sxy"] + dx * dy * peso,
+    }
+
+
+def correlacao_resultado(acc, limiar=0.3, **_):
+    denominador = np.sqrt(acc["sxx"] * acc["syy"])
+    r = float(acc["sxy"] / denominador) if denominador > 0 else float("nan")
+    return bool(r > limiar), {"r": r, "limiar": limiar, "n": int(acc["n"])}
+
+
+def nao_negativo_parcial(df, cols=(), **_):
+    valores = df[list(cols)].to_numpy(dtype=float)
+    return {
+        "negativos": (valores < 0).sum(axis=0),
+        "minimo": np.nanmin(valores, axis=0, initial=np.inf),
+    }
+
+
+def nao_negativo_combinar(a, b):
+    return {"negativos": a["negativos"] + b["negativos"], "minimo": np.minimum(a["minimo"], b["minimo"])}
+
+
+def nao_negativo_resultado(acc, cols=(), **_):
+    negativos = {c: int(n) for c, n in zip(cols, acc["negativos"]) if n > 0}
+    return not negativos, {
+        "negativos_por_coluna": negativos,
+        "minimo_por_coluna": {c: float(m) for c, m in zip(cols, acc["minimo"])},
+    }
+
+
+def identidade_parcial(df, col_lucro, col_receita, cols_custos=(), rtol=1e-6, atol=1e-2, **_):
+    """Linhas em que lucro difere de receita − custos além da tolerância."""
+    lucro = df[col_lucro].to_numpy(dtype=float)
+    esperado = df[col_receita].to_numpy(dtype=float) - df[list(cols_custos)].to_numpy(dtype=float).sum(axis=1)
+    validos = np.isfinite(lucro) & np.isfinite(esperado)
+    diferenca = np.abs(lucro[validos] - esperado[validos])
+    return {
+        "verificadas": int(validos.sum()),
+        "nao_verificaveis": int((~validos).sum()),
+        "violacoes": int((diferenca > atol + rtol * np.abs(esperado[validos])).sum()),
+        "max_diferenca": float(diferenca.max(initial=0.0)),
+    }
+
+
+def identidade_combinar(a, b):
+    soma = {k: a[k] + b[k] for k in ("verificadas", "nao_verificaveis", "violacoes")}
+    return {**soma, "max_diferenca": max(a["max_diferenca"], b["max_diferenca"])}
+
+
+def identidade_resultado(acc, **_):
+    return acc["violacoes"] == 0, dict(acc)
+
+
+# Registro de checagens. "params_coluna" lista os parâmetros que são nomes de
+# colunas (só elas são lidas dos arquivos).
+CHECAGENS = {
+    "cobertura_datas": {
+        "parcial": cobertura_parcial,
+        "combinar": cobertura_combinar,
+        "resultado": cobertura_resultado,
+        "params_coluna": ["col_data", "col_grupo"],
+    },
+    "valores_ausentes": {
+        "parcial": ausentes_parcial,
+        "combinar": ausentes_combinar,
+        "resultado": ausentes_resultado,
+        "params_coluna": ["cols_chave"],
+    },
+    "correlacao": {
+        "parcial": correlacao_parcial,
+        "combinar": correlacao_combinar,
+        "resultado": correlacao_resultado,
+        "params_coluna": ["col_x", "col_y"],
+    },
+    "producao_nao_negativa": {
+        "parcial": nao_negativo_parcial,
+        "combinar": nao_negativo_combinar,
+        "resultado": nao_negativo_resultado,
+        "params_coluna": ["cols"],
+    },
+    "identidade_lucro": {
+        "parcial": identidade_parcial,
+        "combinar": identidade_combinar,
+        "resultado": identidade_resultado,
+        "params_coluna": ["col_lucro", "col_receita", "cols_custos"],
+    },
+}
+
+# Parâmetros de cada checagem para os dois datasets processados
+CONFIG_CAMPO = {  # producao_financeiro (uma linha por campo e mês)
+    "cobertura_datas": {"col_data": "data", "col_grupo": "campo_id"},
+    "valores_ausentes": {"cols_chave": ["data", "nome_campo", "producao_barris", "receita", "lucro_liquido_brl"]},
+    "correlacao": {"col_x": "preco_brl", "col_y": "receita", "limiar": 0.3},
+    "producao_nao_negativa": {"cols": ["producao_barris"]},
+    "identidade_lucro": {
+        "col_lucro": "lucro_liquido_brl",
+        "col_receita": "receita",
+        "cols_custos": ["custo_operacional", "custo_geral_brl"],
+    },
+}
+
+CONFIG_CONSOLIDADO = {  # financials_consolidated (total da empresa por mês)
+    "cobertura_datas": {"col_data": "data"},
+    "valores_ausentes": {"cols_chave": ["data", "producao_total_barris", "receita_total_brl", "lucro_total_brl"]},
+    "correlacao": {"col_x": "producao_total_barris", "col_y": "receita_total_brl", "limiar": 0.3},
+    "producao_nao_negativa": {"cols": ["producao_total_barris"]},
+    "identidade_lucro": {
+        "col_lucro": "lucro_total_brl",
+        "col_receita": "receita_total_brl",
+        "cols_custos": ["custo_operacional_total_brl", "custo_geral_total_brl"],
+    },
+}
+
+
+# ------------------------------------
+# 4. Execução em lotes e em paralelo
+# ------------------------------------
+def colunas_da_checagem(nome, params):
+    """Colunas lidas por uma checagem com estes parâmetros."""
+    colunas = []
+    for chave in CHECAGENS[nome]["params_coluna"]:
+        valor = params.get(chave)
+        if valor is None:
+            continue
+        colunas.extend([valor] if isinstance(valor, str) else valor)
+    return colunas
+
+
+def _colunas_necessarias(config):
+    return list(dict.fromkeys(c for nome, params in config.items() for c in colunas_da_checagem(nome, params)))
+
+
+def _lotes_dataframe(df, linhas_por_lote):
+    for ini in range(0, len(df), linhas_por_lote):
+        yield df.iloc[ini:ini + linhas_por_lote]
+
+
+def _lotes_parquet(path, row_groups, colunas, linhas_por_lote):
+    """Lê o arquivo em lotes, só com as colunas usadas (memória limitada por lote)."""
+    arquivo = pq.ParquetFile(path)
+    for batch in arquivo.iter_batches(batch_size=linhas_por_lote, row_groups=row_groups, columns=colunas):
+        yield batch.to_pandas()
+
+
+def processar_lotes(lotes, config):
+    """
+    Aplica as checagens de `config` ({checagem: params}) a cada lote e combina os
+    parciais. Retorna (acumulados, segundos por checagem, linhas processadas).
+    """
+    acumulado, segundos, linhas = {}, dict.fromkeys(config, 0.0), 0
+    for lote in lotes:
+        linhas += len(lote)
+        for nome, params in config.items():
+            spec = CHECAGENS[nome]
+            t0 = time.perf_counter()
+            parcial = spec["parcial"](lote, **params)
+            acumulado[nome] = parcial if nome not in acumulado else spec["combinar"](acumulado[nome], parcial)
+            segundos[nome] += time.perf_counter() - t0
+    return acumulado, segundos, linhas
+
+
+def _processar_tarefa(path, row_groups, config, linhas_por_lote):
+    lotes = _lotes_parquet(path, row_groups, _colunas_necessarias(config), linhas_por_lote)
+    return processar_lotes(lotes, config)
+
+
+def _tarefas(fonte, n_workers):
+    """
+    Unidades de trabalho (arquivo, row groups). Um diretório de partes
+    (salvar_lote) gera uma tarefa por arquivo; com menos arquivos do que workers,
+    os row groups de cada arquivo são divididos entre eles.
+    """
+    fonte = Path(fonte)
+    arquivos = listar_partes(fonte) if fonte.is_dir() else [fonte]
+    divisoes = max(1, -(-n_workers // max(len(arquivos), 1)))
+    tarefas = []
+    for arquivo in arquivos:
+        n_grupos = pq.ParquetFile(arquivo).metadata.num_row_groups
+        if divisoes == 1 or n_grupos <= 1:
+            tarefas.append((str(arquivo), None))
+            continue
+        for grupos in np.array_split(np.arange(n_grupos), min(divisoes, n_grupos)):
+            tarefas.append((str(arquivo), grupos.tolist()))
+    return tarefas
+
+
+def _colunas_da_fonte(fonte):
+    if isinstance(fonte, pd.DataFrame):
+        return set(fonte.columns)
+    fonte = Path(fonte)
+    arquivos = listar_partes(fonte) if fonte.is_dir() else [fonte]
+    return set(pq.read_schema(arquivos[0]).names) if arquivos else set()
+
+
+def executar_checagens(fonte, config=None, n_workers=1, linhas_por_lote=1_000_000, dataset=None):
+    """
+    Executa as checagens de `config` (padrão: CONFIG_CAMPO) sobre `fonte`, que
+    pode ser um DataFrame, um arquivo Parquet ou um diretório de partes Parquet.
+
+    Arquivos são lidos em lotes de `linhas_por_lote` e as tarefas (arquivos / row
+    groups) são distribuídas entre `n_workers` processos. Checagens cujas colunas
+    não existem na fonte ficam com status "ignorada".
+    Retorna um DataFrame com uma linha por checagem: dataset, checagem, status,
+    linhas, segundos e detalhes (dicionário).
+    """
+    config = CONFIG_CAMPO if config is None else config
+    if dataset is None:
+        dataset = "dataframe" if isinstance(fonte, pd.DataFrame) else Path(fonte).stem
+
+    disponiveis = _colunas_da_fonte(fonte)
+    faltando = {nome: sorted(set(colunas_da_checagem(nome, params)) - disponiveis) for nome, params in config.items()}
+    ativas = {nome: params for nome, params in config.items() if not faltando[nome]}
+
+    acumulado, segundos, linhas = {}, dict.fromkeys(ativas, 0.0), 0
+    if ativas:
+        if isinstance(fonte, pd.DataFrame):
+            resultados = [processar_lotes(_lotes_dataframe(fonte, linhas_por_lote), ativas)]
+        else:
+            tarefas = _tarefas(fonte, n_workers)
+            if n_workers > 1 and len(tarefas) > 1:
+                with ProcessPoolExecutor(max_workers=min(n_workers, len(tarefas))) as pool:
+                    futuros = [pool.submit(_processar_tarefa, path, grupos, ativas, linhas_por_lote)
+                               for path, grupos in tarefas]
+                    resultados = [f.result() for f in futuros]
+            else:
+                resultados = [_processar_tarefa(path, grupos, ativas, linhas_por_lote) for path, grupos in tarefas]
+
+        for parciais, tempos, n in resultados:
+            linhas += n
+            for nome, parcial in parciais.items():
+                combinar = CHECAGENS[nome]["combinar"]
+                acumulado[nome] = parcial if nome not in acumulado else combinar(acumulado[nome], parcial)
+                segundos[nome] += tempos[nome]
+
+    relatorio = []
+    for nome, params in config.items():
+        linha = {"dataset": dataset, "checagem": nome, "linhas": linhas, "segundos": segundos.get(nome, 0.0)}
+        if faltando[nome]:
+            linha.update(status="ignorada", detalhes={"colunas_ausentes": faltando[nome]})
+        elif nome not in acumulado:
+            linha.update(status="ignorada", detalhes={"motivo": "fonte sem linhas"})
+        else:
+            t0 = time.perf_counter()
+            ok, detalhes = CHECAGENS[nome]["resultado"](acumulado[nome], **params)
+            linha.update(status="ok" if ok else "falha", detalhes=detalhes)
+            linha["segundos"] += time.perf_counter() - t0
+        relatorio.append(linha)
+    return pd.DataFrame(relatorio, columns=["dataset", "checagem", "status", "linhas", "segundos", "detalhes"])
+
+
+# ------------------------------------
+# 5. Relatório estruturado
+# ------------------------------------
+def salvar_relatorio_checagens(relatorio, path_out):
+    """
+    Salva o relatório de executar_checagens: .json (detalhes aninhados) ou
+    Parquet/CSV via salvar_tabela (detalhes serializados como JSON).
+    """
+    path_out = Path(path_out)
+    if path_out.suffix.lower() == ".json":
+        path_out.parent.mkdir(parents=True, exist_ok=True)
+        with open(path_out, "w", encoding="utf-8") as f:
+            json.dump(relatorio.to_dict(orient="records"), f, indent=2, ensure_ascii=False, default=float)
+    else:
+        tabela = relatorio.assign(detalhes=[json.dumps(d, ensure_ascii=False, default=float) for d in relatorio["detalhes"]])
+        salvar_tabela(tabela, path_out)
+    return path_out
+
+
+def imprimir_checagens(relatorio):
+    """Resumo no mesmo formato das checagens interativas."""
+    icones = {"ok": "✅", "falha": "⚠️", "ignorada": "⏭️"}
+    for linha in relatorio.itertuples():
+        print(f"{icones[linha.status]} [{linha.dataset}] {linha.checagem}: {linha.status} ({linha.segundos:.3f}s)")
@@ -0,0 +1,239 @@
+"""
+Camada de armazenamento dos datasets brutos e processados.
+
+O formato padrão é Parquet (colunar, com tipos explícitos). CSV e Excel continuam
+disponíveis pela extensão do arquivo, mas Excel fica apenas como exportação
+opcional para quem consome os dados no Power BI.
+"""
+
+import pandas as pd
+from pathlib import Path
+
+FORMATO_PADRAO = "parquet"
+
+EXTENSOES = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".csv": "csv",
+    ".xlsx": "excel",
+    ".xls": "excel",
+}
+
+# Schema das colunas conhecidas dos datasets do projeto, usado na leitura e no
+# cálculo: dimensões como category e ids em int32. Preços, câmbio, volumes e
+# valores monetários ficam em float64 (entram no cálculo de receita e lucro).
+DTYPES = {
+    "data": "datetime64[ns]",
+    "data_inicio": "datetime64[ns]",
+    "id": "int32",
+    "campo_id": "int32",
+    "nome": "category",
+    "nome_campo": "category",
+    "estado": "category",
+    "tipo_petroleo": "category",
+    "capacidade_barris_dia": "int32",
+    "preco_barril_usd": "float64",
+    "taxa_cambio": "float64",
+    "preco_brl": "float64",
+    "producao_barris": "float64",
+    "receita": "float64",
+    "custo_variavel_brl": "float64",
+    "custo_fixo_brl": "float64",
+    "custo_operacional": "float64",
+    "margem_bruta": "float64",
+    "admin_brl": "float64",
+    "manutencao_brl": "float64",
+    "logistica_brl": "float64",
+    "share_admin": "float64",
+    "share_manut": "float64",
+    "share_logistica": "float64",
+    "custo_geral_brl": "float64",
+    "lucro_liquido_brl": "float64",
+    "producao_total_barris": "float64",
+    "receita_total_brl": "float64",
+    "custo_operacional_total_brl": "float64",
+    "custo_geral_total_brl": "float64",
+    "lucro_total_brl": "float64",
+}
+
+# Na escrita, o preço em BRL repetido em cada linha de produção vai em float32
+# (é informativo: a receita já foi calculada em float64). Preço e câmbio de
+# origem, uma linha por mês, continuam em float64.
+DTYPES_ESCRITA = {**DTYPES, "preco_brl": "float32"}
+
+# Domínio conhecido das dimensões categóricas (valores novos são acrescentados ao final)
+CATEGORIAS = {
+    "estado": ["RJ", "ES", "BA", "RN"],
+    "tipo_petroleo": ["leve", "médio", "pesado"],
+}
+
+
+# ------------------------------------
+# 1. Formatos e tipos
+# ------------------------------------
+def resolver_formato(path, formato=None):
+    """
+    Define o formato de um arquivo: o explícito, o da extensão ou o padrão (Parquet).
+    Caminhos sem extensão são tratados como datasets Parquet particionados (diretórios).
+    """
+    if formato is not None:
+        return formato
+    return EXTENSOES.get(Path(path).suffix.lower(), FORMATO_PADRAO)
+
+
+def aplicar_dtypes(df, dtypes=None):
+    """
+    Converte as colunas conhecidas para os tipos explícitos do projeto.
+    Não altera o DataFrame recebido.
+    """
+    dtypes = DTYPES if dtypes is None else dtypes
+    tipos = {c: t for c, t in dtypes.items() if c in df.columns and str(df[c].dtype) != t}
+    if not tipos:
+        return df
+    return df.astype(tipos)
+
+
+def _filtros_pyarrow(filtros):
+    """
+    Traduz o dicionário de filtros para o formato de `filters` do pyarrow.
+    Tupla (inicio, fim) = intervalo fechado; lista/conjunto = pertence; escalar = igualdade.
+    """
+    if not filtros:
+        return None
+    expressoes = []
+    for coluna, valor in filtros.items():
+        if coluna in ("data", "data_inicio"):
+            valor = _converter_datas(valor)
+        if isinstance(valor, tuple):
+            inicio, fim = valor
+            if inicio is not None:
+                expressoes.append((coluna, ">=", inicio))
+            if fim is not None:
+                expressoes.append((coluna, "<=", fim))
+        elif isinstance(valor, (list, set, pd.Index)):
+            expressoes.append((coluna, "in", list(valor)))
+        else:
+            expressoes.append((coluna, "==", valor))
+    return expressoes
+
+
+def _converter_datas(valor):
+    if isinstance(valor, tuple):
+        return tuple(None if v is None else pd.Timestamp(v) for v in valor)
+    if isinstance(valor, (list, set, pd.Index)):
+        return [pd.Timestamp(v) for v in valor]
+    return pd.Timestamp(valor)
+
+
+def _aplicar_filtros(df, filtros):
+    """Aplica os mesmos filtros em memória (formatos sem predicate pushdown)."""
+    if not filtros:
+        return df
+    mascara = pd.Series(True, index=df.index)
+    for coluna, op, valor in _filtros_pyarrow(filtros):
+        if op == ">=":
+            mascara &= df[coluna] >= valor
+        elif op == "<=":
+            mascara &= df[coluna] <= valor
+        elif op == "in":
+            mascara &= df[coluna].isin(valor)
+        else:
+            mascara &= df[coluna] == valor
+    return df.loc[mascara].reset_index(drop=True)
+
+
+# ------------------------------------
+# 2. Leitura e escrita
+# ------------------------------------
+def salvar_tabela(df, path, formato=None, particionar_por=None):
+    """
+    Salva um DataFrame no formato resolvido pelo caminho (Parquet por padrão).
+    `particionar_por` grava um dataset Parquet particionado por essas colunas.
+    """
+    path = Path(path)
+    formato = resolver_formato(path, formato)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df = aplicar_dtypes(df, DTYPES_ESCRITA)
+
+    if formato == "parquet":
+        df.to_parquet(path, index=False, engine="pyarrow", partition_cols=particionar_por)
+    elif formato == "csv":
+        df.to_csv(path, index=False)
+    elif formato == "excel":
+        df.to_excel(path, index=False)
+    else:
+        raise ValueError(f"Formato não suportado: {formato}")
+    return path
+
+
+def ler_tabela(path, colunas=None, filtros=None, formato=None):
+    """
+    Lê um dataset salvo por salvar_tabela.
+
+    colunas: projeção (lista de colunas a carregar).
+    filtros: dicionário {coluna: valor}, ex. {"data": ("2010-01-01", "2015-12-01"), "campo_id": [1, 2]}.
+    Em Parquet a projeção e os filtros são empurrados para o leitor (predicate pushdown);
+    em CSV/Excel são aplicados após a leitura.
+    """
+    path = Path(path)
+    formato = resolver_formato(path, formato)
+
+    if formato == "parquet":
+        df = pd.read_parquet(path, engine="pyarrow", columns=colunas, filters=_filtros_pyarrow(filtros))
+        return aplicar_dtypes(df)
+
+    if formato == "csv":
+        df = pd.read_csv(path)
+    elif formato == "excel":
+        df = pd.read_excel(path)
+    else:
+        raise ValueError(f"Formato não suportado: {formato}")
+
+    df = _aplicar_filtros(aplicar_dtypes(df), filtros)
+    if colunas is not None:
+        df = df[colunas]
+    return df
+
+
+def salvar_parte(df, dataset_dir, nome):
+    """
+    Grava um arquivo Parquet `nome`.parquet dentro do diretório de um dataset.
+    O diretório inteiro pode ser lido depois com ler_tabela (com filtros e projeção).
+    """
+    dataset_dir = Path(dataset_dir)
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    path = dataset_dir / f"{nome}.parquet"
+    aplicar_dtypes(df, DTYPES_ESCRITA).to_parquet(path, index=False, engine="pyarrow")
+    return path
+
+
+def salvar_lote(df, dataset_dir, indice, prefixo="lote"):
+    """
+    Grava um lote como um arquivo Parquet dentro do diretório do dataset.
+    Usado na geração em streaming: cada lote é escrito assim que fica pronto.
+    """
+    return salvar_parte(df, dataset_dir, f"{prefixo}-{indice:05d}")
+
+
+def listar_partes(dataset_dir, prefixo=""):
+    """Lista os arquivos Parquet de um dataset particionado, em ordem de nome."""
+    dataset_dir = Path(dataset_dir)
+    if not dataset_dir.exists():
+        return []
+    return sorted(dataset_dir.glob(f"{prefixo}*.parquet"))
+
+
+def exportar_excel(abas, path):
+    """
+    Exportação opcional para Excel (Power BI). `abas` é um DataFrame ou um
+    dicionário {nome_aba: DataFrame}.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(abas, pd.DataFrame):
+        abas = {"Dados": abas}
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for nome, df in abas.items():
+            df.to_excel(writer, sheet_name=nome, index=False)
+    print(f"📤 Exportado para Excel: {path}")
+    return path
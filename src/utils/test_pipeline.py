@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from pipeline import executar_pipeline, ordenar_etapas
+
+
+def etapa_origem(entradas, saidas, valor):
+    saidas["origem"].write_text(str(valor))
+
+
+def etapa_dobro(entradas, saidas):
+    saidas["dobro"].write_text(str(2 * int(entradas["origem"].read_text())))
+
+
+def etapa_espera(entradas, saidas, segundos):
+    inicio = time.time()
+    time.sleep(segundos)
+    saidas["intervalo"].write_text(f"{inicio} {time.time()}")
+
+
+def etapa_falha(entradas, saidas):
+    raise OSError("disco cheio")
+
+
+def montar_etapas(tmp_path, valor=1, codigo=()):
+    return {
+        "origem": {"funcao": etapa_origem, "params": {"valor": valor},
+                   "saidas": {"origem": tmp_path / "out" / "origem.txt"}, "codigo": list(codigo)},
+        "dobro": {"depende_de": ["origem"], "funcao": etapa_dobro,
+                  "saidas": {"dobro": tmp_path / "out" / "dobro.txt"}},
+    }
+
+
+def status(resumo):
+    return {r["etapa"]: r["status"] for r in resumo if r["etapa"] != "TOTAL"}
+
+
+def test_cache_invalidado_por_parametro_codigo_e_saida(tmp_path):
+    cache = tmp_path / "cache"
+    modulo = tmp_path / "modulo.py"
+    modulo.write_text("A = 1\n")
+
+    assert status(executar_pipeline(montar_etapas(tmp_path, 1, [modulo]), cache)) == {"origem": "executada",
+                                                                                   "dobro": "executada"}
+    assert status(executar_pipeline(montar_etapas(tmp_path, 1, [modulo]), cache)) == {"origem": "cache",
+                                                                                   "dobro": "cache"}
+
+    # Parâmetro novo muda a saída de origem: a dependente também roda
+    assert status(executar_pipeline(montar_etapas(tmp_path, 5, [modulo]), cache)) == {"origem": "executada",
+                                                                                   "dobro": "executada"}
+    assert (tmp_path / "out" / "dobro.txt").read_text() == "10"
+
+    # Código alterado com a mesma saída: a dependente continua em cache (hash de conteúdo)
+    modulo.write_text("A = 2\n")
+    assert status(executar_pipeline(montar_etapas(tmp_path, 5, [modulo]), cache)) == {"origem": "executada",
+                                                                                   "dobro": "cache"}
+
+    # Saída apagada ou etapa forçada
+    (tmp_path / "out" / "dobro.txt").unlink()
+    assert status(executar_pipeline(montar_etapas(tmp_path, 5, [modulo]), cache))["dobro"] == "executada"
+    assert status(executar_pipeline(montar_etapas(tmp_path, 5, [modulo]), cache, forcar=["dobro"])) == {
+        "origem": "cache", "dobro": "executada"}
+
+
+def test_alvos_e_ciclos(tmp_path):
+    etapas = montar_etapas(tmp_path)
+    assert status(executar_pipeline(etapas, tmp_path / "cache", alvos=["origem"])) == {"origem": "executada"}
+    assert not (tmp_path / "out" / "dobro.txt").exists()
+
+    etapas["origem"]["depende_de"] = ["dobro"]
+    with pytest.raises(ValueError, match="Ciclo"):
+        ordenar_etapas(etapas)
+
+
+def test_etapas_independentes_em_paralelo(tmp_path):
+    etapas = {nome: {"funcao": etapa_espera, "params": {"segundos": 0.5},
+                     "saidas": {"intervalo": tmp_path / f"{nome}.txt"}} for nome in ["preco", "cambio"]}
+    etapas.update(montar_etapas(tmp_path, 3))
+    etapas["origem"]["depende_de"] = ["preco", "cambio"]
+
+    resumo = executar_pipeline(etapas, tmp_path / "cache", n_workers=2)
+
+    assert set(status(resumo).values()) == {"executada"}
+    assert (tmp_path / "out" / "dobro.txt").read_text() == "6"
+    (ini_a, fim_a), (ini_b, fim_b) = [map(float, (tmp_path / f"{n}.txt").read_text().split())
+                                      for n in ["preco", "cambio"]]
+    assert ini_a < fim_b and ini_b < fim_a  # intervalos sobrepostos
+
+    etapas["dobro"]["funcao"] = etapa_falha
+    with pytest.raises(RuntimeError, match="Falha na etapa 'dobro': disco cheio"):
+        executar_pipeline(etapas, tmp_path / "cache", n_workers=2)
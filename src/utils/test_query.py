@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+
+from query import conectar, consultar, consultar_em_lotes, exportar_consulta, listar_views
+from rollups import materializar_cubo
+from storage import salvar_parte, salvar_tabela
+
+
+@pytest.fixture
+def base_dir(tmp_path, financeiro_campo, custos_gerais):
+    salvar_tabela(custos_gerais, tmp_path / "data" / "raw" / "custos_gerais.parquet")
+    for ano, parte in financeiro_campo.groupby(financeiro_campo["data"].dt.year):
+        salvar_parte(parte, tmp_path / "data" / "processed" / "producao_financeiro", f"ano-{ano}")
+    materializar_cubo(financeiro_campo, tmp_path / "data" / "processed" / "cubo")
+    return tmp_path
+
+
+def test_views_sobre_o_store_particionado(base_dir, financeiro_campo):
+    con = conectar(base_dir)
+    views = listar_views(con)
+    assert {"custos_gerais", "producao_financeiro", "cubo_ano__estado", "cubo_total"} <= set(views)
+    assert "financeiro" not in views  # datasets ausentes não viram view
+
+    sql = "SELECT estado, SUM(receita) AS receita FROM producao_financeiro GROUP BY estado ORDER BY estado"
+    esperado = financeiro_campo.groupby(financeiro_campo["estado"].astype(str))["receita"].sum()
+    obtido = consultar(sql, con).set_index("estado")["receita"]
+    pd.testing.assert_series_equal(obtido, esperado, check_index_type=False, rtol=1e-9)
+
+    total = consultar("SELECT receita FROM cubo_total", con)["receita"].item()
+    assert total == pytest.approx(financeiro_campo["receita"].sum(), rel=1e-9)
+
+
+def test_lotes_e_exportacao_iguais_a_consulta(base_dir, financeiro_campo):
+    con = conectar(base_dir)
+    sql = "SELECT campo_id, data, lucro_liquido_brl FROM producao_financeiro ORDER BY campo_id, data"
+    inteiro = consultar(sql, con)
+    assert len(inteiro) == len(financeiro_campo)
+
+    lotes = list(consultar_em_lotes(sql, con, linhas_por_lote=1000))
+    assert max(len(lote) for lote in lotes) <= 1000
+    pd.testing.assert_frame_equal(pd.concat(lotes, ignore_index=True), inteiro)
+
+    path = exportar_consulta(sql, base_dir / "saida" / "lucro.parquet", con)
+    pd.testing.assert_frame_equal(pd.read_parquet(path), inteiro)
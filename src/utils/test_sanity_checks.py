@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from sanity_checks import executar_checagens
+from storage import salvar_lote
+
+
+def detalhes(relatorio):
+    return relatorio.set_index("checagem")[["status", "linhas", "detalhes"]].to_dict("index")
+
+
+def test_lotes_e_processos_iguais_a_uma_passada(tmp_path, financeiro_campo):
+    inteiro = detalhes(executar_checagens(financeiro_campo, linhas_por_lote=len(financeiro_campo)))
+    assert inteiro["identidade_lucro"]["status"] == "ok"
+
+    r = np.corrcoef(financeiro_campo["preco_brl"], financeiro_campo["receita"])[0, 1]
+    np.testing.assert_allclose(inteiro["correlacao"]["detalhes"]["r"], r, rtol=1e-12)
+
+    for i, campo_id in enumerate([[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]]):
+        salvar_lote(financeiro_campo[financeiro_campo["campo_id"].isin(campo_id)], tmp_path, i)
+    for fonte, kwargs in [(financeiro_campo, {"linhas_por_lote": 100}),
+                          (tmp_path, {"linhas_por_lote": 500, "n_workers": 2})]:
+        em_lotes = detalhes(executar_checagens(fonte, **kwargs))
+        assert em_lotes.keys() == inteiro.keys()
+        for nome, d in em_lotes.items():
+            assert (d["status"], d["linhas"]) == (inteiro[nome]["status"], inteiro[nome]["linhas"])
+            # Tolerância: o preco_brl gravado nas partes é float32
+            for chave, valor in d["detalhes"].items():
+                if isinstance(valor, float):
+                    np.testing.assert_allclose(valor, inteiro[nome]["detalhes"][chave], rtol=1e-6, atol=1e-6)
+                else:
+                    assert valor == inteiro[nome]["detalhes"][chave]
+
+
+def test_falhas_detectadas(financeiro_campo):
+    df = financeiro_campo[~((financeiro_campo["campo_id"] == 3)
+                            & (financeiro_campo["data"] == pd.Timestamp("2012-05-01")))].copy()
+    df.loc[df.index[10], "producao_barris"] = -1.0
+    df.loc[df.index[20], "lucro_liquido_brl"] += 1000.0
+
+    relatorio = detalhes(executar_checagens(df.drop(columns="preco_brl"), linhas_por_lote=300))
+    assert relatorio["cobertura_datas"]["detalhes"]["meses_faltantes_por_grupo"] == {"3": 1}
+    assert relatorio["producao_nao_negativa"]["detalhes"]["negativos_por_coluna"] == {"producao_barris": 1}
+    assert relatorio["identidade_lucro"]["detalhes"]["violacoes"] >= 1
+    assert relatorio["correlacao"]["status"] == "ignorada"
@@ -0,0 +1,78 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from storage import aplicar_dtypes, exportar_excel, ler_tabela, salvar_tabela, salvar_lote, listar_partes
+
+
+def test_ida_e_volta_com_projecao_e_filtros(tmp_path, producao):
+    path = salvar_tabela(producao, tmp_path / "producao.parquet")
+    df = ler_tabela(path)
+    producao = aplicar_dtypes(producao)
+
+    assert df["campo_id"].dtype == "int32"
+    assert isinstance(df["estado"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(df.drop(columns="preco_brl"), producao.drop(columns="preco_brl"))
+
+    filtrado = ler_tabela(path, colunas=["data", "campo_id", "receita"],
+                          filtros={"data": ("2010-01-01", "2010-12-01"), "campo_id": [1, 2]})
+    esperado = producao.loc[producao["data"].between("2010-01-01", "2010-12-01")
+                            & producao["campo_id"].isin([1, 2]), ["data", "campo_id", "receita"]]
+    pd.testing.assert_frame_equal(filtrado, esperado.reset_index(drop=True))
+
+    # CSV aplica os mesmos filtros depois da leitura
+    csv = salvar_tabela(producao, tmp_path / "producao.csv")
+    pd.testing.assert_frame_equal(ler_tabela(csv, colunas=["data", "campo_id", "receita"],
+                                             filtros={"data": ("2010-01-01", "2010-12-01"), "campo_id": [1, 2]}),
+                                  filtrado)
+
+
+def test_precos_em_float64_no_calculo(tmp_path, dados_brutos, producao):
+    # Preço e câmbio de origem são lidos sem perda (float64 em disco e na leitura)
+    preco = ler_tabela(dados_brutos["dir"] / "preco_petroleo.parquet")
+    cambio = ler_tabela(dados_brutos["dir"] / "cambio.parquet")
+    assert preco["preco_barril_usd"].dtype == "float64"
+    assert cambio["taxa_cambio"].dtype == "float64"
+    assert (preco["preco_barril_usd"] == preco["preco_barril_usd"].round(2)).all()
+
+    # preco_brl da produção é compactado só na escrita e volta como float64
+    path = salvar_tabela(producao, tmp_path / "producao.parquet")
+    assert pq.read_schema(path).field("preco_brl").type == "float"
+    lido = ler_tabela(path)
+    assert lido["preco_brl"].dtype == "float64"
+    assert producao["preco_brl"].dtype == "float64"
+    pd.testing.assert_series_equal(lido["preco_brl"], producao["preco_brl"], rtol=1e-6)
+
+
+def test_dataset_em_lotes(tmp_path, producao):
+    partes = [producao[producao["campo_id"] <= 6], producao[producao["campo_id"] > 6]]
+    for i, parte in enumerate(partes):
+        salvar_lote(parte, tmp_path / "producao", i)
+
+    assert [p.name for p in listar_partes(tmp_path / "producao", "lote")] == ["lote-00000.parquet",
+                                                                             "lote-00001.parquet"]
+    df = ler_tabela(tmp_path / "producao", filtros={"campo_id": 7})
+    assert set(df["campo_id"]) == {7}
+    assert len(df) == (producao["campo_id"] == 7).sum()
+
+
+def test_particionado_por_coluna_e_excel(tmp_path, producao):
+    amostra = producao[producao["data"] < "2006-01-01"]
+    salvar_tabela(amostra, tmp_path / "por_estado", particionar_por=["estado"])
+    assert sorted(p.name for p in (tmp_path / "por_estado").iterdir()) == sorted(
+        f"estado={e}" for e in amostra["estado"].unique())
+    rj = ler_tabela(tmp_path / "por_estado", filtros={"estado": "RJ"})
+    assert len(rj) == (amostra["estado"] == "RJ").sum()
+
+    path = exportar_excel({"Produção": amostra, "Campos": amostra[["campo_id"]].drop_duplicates()},
+                          tmp_path / "export" / "producao.xlsx")
+    assert list(pd.read_excel(path, sheet_name=None)) == ["Produção", "Campos"]
+    lido = ler_tabela(path, colunas=["campo_id", "data", "receita"], filtros={"campo_id": [1]})
+    pd.testing.assert_frame_equal(
+        lido, aplicar_dtypes(amostra).loc[amostra["campo_id"] == 1, ["campo_id", "data", "receita"]]
+        .reset_index(drop=True), check_dtype=False)
+
+
+def test_formato_desconhecido(tmp_path, producao):
+    with pytest.raises(ValueError, match="Formato não suportado"):
+        salvar_tabela(producao, tmp_path / "producao.bin", formato="feather")
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from export_predictions_for_powerbi import export_predictions_for_powerbi
+
+
+def previsoes_ml(agregados):
+    return pd.DataFrame({
+        "data": agregados["data"],
+        "real": agregados["receita_total_brl"],
+        "rf_previsto": agregados["receita_total_brl"] * 1.01,
+        "xgb_previsto": pd.NA,
+    })
+
+
+def test_exportacao_incremental(tmp_path, agregados):
+    pred_ml = previsoes_ml(agregados)
+    original = pred_ml.copy()
+    metricas = pd.DataFrame({"target": ["receita"], "modelo": ["RandomForest"], "MAE": [1.0]})
+
+    primeira = export_predictions_for_powerbi(pred_ml, metricas, output_path=tmp_path)
+    pd.testing.assert_frame_equal(pred_ml, original)  # entrada não é alterada
+    assert len(primeira["escritas"]) == 3 * 21 and primeira["linhas"] == 3 * len(pred_ml)
+
+    previsoes = pd.read_parquet(tmp_path / "previsoes")
+    rf = previsoes[previsoes["modelo"] == "Random Forest"].sort_values("data")
+    np.testing.assert_array_equal(rf["valor"], pred_ml.sort_values("data")["rf_previsto"])
+    assert previsoes.loc[previsoes["modelo"] == "XGBoost", "valor"].isna().all()
+
+    resumo = pd.read_parquet(tmp_path / "resumo_mensal")
+    esperado = rf.groupby(["ano", "mes"])["valor"].mean().to_numpy()
+    np.testing.assert_allclose(resumo[resumo["modelo"] == "Random Forest"]
+                               .sort_values(["ano", "mes"])["media_valor"], esperado, rtol=1e-12)
+
+    # Sem mudança: nada é regravado; um valor alterado regrava só a sua partição
+    assert export_predictions_for_powerbi(pred_ml, metricas, output_path=tmp_path)["escritas"] == []
+    pred_ml.loc[pred_ml["data"] == pd.Timestamp("2010-03-01"), "rf_previsto"] += 1
+    assert export_predictions_for_powerbi(pred_ml, metricas, output_path=tmp_path)["escritas"] == [
+        "Machine_Learning__Random_Forest__2010"]
+
+    # Anos que saíram da entrada são removidos
+    resultado = export_predictions_for_powerbi(pred_ml[pred_ml["data"] < pd.Timestamp("2025-01-01")], metricas,
+                                               output_path=tmp_path)
+    assert resultado["removidas"] == ["Machine_Learning__Random_Forest__2025", "Machine_Learning__Valor_Real__2025",
+                                      "Machine_Learning__XGBoost__2025"]
+    assert not (tmp_path / "previsoes" / "Machine_Learning__XGBoost__2025.parquet").exists()
@@ -0,0 +1,13 @@
+from generate_campos import gerar_campos
+
+
+def test_nomes_unicos_em_escala(tmp_path):
+    df = gerar_campos(tmp_path / "campos.parquet", n_campos=20_000, seed=3)
+
+    assert df["nome"].is_unique
+    repetidos = df["nome"].str.match(r"Campo \S+ \S+ \d+$")
+    assert repetidos.any()
+    assert (df.loc[repetidos, "nome"].str.split().str[-1].astype(int) == df.loc[repetidos, "id"]).all()
+    # Tamanhos pequenos mantêm os nomes sorteados, sem sufixo
+    pequeno = gerar_campos(tmp_path / "campos_10.parquet", n_campos=10, seed=3)
+    assert pequeno["nome"].is_unique and not pequeno["nome"].str.match(r".* \d+$").any()
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from generate_predictions_script import VALUE_COLS, forecast_batch
+
+
+def previsao_por_coluna(serie, horizon):
+    """Laço original: um LinearRegression na tendência por coluna, só com os meses que têm valor."""
+    serie = serie.reset_index(drop=True)
+    validos = serie.notna()
+    modelo = LinearRegression().fit(np.arange(len(serie))[validos].reshape(-1, 1), serie[validos])
+    return modelo.predict(np.arange(len(serie), len(serie) + horizon).reshape(-1, 1))
+
+
+def test_lote_igual_ao_laco_por_coluna(agregados):
+    obtido = forecast_batch(agregados, horizon=6)
+    assert len(obtido) == 6 * len(VALUE_COLS)
+    for col in VALUE_COLS:
+        esperado = previsao_por_coluna(agregados.sort_values("data")[col], 6)
+        np.testing.assert_allclose(obtido.loc[obtido["variavel"] == col, "previsto"], esperado, rtol=1e-8)
+
+
+def test_grupos_com_meses_ausentes(financeiro_campo):
+    df = financeiro_campo[["data", "campo_id", "producao_barris", "receita"]].copy()
+    df.loc[(df["campo_id"] == 3) & (df["data"] < pd.Timestamp("2010-01-01")), "receita"] = np.nan
+    obtido = forecast_batch(df, value_cols=["producao_barris", "receita"], horizon=3, group_col="campo_id")
+
+    for campo_id in [3, 8]:
+        serie = df[df["campo_id"] == campo_id].sort_values("data")
+        for col in ["producao_barris", "receita"]:
+            previsto = obtido[(obtido["campo_id"] == campo_id) & (obtido["variavel"] == col)]
+            np.testing.assert_allclose(previsto["previsto"], previsao_por_coluna(serie[col], 3), rtol=1e-8)